@@ -3,8 +3,6 @@ from flask_migrate import Migrate  # Import Flask-Migrate for database migration
 from flask_wtf.csrf import CSRFProtect
 
 from apscheduler.schedulers.background import BackgroundScheduler  # Import APScheduler
-import logging
-from logging.handlers import RotatingFileHandler
 import os
 import sys
 
@@ -12,26 +10,45 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import Config from the root directory
-from config import Config
+from config import Config, start_config_watcher
 
 # Import db and login_manager from extensions
 from app.extensions import db, login_manager
+from app.helpers.services import StartupTimer
+from app.helpers.logging_setup import configure_logging, init_request_ids
+from app.helpers.metrics import init_metrics
+from app.helpers.tracing import init_tracing
+from app.helpers.profiler import init_profiler
+from app.helpers.upstream_limiter import init_upstream_limits
+from app.helpers.async_http import init_async_timeouts
+from app.helpers.scheduler import LeaderLock, SchedulerLeadership, recorded_job
 
-
-# Import routes
-from app.routes.web_routes import generate_recommendations, process_requests  # Adjust import paths if needed
-from app.routes.request_processing_routes import request_processing_bp
-from app.routes.config_routes import config_bp  # Import the new config route
-from app.routes.admin_routes import admin_bp  # Import the admin route
-from app.routes.unified_requests import unified_requests_bp
 csrf = CSRFProtect()
 migrate = Migrate()  # Initialize Flask-Migrate
 
-def create_app():
+def create_app(run_scheduler=None):
+    """
+    Create the Flask app.
+
+    Args:
+        run_scheduler: Whether this process may run the scheduled jobs. True
+            (the dedicated scheduler process) or None with Scheduler.mode 'auto'
+            (every web worker) makes the process compete for leadership, so the
+            jobs run in exactly one of them; False (scripts) never runs them.
+    """
+    # Every entry point (run.py, gunicorn's app factory, scripts) gets the same logging
+    configure_logging()
+    startup = StartupTimer()
     app = Flask(__name__)
 
     # Initialize CSRF protection after app creation
     csrf.init_app(app)
+    init_request_ids(app)
+    init_metrics(app)
+    init_tracing(app)
+    init_profiler(app)
+    init_upstream_limits(app)
+    init_async_timeouts(app)
 
     # Instantiate and load the configuration
     config = Config()
@@ -53,40 +70,66 @@ def create_app():
         from app.models import User  # Import User here to avoid circular import issues
         return User.query.get(int(user_id))
 
-    # Initialize the scheduler
-    scheduler = BackgroundScheduler()
+    # Initialize the scheduler. A job that is still running when it is due again is
+    # skipped, and runs missed while the process was busy are coalesced into one.
+    scheduler = BackgroundScheduler(job_defaults={'max_instances': 1, 'coalesce': True, 'misfire_grace_time': 300})
 
-    # Define the task functions
+    # Define the task functions; recorded_job runs them in an app context and stores each run
     def daily_recommendations_task():
-        with app.app_context():  # Ensure the task runs within the app context
-            try:
-                generate_recommendations()
-            except Exception as e:
-                current_app.logger.error(f"Error running daily_recommendations_task: {e}")
+        # There is no logged-in user in the scheduler, so attribute them to the first admin
+        from app.models import User
+        from app.helpers.recommendation_builder import RecommendationBuilder
+        admin = User.query.filter_by(role='Admin').order_by(User.id).first()
+        if admin:
+            RecommendationBuilder().generate_user_recommendations(admin.id)
+
+    def refresh_recommendations_task():
+        from app.helpers.recommendation_builder import RecommendationBuilder
+        RecommendationBuilder().refresh()
+
+    def sync_tmdb_changes_task():
+        from app.helpers.tmdb_changes import TMDbChangesSync
+        TMDbChangesSync().run()
+
+    def refresh_release_calendar_task():
+        from app.helpers.release_calendar import ReleaseCalendar
+        ReleaseCalendar().refresh()
+
+    def prefetch_images_task():
+        from app.helpers.image_prefetcher import ImagePrefetcher
+        ImagePrefetcher().run()
 
     def process_pending_requests_task():
-        with app.app_context():  # Ensure the task runs within the app context
-            try:
-                # Radarr, Sonarr, and Lidarr handle all downloads now
-                # This task just logs status of pending requests
-                from app.models import Request
-                pending_requests = Request.query.filter_by(status='Pending').all()
-                if pending_requests:
-                    current_app.logger.info(f"Found {len(pending_requests)} pending requests - managed by Radarr/Sonarr/Lidarr")
-                    # Requests are handled directly by the *arr services
-                    # Status will be updated when media appears in Jellyfin
-            except Exception as e:
-                current_app.logger.error(f"Error running process_pending_requests_task: {e}")
+        # Radarr, Sonarr, and Lidarr handle all downloads now
+        # This task just logs status of pending requests
+        from app.models import Request
+        pending_requests = Request.query.filter_by(status='Pending').all()
+        if pending_requests:
+            current_app.logger.info(f"Found {len(pending_requests)} pending requests - managed by Radarr/Sonarr/Lidarr")
+            # Requests are handled directly by the *arr services
+            # Status will be updated when media appears in Jellyfin
 
     # Schedule the tasks
-    scheduler.add_job(daily_recommendations_task, 'interval', days=1)
-    scheduler.add_job(process_pending_requests_task, 'interval', minutes=5)
-    scheduler.start()
+    scheduler.add_job(recorded_job(app, daily_recommendations_task), 'interval', days=1)
+    scheduler.add_job(recorded_job(app, refresh_recommendations_task), 'interval', hours=1)
+    scheduler.add_job(recorded_job(app, sync_tmdb_changes_task), 'interval', hours=12)
+    scheduler.add_job(recorded_job(app, refresh_release_calendar_task), 'cron', hour=0, minute=5)
+    scheduler.add_job(recorded_job(app, prefetch_images_task), 'interval', minutes=30)
+    scheduler.add_job(recorded_job(app, process_pending_requests_task), 'interval', minutes=5)
+
+    # Pick up config.yaml edits without a restart
+    start_config_watcher()
 
     with app.app_context():
-        # Import and register your blueprints/routes here
-        from .routes import media_routes, user_routes, request_routes, notification_routes, web_routes, auth_routes
-        from app.routes.jellyfin_routes import jellyfin_bp
+        # Import and register your blueprints/routes here; helpers they use are created on first request
+        with startup.step('routes'):
+            from .routes import media_routes, user_routes, request_routes, notification_routes, web_routes, auth_routes
+            from app.routes.jellyfin_routes import jellyfin_bp
+            from app.routes.request_processing_routes import request_processing_bp
+            from app.routes.config_routes import config_bp
+            from app.routes.admin_routes import admin_bp
+            from app.routes.unified_requests import unified_requests_bp
+            from app.routes.metrics_routes import metrics_bp
         app.register_blueprint(auth_routes.auth_bp)
         app.register_blueprint(media_routes.bp)
         app.register_blueprint(user_routes.bp)
@@ -98,23 +141,21 @@ def create_app():
         app.register_blueprint(config_bp, url_prefix='/config')  # Register the new config route
         app.register_blueprint(admin_bp, url_prefix='/admin')  # Register the admin route
         app.register_blueprint(unified_requests_bp)
+        app.register_blueprint(metrics_bp)
 
         # Create database tables if they don't exist
-        db.create_all()
-
+        with startup.step('database'):
+            db.create_all()
+
+    if run_scheduler is None:
+        run_scheduler = config.SCHEDULER_MODE == 'auto'
+    if run_scheduler:
+        with startup.step('scheduler'):
+            with app.app_context():
+                lock = LeaderLock(db.engine, config.SCHEDULER_LOCK_FILE)
+            leadership = SchedulerLeadership(app, scheduler, lock, config.SCHEDULER_ELECTION_INTERVAL)
+            leadership.start()
+        app.extensions['scheduler_leadership'] = leadership
+
+    app.extensions['startup_report'] = startup.report()
     return app
-
-def configure_logging():
-    LOG_DIR = "./logs"
-    os.makedirs(LOG_DIR, exist_ok=True)
-
-    LOG_FILE = os.path.join(LOG_DIR, "app.log")
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),  # Console
-            RotatingFileHandler(LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=5),  # Rotating logs
-        ],
-    )
-
@@ -0,0 +1,182 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+from flask import jsonify, request
+
+from config import Config, on_config_change
+from app.helpers.metrics import UPSTREAM_REQUESTS, UPSTREAM_SECONDS
+from app.helpers.tracing import record_span
+from app.helpers.upstream_limiter import UpstreamBusyError, get_upstream_limiter
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+_client = None
+# Most upstream rounds a view's coroutine waits for one after another (search, follow-up lookups, a fallback)
+RUN_ASYNC_ROUNDS = 3
+
+
+class AsyncTimeoutError(TimeoutError):
+    """Raised by run_async() when the shared loop did not finish a coroutine in time."""
+
+    def __init__(self, timeout):
+        super().__init__(f"Upstream calls did not finish within {timeout:g}s")
+        self.timeout = timeout
+
+
+def get_event_loop():
+    """
+    Return the process-wide event loop, starting its thread on first use.
+
+    Views stay synchronous and hand only their upstream fan-out to this loop
+    with run_async(), so every request's upstream calls share one pooled HTTP
+    client while database work and template rendering stay on the request's
+    own thread. Nothing that blocks may run on the loop itself.
+    """
+    global _loop, _loop_thread
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                _loop_thread = threading.Thread(target=loop.run_forever, name='async-loop', daemon=True)
+                _loop_thread.start()
+                _loop = loop
+    return _loop
+
+
+def run_async(coroutine, timeout=None):
+    """
+    Run a coroutine on the shared loop and wait for its result.
+
+    The caller's context (Flask request, current trace) is copied to the
+    coroutine. Must not be called from the loop itself, which would deadlock.
+
+    Raises:
+        AsyncTimeoutError: If the coroutine has not finished after timeout
+            seconds (by default a little over RUN_ASYNC_ROUNDS upstream
+            timeouts); it is cancelled so a stalled loop can't hold the
+            request thread forever.
+    """
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        coroutine.close()
+        raise RuntimeError("run_async() called from the event loop; await the coroutine instead.")
+    if timeout is None:
+        config = Config()
+        timeout = max(config.SERVICE_TIMEOUT, config.JACKETT_INDEXER_TIMEOUT) * RUN_ASYNC_ROUNDS + 2
+    future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        if future.done():
+            raise  # The coroutine itself timed out; that is its own error to report
+        future.cancel()
+        logging.error(f"Async upstream calls did not finish within {timeout}s; cancelled.")
+        raise AsyncTimeoutError(timeout) from None
+
+
+def timeout_response(error):
+    """Return the 504 answer to a request whose upstream calls did not finish in time."""
+    message = "The upstream services took too long to answer, please try again."
+    if request.accept_mimetypes.best == 'application/json' or request.is_json:
+        return jsonify({'success': False, 'error': message}), 504
+    return message, 504
+
+
+def init_async_timeouts(app):
+    """Answer requests whose run_async() call timed out with 504."""
+    app.register_error_handler(AsyncTimeoutError, timeout_response)
+
+
+def get_async_client():
+    """Return the pooled HTTP client of the shared loop. Only use it from coroutines running there."""
+    global _client
+    if _client is None:
+        config = Config()
+        _client = httpx.AsyncClient(
+            timeout=config.SERVICE_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=config.ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=config.ASYNC_MAX_KEEPALIVE
+            ),
+            follow_redirects=True
+        )
+    return _client
+
+
+@on_config_change
+def _reset_client(old, new):
+    # Pool limits and timeouts are read when the client is created; the old one is closed on the loop
+    global _client
+    client, _client = _client, None
+    if client is not None and _loop is not None:
+        asyncio.run_coroutine_threadsafe(client.aclose(), _loop)
+
+
+async def async_timed_request(service, method, url, **kwargs):
+    """The async counterpart of timed_request: send a request with the shared client, limited, counted and traced."""
+    lease, start = await _acquire(service)
+    status = 'error'
+    try:
+        response = await get_async_client().request(method, url, **kwargs)
+        status = str(response.status_code)
+        return response
+    finally:
+        await _finish(service, method, url, lease, start, status)
+
+
+@asynccontextmanager
+async def async_timed_stream(service, method, url, **kwargs):
+    """
+    Like async_timed_request, but for "async with": the response body is
+    streamed, and the call holds its slot and is timed until the block exits.
+    """
+    lease, start = await _acquire(service)
+    status = 'error'
+    try:
+        async with get_async_client().stream(method, url, **kwargs) as response:
+            status = str(response.status_code)
+            yield response
+    finally:
+        await _finish(service, method, url, lease, start, status)
+
+
+def iter_from_thread(async_iterator, loop):
+    """
+    Iterate an async iterator of the loop from a worker thread, one item at a
+    time, so a blocking consumer (a parser) can read a stream the loop owns.
+    """
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(async_iterator.__anext__(), loop).result()
+        except StopAsyncIteration:
+            return
+
+
+async def _acquire(service):
+    """Wait for the service's upstream budget. Returns (lease, time the call started)."""
+    limiter = get_upstream_limiter()
+    queued = time.perf_counter()
+    try:
+        lease = await limiter.acquire_async(service)
+    except UpstreamBusyError:
+        UPSTREAM_REQUESTS.inc(service=service, status='throttled')
+        raise
+    start = time.perf_counter()
+    if start - queued > 0.001:
+        record_span(f"wait for {service}", 'throttled', queued, start)
+    return lease, start
+
+
+async def _finish(service, method, url, lease, start, status):
+    end = time.perf_counter()
+    await get_upstream_limiter().release_async(lease)
+    UPSTREAM_REQUESTS.inc(service=service, status=status)
+    UPSTREAM_SECONDS.observe(end - start, service=service)
+    record_span(f"{method} {urlsplit(url).path}", service, start, end, status=status)
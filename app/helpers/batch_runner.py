@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from app.extensions import db
+
+
+def add_batch_arguments(parser):
+    """Add the options every BatchRunner script understands to an argparse parser."""
+    parser.add_argument('--limit', type=int, help='Maximum number of rows to process in this run')
+    parser.add_argument('--workers', type=int, default=8, help='Rows worked on concurrently (default 8)')
+    parser.add_argument('--chunk-size', type=int, default=100, help='Rows per committed chunk (default 100)')
+    parser.add_argument('--dry-run', action='store_true', help='Do the work and log the outcome, but change nothing')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint of an interrupted run')
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class BatchRunner:
+    """
+    Runs a job over many rows of a table in committed chunks, so an
+    interrupted run loses at most one chunk and the next run resumes after it.
+
+    Rows are read a chunk at a time in primary key order ("id > last id",
+    never OFFSET), so memory stays flat and the thousandth chunk is as cheap
+    to read as the first. For each chunk, work(row) runs concurrently on a
+    thread pool -- the slow, I/O-bound part such as classifying a title --
+    then apply(row, result) writes each result from the calling thread. The
+    chunk is committed and its last id saved as the checkpoint before the
+    next one is read.
+
+    work() may read the row's columns but must not touch the database
+    session. It runs outside any request, so its upstream calls use the batch
+    share of the upstream budgets and wait for them rather than failing; a
+    budget too small to share, such as MusicBrainz's, is only used while the
+    web UI leaves it idle. Name such a service as paced_by and the run logs
+    how long it may take at that pace.
+
+    An exception in work() counts the row as failed, and the checkpoint
+    stays before it so the next run tries it again; one in apply() stops
+    the run with the chunk rolled back.
+    """
+
+    def __init__(self, name, query, work, apply, chunk_size=100, workers=8, limit=None, dry_run=False, paced_by=None):
+        self.name = name
+        self.query = query
+        self.model = query.column_descriptions[0]['entity']
+        self.work = work
+        self.apply = apply
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.limit = limit
+        self.dry_run = dry_run
+        self.paced_by = paced_by
+        self.checkpoint_file = os.path.join(Config().CACHE_DIR, 'batch', f"{name}.json")
+
+    @classmethod
+    def from_args(cls, name, query, work, apply, args, paced_by=None):
+        """Create a runner configured from add_batch_arguments() options."""
+        return cls(
+            name, query, work, apply,
+            chunk_size=args.chunk_size, workers=args.workers, limit=args.limit, dry_run=args.dry_run, paced_by=paced_by
+        )
+
+    def run(self, restart=False):
+        """
+        Process every matching row after the checkpoint.
+
+        Returns:
+            dict: Rows processed, succeeded and failed, and whether the run finished.
+        """
+        last_id = 0 if restart else self._load_checkpoint()
+        if last_id:
+            logging.info(f"{self.name}: resuming after id {last_id} (use --restart to start over).")
+        total = self.query.filter(self.model.id > last_id).count()
+        if self.limit:
+            total = min(total, self.limit)
+        logging.info(f"{self.name}: {total} rows to process{' (dry run)' if self.dry_run else ''}.")
+        self._log_pace(total)
+
+        stats = {'processed': 0, 'succeeded': 0, 'failed': 0, 'finished': False}
+        first_failed = None  # The checkpoint never moves past a row whose work() raised
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"batch-{self.name}")
+        try:
+            while not self.limit or stats['processed'] < self.limit:
+                size = self.chunk_size if not self.limit else min(self.chunk_size, self.limit - stats['processed'])
+                rows = self.query.filter(self.model.id > last_id).order_by(self.model.id).limit(size).all()
+                if not rows:
+                    stats['finished'] = True
+                    break
+
+                results = list(executor.map(self._work, rows))
+                chunk_last_id = rows[-1].id
+                if first_failed is None:
+                    first_failed = next((row.id for row, (ok, _) in zip(rows, results) if not ok), None)
+                try:
+                    for row, (ok, result) in zip(rows, results):
+                        if ok and self.apply(row, result):
+                            stats['succeeded'] += 1
+                        else:
+                            stats['failed'] += 1
+                except Exception:
+                    db.session.rollback()
+                    logging.error(f"{self.name}: stopped in the chunk after id {last_id}; it was rolled back.")
+                    raise
+
+                if self.dry_run:
+                    db.session.rollback()
+                else:
+                    db.session.commit()
+                    self._save_checkpoint(chunk_last_id if first_failed is None else first_failed - 1)
+                last_id = chunk_last_id
+                stats['processed'] += len(rows)
+                self._report(stats, total, started)
+        except KeyboardInterrupt:
+            db.session.rollback()
+            resume_after = last_id if first_failed is None else min(last_id, first_failed - 1)
+            logging.warning(f"{self.name}: interrupted after {stats['processed']} rows; run again to resume after id {resume_after}.")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if stats['finished'] and not self.dry_run:
+            self._clear_checkpoint()
+        elif first_failed is not None and not self.dry_run:
+            logging.warning(f"{self.name}: the next run starts again at id {first_failed}, the first row that failed.")
+        logging.info(
+            f"{self.name}: {stats['processed']} rows in {format_duration(time.monotonic() - started)}, "
+            f"{stats['succeeded']} succeeded, {stats['failed']} failed."
+        )
+        return stats
+
+    def _work(self, row):
+        try:
+            return True, self.work(row)
+        except Exception as e:
+            logging.error(f"{self.name}: row {row.id} failed: {e}")
+            return False, None
+
+    def _log_pace(self, total):
+        limits = Config().UPSTREAM_LIMITS.get(self.paced_by) if self.paced_by else None
+        if not total or not limits or not limits.get('rate'):
+            return
+        logging.warning(
+            f"{self.name}: rows may need {self.paced_by}, which allows {limits['rate']} call(s) a second and "
+            f"gives way to the web UI; {total} rows could take {format_duration(total / limits['rate'])} or more."
+        )
+
+    def _report(self, stats, total, started):
+        elapsed = time.monotonic() - started
+        rate = stats['processed'] / elapsed if elapsed else 0
+        remaining = max(total - stats['processed'], 0)
+        eta = format_duration(remaining / rate) if rate else '?'
+        logging.info(
+            f"{self.name}: {stats['processed']}/{total} rows ({stats['processed'] / max(total, 1):.0%}), "
+            f"{rate:.1f} rows/s, ETA {eta}, {stats['succeeded']} succeeded, {stats['failed']} failed"
+        )
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_file) as file:
+                return json.load(file).get('last_id', 0)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logging.warning(f"{self.name}: ignoring unreadable checkpoint {self.checkpoint_file}: {e}")
+            return 0
+
+    def _save_checkpoint(self, last_id):
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_file)), exist_ok=True)
+        temporary = f"{self.checkpoint_file}.tmp"
+        with open(temporary, 'w') as file:
+            json.dump({'last_id': last_id, 'saved_at': time.time()}, file)
+        os.replace(temporary, self.checkpoint_file)  # Never leave a half-written checkpoint
+
+    def _clear_checkpoint(self):
+        try:
+            os.remove(self.checkpoint_file)
+        except FileNotFoundError:
+            pass
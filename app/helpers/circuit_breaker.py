@@ -0,0 +1,210 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from config import Config
+from app.helpers.metrics import timed_request
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling a service whose circuit is open."""
+
+    def __init__(self, service, retry_in):
+        super().__init__(f"{service} is unavailable; retrying in {retry_in:.0f}s")
+        self.service = service
+        self.retry_in = retry_in
+
+
+def get_circuit_breaker(service, probe=None):
+    """
+    Return the process-wide circuit breaker for a service, creating it on first use.
+
+    Args:
+        probe: Optional callable that raises if the service is still down. When
+            given, an open circuit is tested in the background instead of by the
+            next real request.
+    """
+    breaker = _breakers.get(service)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(service)
+            if breaker is None:
+                config = Config()
+                breaker = CircuitBreaker(
+                    service,
+                    failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD,
+                    reset_timeout=config.CIRCUIT_RESET_TIMEOUT,
+                    max_reset_timeout=config.CIRCUIT_MAX_RESET_TIMEOUT
+                )
+                _breakers[service] = breaker
+    if probe is not None and breaker.probe is None:
+        breaker.probe = probe
+    return breaker
+
+
+def circuit_breakers():
+    """Return a status snapshot of every registered breaker, by service name."""
+    with _breakers_lock:
+        breakers = sorted(_breakers.items())
+    return [breaker.status() for _, breaker in breakers]
+
+
+def is_outage(error):
+    """Whether an exception means the service is down rather than that the request was wrong."""
+    if not isinstance(error, requests.exceptions.RequestException) or isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None) or getattr(error, 'http_status_code', None)
+        return status is None or status >= 500
+    return True
+
+
+def guarded_request(service, method, url, **kwargs):
+    """
+    Send an HTTP request to a service through its circuit breaker.
+
+    Connection errors, timeouts and 5xx responses count as failures; the
+    response is returned as is otherwise. Raises CircuitOpenError without
+    sending anything while the service's circuit is open.
+    """
+    kwargs.setdefault('timeout', Config().SERVICE_TIMEOUT)
+
+    def send():
+        response = timed_request(service, method, url, **kwargs)
+        if response.status_code >= 500:
+            response.raise_for_status()
+        return response
+
+    return get_circuit_breaker(service).call(send)
+
+
+def http_probe(url, **kwargs):
+    """Return a probe that GETs url and raises unless the service answers without a server error."""
+    kwargs.setdefault('timeout', 5)
+
+    def probe():
+        response = requests.get(url, **kwargs)
+        if response.status_code >= 500:
+            response.raise_for_status()
+    return probe
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for one external service.
+
+    - Closed: calls go through; failure_threshold outages in a row open it.
+    - Open: calls fail at once with CircuitOpenError, so a dead service costs
+      callers nothing instead of a timeout each. After a jittered backoff that
+      doubles with every failed retry (up to max_reset_timeout) the service is
+      retried: by the probe in a background thread when there is one,
+      otherwise by letting the next call through.
+    - Half-open: one trial call is in flight; success closes the circuit, an
+      outage opens it again with a longer backoff.
+    """
+
+    def __init__(self, service, failure_threshold=3, reset_timeout=15, max_reset_timeout=300, probe=None):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.probe = probe
+        self.state = CLOSED
+        self.failures = 0
+        self.openings = 0
+        self.retry_at = 0
+        self.last_error = None
+        self.last_change = time.time()
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_outage(e):
+                self.record_failure(e)
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.time()
+            if self.state == OPEN and now >= self.retry_at and self.probe is None:
+                self._set_state(HALF_OPEN)
+                return
+            raise CircuitOpenError(self.service, max(self.retry_at - now, 0))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                logging.info(f"{self.service} is reachable again; closing its circuit.")
+                self.openings = 0
+                self._set_state(CLOSED)
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self._open()
+
+    def status(self):
+        with self._lock:
+            return {
+                'service': self.service,
+                'state': self.state,
+                'failures': self.failures,
+                'openings': self.openings,
+                'retry_in': max(self.retry_at - time.time(), 0) if self.state == OPEN else 0,
+                'last_error': self.last_error,
+                'since': self.last_change
+            }
+
+    def _open(self):
+        # Full backoff doubles per failed retry; jitter keeps workers from retrying in lockstep
+        self.openings += 1
+        backoff = min(self.reset_timeout * 2 ** (self.openings - 1), self.max_reset_timeout)
+        delay = random.uniform(backoff / 2, backoff)
+        self.retry_at = time.time() + delay
+        self._set_state(OPEN)
+        logging.warning(f"{self.service} is failing ({self.last_error}); opening its circuit for {delay:.0f}s.")
+
+        if self.probe is not None:
+            timer = threading.Timer(delay, self._run_probe)
+            timer.daemon = True
+            timer.start()
+
+    def _run_probe(self):
+        with self._lock:
+            if self.state != OPEN:
+                return
+            self._set_state(HALF_OPEN)
+        try:
+            self.probe()
+        except Exception as e:
+            self.record_failure(e)
+            return
+        self.record_success()
+
+    def _set_state(self, state):
+        self.state = state
+        self.last_change = time.time()
@@ -0,0 +1,49 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.helpers.tracing import run_in_trace
+from app.helpers.upstream_limiter import UpstreamBusyError
+
+
+class ConcurrentFetcher:
+    """
+    Runs I/O-bound fetches concurrently on a bounded thread pool.
+
+    The fetch function must not touch the database session. Upstream calls
+    made through timed_request or HttpCache take their token and slot from
+    the shared UpstreamLimiter, so the pool stays within each service's budget.
+    """
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+
+    def map(self, func, items):
+        """
+        Call func(item) for every item concurrently.
+
+        Returns:
+            dict: Mapping of item to result. Items whose fetch raised map to None.
+
+        Raises:
+            UpstreamBusyError: If any fetch was refused by the upstream limiter, once all fetches are done.
+        """
+        items = list(dict.fromkeys(items))  # Dedupe while keeping order
+        if not items:
+            return {}
+
+        results = {}
+        busy = None
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            futures = {executor.submit(run_in_trace(func), item): item for item in items}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    results[item] = future.result()
+                except UpstreamBusyError as e:
+                    busy = busy or e
+                except Exception as e:
+                    logging.error(f"Concurrent fetch failed for {item!r}: {e}")
+                    results[item] = None
+        if busy:
+            raise busy  # A refused interactive call must reach the 429 handler, not pass as missing data
+        return results
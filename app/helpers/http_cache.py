@@ -0,0 +1,280 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from app.helpers.metrics import CACHE_LOOKUPS, timed_request
+
+# Query parameters that identify the caller rather than the resource
+UNCACHED_PARAMS = {'api_key', 'apikey'}
+
+# Extracts "<kind>:<id>" from paths such as /3/movie/603/recommendations for targeted invalidation
+RESOURCE_PATTERN = re.compile(r'/(movie|tv)/(\d+)(?:/|$)')
+
+
+class HttpCache:
+    """
+    Disk-backed cache for JSON HTTP GET responses, stored in SQLite.
+
+    - Per-endpoint TTLs, chosen by the first regex in ttl_rules matching the URL path.
+    - Expired entries are revalidated with If-None-Match / If-Modified-Since, so an
+      unchanged resource costs a 304 instead of a full body.
+    - Entries less than stale_ttl past expiry are served immediately while a
+      background thread revalidates them (stale-while-revalidate).
+    - Size is bounded by max_entries, evicting the least recently used rows.
+
+    The database survives restarts, so a new worker starts with a warm cache.
+    Entries are tagged with the resource they describe (e.g. "movie:603") so a
+    change feed can evict everything cached about one item.
+    """
+
+    _revalidator = ThreadPoolExecutor(max_workers=2, thread_name_prefix='http-cache-revalidate')
+
+    def __init__(self, path, ttl_rules=(), default_ttl=86400, stale_ttl=86400, max_entries=50000, name=None):
+        self.path = path
+        self.name = name or os.path.splitext(os.path.basename(path))[0]  # Label in metrics
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in ttl_rules]
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
+        self._writes_since_eviction = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    resource TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(responses)')}
+            if 'resource' not in columns:  # Caches created before resource tagging
+                conn.execute('ALTER TABLE responses ADD COLUMN resource TEXT')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_resource ON responses(resource)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def _connection(self):
+        """Return this thread's SQLite connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(url, params=None):
+        """Build a cache key from the URL and parameters, ignoring credentials and parameter order."""
+        parts = urlsplit(url)
+        query = parse_qsl(parts.query) + list((params or {}).items())
+        query = sorted((k, str(v)) for k, v in query if k not in UNCACHED_PARAMS)
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+    def ttl_for(self, url):
+        """Return the TTL in seconds for a URL."""
+        path = urlsplit(url).path
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(path):
+                return ttl
+        return self.default_ttl
+
+    def get_json(self, url, params=None, headers=None, timeout=10, before_request=None):
+        """
+        GET a JSON resource through the cache.
+
+        Args:
+            before_request: Optional callable run before any network request
+                (e.g. a rate limiter's acquire), skipped on cache hits.
+
+        Raises:
+            requests.RequestException: When the resource is not cached and the request fails.
+        """
+        key = self.make_key(url, params)
+        cached, value = self._lookup(key, url, params, headers, timeout, before_request)
+        if cached:
+            return value
+        return self._fetch(key, url, params, headers, timeout, before_request, value)
+
+    async def get_json_async(self, url, params=None, headers=None, timeout=10):
+        """
+        Like get_json(), but a cache miss is fetched with the shared async HTTP
+        client. The SQLite reads and writes run on worker threads, off the loop.
+
+        Raises:
+            httpx.HTTPError: When the resource is not cached and the request fails.
+            UpstreamBusyError: When it is not cached and the upstream's budget is used up.
+        """
+        from app.helpers.async_http import async_timed_request
+
+        key = self.make_key(url, params)
+        cached, entry = await asyncio.to_thread(self._lookup, key, url, params, headers, timeout, None)
+        if cached:
+            return entry
+
+        response = await async_timed_request(
+            self.name, 'GET', url, params=params, headers=self._conditional_headers(headers, entry), timeout=timeout
+        )
+        return await asyncio.to_thread(self._handle_response, key, entry, response)
+
+    def _lookup(self, key, url, params, headers, timeout, before_request):
+        """
+        Return (True, data) when the entry can be served from the cache, revalidating
+        it in the background if stale, or (False, expired entry or None) otherwise.
+        """
+        entry = self._load(key)
+        now = time.time()
+
+        if entry:
+            body, etag, last_modified, expires_at, last_access = entry
+            if now < expires_at:
+                CACHE_LOOKUPS.inc(cache=self.name, result='hit')
+                self._touch(key, last_access, now)
+                return True, json.loads(body)
+            if now < expires_at + self.stale_ttl:
+                CACHE_LOOKUPS.inc(cache=self.name, result='stale')
+                self._touch(key, last_access, now)
+                self._schedule_revalidation(key, url, params, headers, timeout, before_request)
+                return True, json.loads(body)
+
+        CACHE_LOOKUPS.inc(cache=self.name, result='miss')
+        return False, entry
+
+    @staticmethod
+    def resource_for(key):
+        """Return the "<kind>:<id>" resource a cache key describes, or None."""
+        match = RESOURCE_PATTERN.search(urlsplit(key).path)
+        return f"{match.group(1)}:{match.group(2)}" if match else None
+
+    def invalidate_resources(self, kind, ids):
+        """Delete every entry cached for the given ids of one kind ("movie" or "tv"). Returns the number removed."""
+        resources = [f"{kind}:{resource_id}" for resource_id in ids]
+        removed = 0
+        with self._connection() as conn:
+            for start in range(0, len(resources), 500):
+                chunk = resources[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                removed += conn.execute(f'DELETE FROM responses WHERE resource IN ({placeholders})', chunk).rowcount
+        return removed
+
+    def get_meta(self, key, default=None):
+        row = self._connection().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def invalidate(self, pattern):
+        """Delete every entry whose key matches a SQL LIKE pattern. Returns the number removed."""
+        with self._connection() as conn:
+            return conn.execute('DELETE FROM responses WHERE key LIKE ?', (pattern,)).rowcount
+
+    def _load(self, key):
+        try:
+            return self._connection().execute(
+                'SELECT body, etag, last_modified, expires_at, last_access FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"HTTP cache read failed: {e}")
+            return None
+
+    def _touch(self, key, last_access, now):
+        # Only record access once a minute per entry to keep hits from turning into writes
+        if now - last_access < 60:
+            return
+        try:
+            with self._connection() as conn:
+                conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            logging.warning(f"HTTP cache update failed: {e}")
+
+    def _fetch(self, key, url, params, headers, timeout, before_request, entry=None):
+        if before_request:
+            before_request()
+        response = timed_request(
+            self.name, 'GET', url, params=params, headers=self._conditional_headers(headers, entry), timeout=timeout
+        )
+        return self._handle_response(key, entry, response)
+
+    @staticmethod
+    def _conditional_headers(headers, entry):
+        request_headers = dict(headers or {})
+        if entry:
+            if entry[1]:
+                request_headers['If-None-Match'] = entry[1]
+            if entry[2]:
+                request_headers['If-Modified-Since'] = entry[2]
+        return request_headers
+
+    def _handle_response(self, key, entry, response):
+        """Store a response (a requests or httpx one) and return its data; a 304 renews the cached entry."""
+        now = time.time()
+        if response.status_code == 304 and entry:
+            self._store(key, entry[0], entry[1], entry[2], now)
+            return json.loads(entry[0])
+
+        response.raise_for_status()
+        data = response.json()
+        self._store(key, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'), now)
+        return data
+
+    def _store(self, key, body, etag, last_modified, now):
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, body, etag, last_modified, stored_at, expires_at, last_access, resource) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (key, body, etag, last_modified, now, now + self.ttl_for(key), now, self.resource_for(key))
+                )
+            self._writes_since_eviction += 1
+            if self._writes_since_eviction >= 100:
+                self._writes_since_eviction = 0
+                self._evict()
+        except sqlite3.Error as e:
+            logging.warning(f"HTTP cache write failed: {e}")
+
+    def _evict(self):
+        """Trim the cache to 90% of max_entries, least recently used first."""
+        with self._connection() as conn:
+            count = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            excess = count - int(self.max_entries * 0.9)
+            if count > self.max_entries and excess > 0:
+                conn.execute(
+                    'DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access LIMIT ?)',
+                    (excess,)
+                )
+                logging.info(f"HTTP cache evicted {excess} least recently used entries from {self.path}")
+
+    def _schedule_revalidation(self, key, url, params, headers, timeout, before_request):
+        with self._revalidating_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def revalidate():
+            try:
+                self._fetch(key, url, params, headers, timeout, before_request, self._load(key))
+            except Exception as e:
+                logging.warning(f"Background revalidation failed for {key}: {e}")
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(key)
+
+        self._revalidator.submit(revalidate)
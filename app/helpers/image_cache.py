@@ -0,0 +1,247 @@
+import hashlib
+import io
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from config import Config
+from app.helpers.metrics import timed_request
+
+try:
+    from PIL import Image  # Optional: used to shrink images from hosts without sized URLs
+except ImportError:
+    Image = None
+
+# Only these hosts are proxied, so the route can't be used to fetch arbitrary URLs
+ALLOWED_IMAGE_HOSTS = {'image.tmdb.org', 'i.scdn.co', 'mosaic.scdn.co'}
+
+# Variant name -> (TMDb size segment, max width in pixels)
+IMAGE_VARIANTS = {
+    'thumb': ('w185', 185),
+    'full': ('w500', 500),
+}
+
+TMDB_SIZE_PATTERN = re.compile(r'^/t/p/[^/]+/')
+CONTENT_TYPE_EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp', 'image/gif': 'gif'}
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    """Return the process-wide poster image cache, creating it on first use."""
+    global _image_cache
+    if _image_cache is None:
+        with _image_cache_lock:
+            if _image_cache is None:
+                config = Config()
+                _image_cache = ImageCache(os.path.join(config.CACHE_DIR, 'images'), config.IMAGE_CACHE_MAX_BYTES)
+    return _image_cache
+
+
+class ImageCache:
+    """
+    Disk cache for poster images from TMDb and Spotify.
+
+    Image bytes are stored content-addressed (blobs/<sha256[:2]>/<sha256>.<ext>),
+    so the same picture referenced by several URLs is stored once and its
+    digest doubles as a strong ETag. An SQLite index maps (source URL,
+    variant) to a blob and records last access; once the blobs exceed
+    max_bytes the least recently used are deleted.
+
+    The 'thumb' variant is list-sized: TMDb URLs are rewritten to TMDb's own
+    w185 rendition, other hosts are resized locally when Pillow is installed.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = os.path.abspath(directory)  # send_file resolves relative paths against the app root
+        self.blob_directory = os.path.join(self.directory, 'blobs')
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._fetch_locks = {}
+        self._fetch_locks_lock = threading.Lock()
+        self._writes_since_eviction = 0
+
+        os.makedirs(self.blob_directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS images (
+                    url TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    content_type TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (url, variant)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_images_last_access ON images(last_access)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_images_digest ON images(digest)')
+
+    def _connection(self):
+        """Return this thread's SQLite connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'), timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def is_allowed(url):
+        parts = urlsplit(url or '')
+        return parts.scheme in ('http', 'https') and parts.hostname in ALLOWED_IMAGE_HOSTS
+
+    @staticmethod
+    def source_url(url, variant):
+        """Return the URL to download for a variant; TMDb serves pre-sized renditions."""
+        parts = urlsplit(url)
+        if parts.hostname == 'image.tmdb.org' and TMDB_SIZE_PATTERN.match(parts.path):
+            return f"https://image.tmdb.org{TMDB_SIZE_PATTERN.sub(f'/t/p/{IMAGE_VARIANTS[variant][0]}/', parts.path)}"
+        return url
+
+    def blob_path(self, digest, content_type):
+        return os.path.join(self.blob_directory, digest[:2], f"{digest}.{CONTENT_TYPE_EXTENSIONS.get(content_type, 'img')}")
+
+    def lookup(self, url, variant):
+        """Return (path, digest, content_type) for a cached image, or None."""
+        row = self._connection().execute(
+            'SELECT digest, content_type, last_access FROM images WHERE url = ? AND variant = ?', (url, variant)
+        ).fetchone()
+        if not row:
+            return None
+        digest, content_type, last_access = row
+        path = self.blob_path(digest, content_type)
+        if not os.path.exists(path):
+            return None
+
+        now = time.time()
+        if now - last_access >= 60:  # Record access at most once a minute per image
+            with self._connection() as conn:
+                conn.execute('UPDATE images SET last_access = ? WHERE url = ? AND variant = ?', (now, url, variant))
+        return path, digest, content_type
+
+    def get(self, url, variant='thumb'):
+        """
+        Return (path, digest, content_type) for an image, downloading it on first use.
+
+        Returns None if the URL is not allowed or the image could not be fetched.
+        """
+        if variant not in IMAGE_VARIANTS or not self.is_allowed(url):
+            return None
+
+        cached = self.lookup(url, variant)
+        if cached:
+            return cached
+
+        # One download per image even if a page requests it several times at once
+        with self._fetch_locks_lock:
+            lock = self._fetch_locks.setdefault((url, variant), threading.Lock())
+        with lock:
+            try:
+                return self.lookup(url, variant) or self._download(url, variant)
+            finally:
+                with self._fetch_locks_lock:
+                    self._fetch_locks.pop((url, variant), None)
+
+    def is_cached(self, url, variant='thumb'):
+        return self._connection().execute(
+            'SELECT 1 FROM images WHERE url = ? AND variant = ?', (url, variant)
+        ).fetchone() is not None
+
+    def _download(self, url, variant):
+        source = self.source_url(url, variant)
+        try:
+            with timed_request('images', 'GET', source, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+                if content_type not in CONTENT_TYPE_EXTENSIONS:
+                    logging.warning(f"Not caching {source}: unexpected content type '{content_type}'")
+                    return None
+                body = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+            if len(body) > MAX_IMAGE_BYTES:
+                logging.warning(f"Not caching {source}: image larger than {MAX_IMAGE_BYTES} bytes")
+                return None
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error fetching image {source}: {e}")
+            return None
+
+        if source == url:
+            body, content_type = self._resize(body, content_type, IMAGE_VARIANTS[variant][1])
+
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.blob_path(digest, content_type)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(body)
+            os.replace(temp_path, path)
+
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO images (url, variant, digest, content_type, size, stored_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, variant, digest, content_type, len(body), now, now)
+            )
+
+        self._writes_since_eviction += 1
+        if self._writes_since_eviction >= 50:
+            self._writes_since_eviction = 0
+            self.evict()
+        return path, digest, content_type
+
+    @staticmethod
+    def _resize(body, content_type, max_width):
+        """Shrink an image to max_width with Pillow, if available. Returns (body, content_type)."""
+        if Image is None:
+            return body, content_type
+        try:
+            with Image.open(io.BytesIO(body)) as image:
+                if image.width <= max_width:
+                    return body, content_type
+                image.thumbnail((max_width, max_width * 3))
+                output = io.BytesIO()
+                image.convert('RGB').save(output, format='JPEG', quality=85, optimize=True)
+                return output.getvalue(), 'image/jpeg'
+        except Exception as e:
+            logging.warning(f"Could not resize image, storing original: {e}")
+            return body, content_type
+
+    def evict(self):
+        """Delete least recently used images until the blobs fit in 90% of max_bytes."""
+        conn = self._connection()
+        blobs = conn.execute(
+            'SELECT digest, content_type, MAX(size), MAX(last_access) FROM images GROUP BY digest ORDER BY MAX(last_access)'
+        ).fetchall()
+        total = sum(size for _, _, size, _ in blobs)
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        evicted = []
+        for digest, content_type, size, _ in blobs:
+            if total <= target:
+                break
+            try:
+                os.remove(self.blob_path(digest, content_type))
+            except FileNotFoundError:
+                pass
+            evicted.append(digest)
+            total -= size
+
+        with conn:
+            for start in range(0, len(evicted), 500):
+                chunk = evicted[start:start + 500]
+                conn.execute(f"DELETE FROM images WHERE digest IN ({','.join('?' * len(chunk))})", chunk)
+        logging.info(f"Image cache evicted {len(evicted)} least recently used images from {self.directory}")
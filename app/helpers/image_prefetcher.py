@@ -0,0 +1,46 @@
+import json
+import logging
+from app.models import Recommendation, MediaRecommendation, Request
+from app.helpers.image_cache import get_image_cache
+from app.helpers.concurrent_fetcher import ConcurrentFetcher
+
+
+class ImagePrefetcher:
+    """
+    Warms the image cache with thumbnails for the newest recommendations and requests,
+    so list pages are served from disk instead of waiting on TMDb or Spotify.
+    """
+
+    def __init__(self, limit=500, max_workers=4):
+        self.cache = get_image_cache()
+        self.limit = limit
+        self.max_workers = max_workers
+
+    def collect_urls(self):
+        """Return poster URLs of recent recommendations and requests, newest first, without duplicates."""
+        urls = [url for (url,) in MediaRecommendation.query.with_entities(MediaRecommendation.thumbnail_url)
+                .filter(MediaRecommendation.thumbnail_url.isnot(None))
+                .order_by(MediaRecommendation.refreshed_at.desc()).limit(self.limit)]
+        urls.extend(url for (url,) in Recommendation.query.with_entities(Recommendation.thumbnail_url)
+                    .filter(Recommendation.thumbnail_url.isnot(None))
+                    .order_by(Recommendation.id.desc()).limit(self.limit))
+
+        for (classification_data,) in Request.query.with_entities(Request.classification_data).filter(
+                Request.classification_data.isnot(None)).order_by(Request.id.desc()).limit(self.limit):
+            try:
+                urls.append(json.loads(classification_data).get('poster_url'))
+            except (TypeError, ValueError, AttributeError):
+                continue
+
+        return list(dict.fromkeys(url for url in urls if url and self.cache.is_allowed(url)))
+
+    def run(self):
+        """Download thumbnails that are not cached yet. Returns the number fetched."""
+        missing = [url for url in self.collect_urls() if not self.cache.is_cached(url, 'thumb')]
+        if not missing:
+            return 0
+
+        fetched = ConcurrentFetcher(max_workers=self.max_workers).map(lambda url: self.cache.get(url, 'thumb'), missing)
+        stored = sum(1 for result in fetched.values() if result)
+        logging.info(f"Image prefetch stored {stored}/{len(missing)} thumbnails.")
+        return stored
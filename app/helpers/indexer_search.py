@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import httpx
+import requests
+
+from config import Config
+from app.helpers.circuit_breaker import get_circuit_breaker, http_probe, CircuitOpenError
+from app.helpers.async_http import async_timed_request, async_timed_stream, iter_from_thread
+from app.helpers.metrics import timed_request
+from app.helpers.tracing import run_in_trace
+from app.helpers.release_parser import parse_release, select_releases
+from app.helpers.torznab_stream import iter_torznab_results, CHUNK_SIZE
+
+# How long the list of configured indexers is reused before asking Jackett again
+INDEXER_LIST_TTL = 600
+# Weight of the newest sample in each indexer's latency moving average
+LATENCY_ALPHA = 0.3
+# Consecutive failures after which an indexer is treated as slow
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+class IndexerStats:
+    """Thread-safe moving-average latency and failure counts per Jackett indexer."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, indexer_id, latency, ok):
+        with self._lock:
+            stats = self._stats.setdefault(indexer_id, {'latency': latency, 'failures': 0, 'searches': 0})
+            stats['latency'] = LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * stats['latency']
+            stats['failures'] = 0 if ok else stats['failures'] + 1
+            stats['searches'] += 1
+
+    def is_slow(self, indexer_id, slow_after):
+        with self._lock:
+            stats = self._stats.get(indexer_id)
+        return bool(stats) and (stats['latency'] > slow_after or stats['failures'] >= MAX_CONSECUTIVE_FAILURES)
+
+    def snapshot(self):
+        with self._lock:
+            return {indexer_id: dict(stats) for indexer_id, stats in self._stats.items()}
+
+
+class IndexerSearch:
+    """
+    Queries each configured Jackett indexer separately and concurrently.
+
+    Jackett's aggregate /indexers/all endpoint answers only once its slowest
+    indexer has. Here every indexer gets its own request and timeout, results
+    are collected as they arrive, and the search returns as soon as enough
+    usable results (seeded, with a magnet link) are in. Indexers whose average
+    latency or failure streak marks them as slow are only queried as a hedge,
+    when the fast ones have not produced enough results after hedge_delay.
+
+    In 'torznab' search mode each indexer's Torznab XML feed is streamed and
+    parsed item by item instead of loading the JSON results document; only the
+    indexer's best max_results releases are kept, and reading stops once
+    settle_after items in a row have not changed them.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='jackett-indexer')
+    _stats = IndexerStats()
+    _indexers = None
+    _indexers_loaded_at = 0
+    _indexers_lock = threading.Lock()
+    _tasks = set()  # Running async indexer queries; the loop itself only keeps weak references
+
+    def __init__(self, api_url, api_key):
+        config = Config()
+        self.api_url = api_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = config.JACKETT_INDEXER_TIMEOUT
+        self.min_results = config.JACKETT_MIN_RESULTS
+        self.hedge_delay = config.JACKETT_HEDGE_DELAY
+        self.slow_after = config.JACKETT_SLOW_INDEXER_SECONDS
+        self.mode = config.JACKETT_SEARCH_MODE
+        self.max_results = config.JACKETT_MAX_RESULTS
+        self.settle_after = config.JACKETT_TORZNAB_SETTLE_AFTER
+        self.breaker = get_circuit_breaker('jackett', probe=http_probe(
+            f"{self.api_url}/api/v2.0/indexers/all/results/torznab/api", params={'apikey': self.api_key, 't': 'caps'}
+        ))
+
+    def list_indexers(self):
+        """Return [(id, title)] of configured indexers, cached for INDEXER_LIST_TTL seconds."""
+        with self._indexers_lock:
+            if IndexerSearch._indexers is not None and time.time() - IndexerSearch._indexers_loaded_at < INDEXER_LIST_TTL:
+                return IndexerSearch._indexers
+
+            try:
+                response = timed_request(
+                    'jackett', 'GET', f"{self.api_url}/api/v2.0/indexers/all/results/torznab/api",
+                    params={'apikey': self.api_key, 't': 'indexers', 'configured': 'true'},
+                    timeout=10
+                )
+                response.raise_for_status()
+                root = ET.fromstring(response.content)
+                IndexerSearch._indexers = [
+                    (element.get('id'), element.findtext('title') or element.get('id'))
+                    for element in root.iter('indexer') if element.get('id')
+                ]
+                IndexerSearch._indexers_loaded_at = time.time()
+            except (requests.RequestException, ET.ParseError) as e:
+                logging.warning(f"Could not list Jackett indexers: {e}")
+
+            return IndexerSearch._indexers or []
+
+    @classmethod
+    def indexer_stats(cls):
+        return cls._stats.snapshot()
+
+    def search(self, query, category_id, category="Movies"):
+        """
+        Search every indexer for a query.
+
+        Returns:
+            list: Usable releases (parsed Release records) from the indexers that
+                answered in time, or None if no indexer answered at all or
+                Jackett's circuit is open.
+        """
+        plan = self._plan(query, self.list_indexers())
+        if plan is None:
+            return None
+        fast, slow = plan
+
+        start = time.monotonic()
+        deadline = start + self.timeout
+        pending = {self._executor.submit(run_in_trace(self._query_indexer), indexer_id, query, category_id, category): indexer_id for indexer_id in fast}
+        hedged = not slow
+        results = []
+        good_results = 0
+        answered = 0
+
+        while pending:
+            wait_until = deadline if hedged else min(deadline, start + self.hedge_delay)
+            done, _ = wait(pending, timeout=max(wait_until - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                indexer_results = future.result()
+                if indexer_results is None:
+                    continue
+                answered += 1
+                results.extend(indexer_results)
+                good_results += len(indexer_results)
+
+            if good_results >= self.min_results or time.monotonic() >= deadline:
+                break
+            if not hedged and (time.monotonic() >= start + self.hedge_delay or not pending):
+                hedged = True
+                logging.info(f"Hedging Jackett search '{query}' with {len(slow)} slow indexers.")
+                pending.update({self._executor.submit(run_in_trace(self._query_indexer), indexer_id, query, category_id, category): indexer_id for indexer_id in slow})
+
+        return self._finish(query, results, answered, len(fast) + (len(slow) if hedged else 0), start, pending.values())
+
+    async def search_async(self, query, category_id, category="Movies"):
+        """
+        Async variant of search: indexers are queried as tasks on the shared
+        event loop instead of on the indexer thread pool.
+        """
+        # The indexer list is cached; only a refresh blocks, so it runs off the loop
+        plan = self._plan(query, await asyncio.to_thread(self.list_indexers))
+        if plan is None:
+            return None
+        fast, slow = plan
+
+        start = time.monotonic()
+        deadline = start + self.timeout
+        pending = {self._spawn(self._query_indexer_async(indexer_id, query, category_id, category)): indexer_id for indexer_id in fast}
+        hedged = not slow
+        results = []
+        good_results = 0
+        answered = 0
+
+        while pending:
+            wait_until = deadline if hedged else min(deadline, start + self.hedge_delay)
+            done, _ = await asyncio.wait(pending, timeout=max(wait_until - time.monotonic(), 0), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.pop(task)
+                indexer_results = task.result()
+                if indexer_results is None:
+                    continue
+                answered += 1
+                results.extend(indexer_results)
+                good_results += len(indexer_results)
+
+            if good_results >= self.min_results or time.monotonic() >= deadline:
+                break
+            if not hedged and (time.monotonic() >= start + self.hedge_delay or not pending):
+                hedged = True
+                logging.info(f"Hedging Jackett search '{query}' with {len(slow)} slow indexers.")
+                pending.update({self._spawn(self._query_indexer_async(indexer_id, query, category_id, category)): indexer_id for indexer_id in slow})
+
+        return self._finish(query, results, answered, len(fast) + (len(slow) if hedged else 0), start, pending.values())
+
+    @classmethod
+    def _spawn(cls, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+        return task
+
+    def _plan(self, query, indexers):
+        """Split the indexers into (fast, slow), or return None if Jackett's circuit is open."""
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            logging.warning(f"Skipping Jackett search '{query}': {e}")
+            return None
+
+        # Fall back to the aggregate endpoint when the indexer list is unavailable
+        indexers = [indexer_id for indexer_id, _ in indexers] or ['all']
+        fast = [indexer_id for indexer_id in indexers if not self._stats.is_slow(indexer_id, self.slow_after)]
+        slow = [indexer_id for indexer_id in indexers if indexer_id not in fast]
+        if not fast:
+            fast, slow = slow, []
+        return fast, slow
+
+    def _finish(self, query, results, answered, queried, start, pending):
+        logging.info(
+            f"Jackett search '{query}': {len(results)} usable results from "
+            f"{answered}/{queried} indexers in {time.monotonic() - start:.1f}s"
+        )
+        if pending:
+            # Stragglers keep running in the background and still update the latency stats
+            logging.debug(f"Not waiting for indexers: {', '.join(pending)}")
+        if answered:
+            self.breaker.record_success()
+            return results
+        self.breaker.record_failure(f"no indexer answered within {self.timeout}s")
+        return None
+
+    def _query_indexer(self, indexer_id, query, category_id, category):
+        """Return one indexer's usable releases, or None if it failed or timed out."""
+        start = time.monotonic()
+        try:
+            if self.mode == 'torznab':
+                results = self._query_torznab(indexer_id, query, category_id, category)
+            else:
+                response = timed_request(
+                    'jackett', 'GET', f"{self.api_url}/api/v2.0/indexers/{indexer_id}/results",
+                    params={'apikey': self.api_key, 'Query': query, 'Category[]': category_id},
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                results = [release for release in map(parse_release, response.json().get('Results', [])) if release]
+        except (requests.RequestException, ValueError, ET.ParseError) as e:
+            self._stats.record(indexer_id, time.monotonic() - start, ok=False)
+            logging.warning(f"Jackett indexer '{indexer_id}' failed for '{query}': {e}")
+            return None
+
+        self._stats.record(indexer_id, time.monotonic() - start, ok=True)
+        return results
+
+    def _query_torznab(self, indexer_id, query, category_id, category):
+        """Stream one indexer's Torznab feed, keeping only its best releases."""
+        with timed_request(
+            'jackett', 'GET', f"{self.api_url}/api/v2.0/indexers/{indexer_id}/results/torznab/api",
+            params={'apikey': self.api_key, 't': 'search', 'q': query, 'cat': category_id},
+            timeout=self.timeout,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            return self._select_torznab(response.iter_content(chunk_size=CHUNK_SIZE), category)
+
+    def _select_torznab(self, chunks, category):
+        """Parse a Torznab feed chunk by chunk, keeping only its best releases and stopping once they settle."""
+        items = iter_torznab_results(chunks)
+        selected = select_releases(
+            map(parse_release, items), category, self.max_results, settle_after=self.settle_after
+        )
+        return [release for _, release in selected]
+
+    async def _query_indexer_async(self, indexer_id, query, category_id, category):
+        start = time.monotonic()
+        try:
+            if self.mode == 'torznab':
+                async with async_timed_stream(
+                    'jackett', 'GET', f"{self.api_url}/api/v2.0/indexers/{indexer_id}/results/torznab/api",
+                    params={'apikey': self.api_key, 't': 'search', 'q': query, 'cat': category_id},
+                    timeout=self.timeout
+                ) as response:
+                    response.raise_for_status()
+                    # The loop reads the feed chunk by chunk while a worker thread parses it, as the sync path does
+                    chunks = iter_from_thread(response.aiter_bytes(CHUNK_SIZE), asyncio.get_running_loop())
+                    results = await asyncio.to_thread(self._select_torznab, chunks, category)
+            else:
+                response = await async_timed_request(
+                    'jackett', 'GET', f"{self.api_url}/api/v2.0/indexers/{indexer_id}/results",
+                    params={'apikey': self.api_key, 'Query': query, 'Category[]': category_id},
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                results = [release for release in map(parse_release, response.json().get('Results', [])) if release]
+        except (httpx.HTTPError, ValueError, ET.ParseError) as e:
+            self._stats.record(indexer_id, time.monotonic() - start, ok=False)
+            logging.warning(f"Jackett indexer '{indexer_id}' failed for '{query}': {e}")
+            return None
+
+        self._stats.record(indexer_id, time.monotonic() - start, ok=True)
+        return results
@@ -3,30 +3,19 @@ import re
 import logging
 import time
 from config import Config
-from logging.handlers import RotatingFileHandler
-from datetime import datetime
-import os
-
-# Configure logging
-LOG_DIR = "./logs"
-os.makedirs(LOG_DIR, exist_ok=True)  # Ensure the logs directory exists
-LOG_FILE = os.path.join(LOG_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_warnings.log")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        RotatingFileHandler(LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=5),  # Rotate logs
-    ],
-)
+from app.helpers.indexer_search import IndexerSearch
+from app.helpers.search_cache import get_search_cache
+from app.helpers.release_parser import select_releases, release_to_result
+from app.helpers.query_planner import QueryPlanner
 
 class JackettHelper:
     def __init__(self):
         config = Config()
         self.api_url = config.JACKETT_API_URL
         self.api_key = config.JACKETT_API_KEY
-        self.failed_search_cache = {}
+        self.search_cache = get_search_cache()
+        self.max_results = config.JACKETT_MAX_RESULTS
+        self.good_score = config.JACKETT_GOOD_SCORE
         self.categories = {
             "Movies": 2000,
             "TV": 5000,
@@ -77,91 +66,86 @@ class JackettHelper:
             category (str): Category of search (e.g., "Movies", "TV", "Music").
 
         Returns:
-            list: A list of sorted results with seeders and magnet URIs.
+            list: Results ranked by release quality and seeders, each with title, seeders and magnet URI.
         """
         logging.info(f"Searching Jackett for: {query} in category: {category}")
+        if not self.api_url:
+            logging.error("Jackett is not configured; skipping search.")
+            return []
 
         # Format the query
         formatted_query = self.format_query(query, category)
-        if formatted_query in self.failed_search_cache:
-            logging.info(f"Skipping search for '{formatted_query}' (cached as failed).")
+
+        # The formatted query runs alongside variants without year/resolution and TMDb alternative titles
+        results = QueryPlanner(self.good_score).run(query, category, formatted_query, lambda variant: self._cached_search(variant, category))
+        return results[:self.max_results]
+
+    async def search_jackett_async(self, query, category="Movies"):
+        """Async variant of search_jackett."""
+        logging.info(f"Searching Jackett for: {query} in category: {category}")
+        if not self.api_url:
+            logging.error("Jackett is not configured; skipping search.")
+            return []
+
+        formatted_query = self.format_query(query, category)
+        results = await QueryPlanner(self.good_score).run_async(
+            query, category, formatted_query, lambda variant: self._cached_search_async(variant, category)
+        )
+        return results[:self.max_results]
+
+    def _cached_search(self, formatted_query, category):
+        # Shared by every JackettHelper in the process (or every worker, with Redis)
+        return self.search_cache.get_or_search(
+            formatted_query, category, lambda: self._search_indexers(formatted_query, category)
+        )
+
+    async def _cached_search_async(self, formatted_query, category):
+        return await self.search_cache.get_or_search_async(
+            formatted_query, category, lambda: self._search_indexers_async(formatted_query, category)
+        )
+
+    def _search_indexers(self, formatted_query, category):
+        """
+        Run an uncached search.
+
+        Returns:
+            list: Ranked results, best first, or None if Jackett could not be searched.
+        """
+        # Indexers are queried individually and concurrently; slow ones can't hold up the search
+        results = IndexerSearch(self.api_url, self.api_key).search(
+            formatted_query, self.categories.get(category, 2000), category  # Default to "Movies" category
+        )
+        return self._rank_results(formatted_query, category, results)
+
+    async def _search_indexers_async(self, formatted_query, category):
+        results = await IndexerSearch(self.api_url, self.api_key).search_async(
+            formatted_query, self.categories.get(category, 2000), category
+        )
+        return self._rank_results(formatted_query, category, results)
+
+    def _rank_results(self, formatted_query, category, results):
+        if results is None:
+            logging.error(f"No Jackett indexer answered for query: {formatted_query}")
+            return None
+        if not results:
+            logging.warning(f"No results found for query: {formatted_query}.")
             return []
 
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # Build request URL and parameters
-                url = f"{self.api_url}/api/v2.0/indexers/all/results"
-                params = {
-                    'apikey': self.api_key,
-                    'Query': formatted_query,
-                    'Category[]': self.categories.get(category, 2000)  # Default to "Movies" category
-                }
-
-                # Send the request to Jackett
-                logging.info(f"Sending request to Jackett: {url}")
-                response = requests.get(url, params=params, timeout=10)  # Add a timeout
-                response.raise_for_status()
-
-                # Parse the response
-                data = response.json()
-                results = data.get('Results', [])
-                if not results:
-                    logging.warning(f"No results found for query: {formatted_query}.")
-                    self.failed_search_cache[formatted_query] = time.time()
-                    return []
-
-                # Filter and sort results by seeders and ensure valid magnet links
-                valid_results = [
-                    {
-                        'title': result.get('Title', 'Unknown Title'),
-                        'seeders': result.get('Seeders', 0),
-                        'magnet': result.get('MagnetUri')
-                    }
-                    for result in results
-                    if result.get('Seeders', 0) > 0 and result.get('MagnetUri')
-                ]
-                sorted_results = sorted(valid_results, key=lambda r: r['seeders'], reverse=True)
-
-                if not sorted_results:
-                    logging.warning(f"No suitable results with seeders found for query: {formatted_query}.")
-                    self.failed_search_cache[formatted_query] = time.time()
-                    return []
-
-                # Filter for English torrents and log results
-                logging.info(f"Results found: {len(sorted_results)}")
-                english_results = []
-                for result in sorted_results:
-                    # Skip non-English versions (Cyrillic, Chinese, etc.)
-                    title = result['title']
-                    # Check for Cyrillic characters
-                    has_cyrillic = any(ord(char) >= 0x0400 and ord(char) <= 0x04FF for char in title)
-                    # Check for Russian audio indicators in brackets
-                    is_russian_audio = ('MVO' in title or 'AVO' in title or 'DVO' in title or 'ПО' in title) and ('[' in title and ']' in title)
-                    
-                    if has_cyrillic or is_russian_audio:
-                        logging.info(f"Skipping non-English version: {title}")
-                        continue
-                    
-                    try:
-                        logging.info(
-                            f"Title: {title} | Seeders: {result['seeders']}"
-                        )
-                    except UnicodeEncodeError:
-                        pass
-                    
-                    english_results.append(result)
-                
-                logging.info(f"English torrents available: {len(english_results)}")
-                return english_results
-
-            except requests.RequestException as e:
-                logging.error(f"Request error on attempt {attempt + 1}/{max_retries} for query '{formatted_query}': {e}")
-                time.sleep(2 ** attempt)  # Exponential backoff for retries
-
-            except Exception as e:
-                logging.error(f"Unexpected error during search for query '{formatted_query}': {e}", exc_info=True)
-                break
-
-        logging.error(f"All attempts to contact Jackett failed for query: {formatted_query}")
-        return []
\ No newline at end of file
+        try:
+            # Drop non-English releases, dedupe across indexers and keep the best
+            ranked = select_releases(results, category, limit=self.max_results)
+            if not ranked:
+                logging.warning(f"No suitable English results with seeders found for query: {formatted_query}.")
+                return []
+
+            english_results = []
+            for score, release in ranked:
+                logging.debug(f"Title: {release.title} | Seeders: {release.seeders} | Score: {score:.1f}")
+                english_results.append(release_to_result(release, score))
+
+            logging.info(f"English torrents available: {len(english_results)} of {len(results)} results")
+            return english_results
+
+        except Exception as e:
+            logging.error(f"Unexpected error during search for query '{formatted_query}': {e}", exc_info=True)
+            return None
\ No newline at end of file
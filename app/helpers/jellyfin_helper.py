@@ -1,13 +1,11 @@
-import requests
 import logging
 from config import Config
+from app.helpers.circuit_breaker import guarded_request, get_circuit_breaker, http_probe
 from app.models import db, Media
 from datetime import datetime
 import sqlite3
 import re
 
-logging.basicConfig(level=logging.INFO)
-
 def parse_jellyfin_date(date_string):
     """Parse Jellyfin datetime strings that may have 7 fractional second digits"""
     if not date_string:
@@ -31,6 +29,8 @@ class JellyfinHelper:
             logging.warning("Jellyfin configuration is missing 'server_url' or 'api_key'.")
             self.server_url = None
             self.api_key = None
+        else:
+            get_circuit_breaker('jellyfin', probe=http_probe(f"{self.server_url}/System/Info/Public"))
     
     def get_media_items(self, media_type='Movie'):
         """Fetch all media items of a specific type from Jellyfin."""
@@ -54,7 +54,7 @@ class JellyfinHelper:
         }
         
         try:
-            response = requests.get(endpoint, params=params)
+            response = guarded_request('jellyfin', 'GET', endpoint, params=params)
             response.raise_for_status()
             data = response.json()
             
@@ -1,6 +1,9 @@
 import logging
 import requests # For type hinting and eventual use
 from config import Config
+from app.helpers.circuit_breaker import guarded_request, get_circuit_breaker, http_probe
+from app.helpers.metrics import timed_request
+from app.helpers.upstream_limiter import UpstreamBusyError
 import time
 
 class LidarrHelper:
@@ -12,6 +15,10 @@ class LidarrHelper:
 
         if not self.api_url or not self.api_key:
             self.logger.warning("Lidarr API URL or API Key is not configured. LidarrHelper may not function.")
+        else:
+            get_circuit_breaker('lidarr', probe=http_probe(
+                f"{self.api_url.rstrip('/')}/api/v1/system/status", headers={'X-Api-Key': self.api_key}
+            ))
 
     def check_artist_exists(self, artist_name):
         """
@@ -30,7 +37,7 @@ class LidarrHelper:
             search_params = {'term': artist_name}
             
             try:
-                search_response = requests.get(search_endpoint, params=search_params, headers=headers, timeout=10)
+                search_response = guarded_request('lidarr', 'GET', search_endpoint, params=search_params, headers=headers)
                 search_response.raise_for_status()
                 search_results = search_response.json()
                 
@@ -41,7 +48,7 @@ class LidarrHelper:
                     
                     # Now check if this MusicBrainz ID already exists in library
                     endpoint = f"{self.api_url.rstrip('/')}/api/v1/artist"
-                    response = requests.get(endpoint, headers=headers, timeout=10)
+                    response = guarded_request('lidarr', 'GET', endpoint, headers=headers)
                     response.raise_for_status()
                     artists = response.json()
                     
@@ -58,7 +65,7 @@ class LidarrHelper:
             
             # Fallback: Check by name (fuzzy match)
             endpoint = f"{self.api_url.rstrip('/')}/api/v1/artist"
-            response = requests.get(endpoint, headers=headers, timeout=10)
+            response = guarded_request('lidarr', 'GET', endpoint, headers=headers)
             response.raise_for_status()
             artists = response.json()
             
@@ -90,12 +97,10 @@ class LidarrHelper:
         headers = {'X-Api-Key': self.api_key}
 
         try:
-            response = requests.get(endpoint, headers=headers)
+            response = guarded_request('lidarr', 'GET', endpoint, headers=headers)
             response.raise_for_status()
             folders = response.json()
-            self.logger.info(f"Found {len(folders)} root folders in Lidarr")
-            for folder in folders:
-                self.logger.info(f"  - {folder.get('path')}")
+            self.logger.info(f"Found {len(folders)} root folders in Lidarr: {', '.join(str(folder.get('path')) for folder in folders)}")
             return folders
         except Exception as e:
             self.logger.error(f"Error getting root folders from Lidarr: {e}")
@@ -120,7 +125,7 @@ class LidarrHelper:
                 'limit': 5
             }
             
-            response = requests.get(url, params=params, headers=headers, timeout=10)
+            response = timed_request('musicbrainz', 'GET', url, params=params, headers=headers, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -135,6 +140,8 @@ class LidarrHelper:
                 self.logger.warning(f"No MusicBrainz results for artist: {artist_name}")
                 return None
                 
+        except UpstreamBusyError:
+            raise
         except Exception as e:
             self.logger.error(f"Error searching MusicBrainz for artist '{artist_name}': {e}")
             return None
@@ -177,7 +184,7 @@ class LidarrHelper:
         musicbrainz_id = None
         
         try:
-            response = requests.get(search_endpoint, params=search_params, headers=headers, timeout=10)
+            response = guarded_request('lidarr', 'GET', search_endpoint, params=search_params, headers=headers)
             response.raise_for_status()
             search_results = response.json()
             
@@ -226,7 +233,7 @@ class LidarrHelper:
         self.logger.info(f"Lidarr add_artist payload: {payload}")
         
         try:
-            response = requests.post(add_endpoint, json=payload, headers=headers, timeout=10)
+            response = guarded_request('lidarr', 'POST', add_endpoint, json=payload, headers=headers)
             response.raise_for_status()
             self.logger.info(f"Artist '{artist_name}' added to Lidarr successfully. Response: {response.json()}")
             return True
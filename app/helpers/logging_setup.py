@@ -0,0 +1,185 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, has_request_context, request
+
+from config import Config
+
+LOG_DIR = "./logs"
+LOG_FILE = os.path.join(LOG_DIR, "app.log")
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - [%(request_id)s] %(message)s"
+# Default number of messages per key and minute that log_sampled lets through
+SAMPLE_PER_MINUTE = 30
+# Request ids taken from a client's X-Request-ID; anything else is replaced, as it is logged and echoed back
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+_listener = None
+_listener_lock = threading.Lock()
+_sampled = {}
+_sampled_lock = threading.Lock()
+
+
+def current_request_id():
+    """Return the id of the request being handled, or '-' outside of a request."""
+    if has_request_context():
+        return g.get('request_id', '-')
+    return '-'
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps each record with the current request id while still on the request thread."""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = current_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+            'thread': record.threadName,
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread through a bounded queue.
+
+    Only the message is merged on the calling thread; formatting and all I/O
+    happen on the listener. When the queue is full the record is dropped and
+    counted instead of blocking the caller, and the count is reported once the
+    backlog has drained.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            # Report drops once the backlog has halved, not with every record that squeezes in
+            if self.dropped and self.queue.qsize() < self.queue.maxsize // 2:
+                dropped, self.dropped = self.dropped, 0
+                notice = logging.makeLogRecord({
+                    'name': 'logging', 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"Log queue full; dropped {dropped} records.", 'request_id': '-'
+                })
+                self.queue.put_nowait(notice)
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging():
+    """
+    Route all logging through one queue to a console and a rotating file handler.
+
+    create_app() calls it first thing, so the web workers, the scheduler and
+    the scripts all log the same way. Records are written by a background
+    listener thread, so logging never waits on disk or a terminal. Later
+    calls return without changing anything.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+
+        config = Config()
+        if config.LOG_FORMAT == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(TEXT_FORMAT)
+
+        os.makedirs(LOG_DIR, exist_ok=True)
+        handlers = [logging.StreamHandler(), RotatingFileHandler(LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=5)]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        queue_handler = DroppingQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE))
+        queue_handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(config.LOG_LEVEL)
+
+        _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def log_queue_depth():
+    """Return the number of records waiting for the listener thread."""
+    return _listener.queue.qsize() if _listener is not None else 0
+
+
+def init_request_ids(app):
+    """Give every request an id (the caller's X-Request-ID, if sent and well formed) that is logged and returned."""
+
+    @app.before_request
+    def assign_request_id():
+        request_id = request.headers.get('X-Request-ID', '')
+        g.request_id = request_id if REQUEST_ID_PATTERN.fullmatch(request_id) else uuid.uuid4().hex[:12]
+
+    @app.after_request
+    def return_request_id(response):
+        response.headers['X-Request-ID'] = g.get('request_id', '-')
+        return response
+
+
+def log_sampled(key, level, message, per_minute=SAMPLE_PER_MINUTE):
+    """
+    Log a per-item message at most per_minute times a minute per key.
+
+    Messages over the limit are counted and the count is appended to the first
+    message logged in the next minute, so loops over thousands of items keep
+    the log volume bounded.
+    """
+    now = time.monotonic()
+    with _sampled_lock:
+        window = _sampled.get(key)
+        if window is None or now - window[0] >= 60:
+            suppressed = window[2] if window else 0
+            window = _sampled[key] = [now, 0, 0]
+        else:
+            suppressed = 0
+        if window[1] >= per_minute:
+            window[2] += 1
+            return
+        window[1] += 1
+
+    if suppressed:
+        message = f"{message} ({suppressed} similar messages suppressed)"
+    logging.log(level, message)
@@ -1,11 +1,14 @@
+import asyncio
 import logging
-import requests
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 from config import Config
-
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from app.helpers.logging_setup import log_sampled
+from app.helpers.metrics import CLASSIFIER_SECONDS, timed_request
+from app.helpers.async_http import async_timed_request
+from app.helpers.upstream_limiter import UpstreamBusyError
+from app.helpers.tmdb_helper import TMDbHelper, get_tmdb_cache
 
 
 class MediaService(Enum):
@@ -62,6 +65,8 @@ class MediaClassifier:
         self.tmdb_base_url = "https://api.themoviedb.org/3"
         self.musicbrainz_base_url = "https://musicbrainz.org/ws/2"
         self.spotify_token = None
+        self.tmdb_helper = TMDbHelper()
+        self.tmdb_cache = get_tmdb_cache()
         
         if not self.tmdb_api_key:
             logging.warning("TMDb API key not configured. Movie/TV classification will fail.")
@@ -69,25 +74,70 @@ class MediaClassifier:
         if not self.spotify_client_id or not self.spotify_client_secret:
             logging.warning("Spotify credentials not configured. Music classification via Spotify will be limited.")
 
-    def classify(self, query: str, limit: int = 10) -> List[MediaMatch]:
+    def classify(self, query: str, limit: int = 10, include_music: bool = True) -> List[MediaMatch]:
         """
         Classify a user's media request and return ranked potential matches.
         
         Args:
             query: User's search query (e.g., "Dexter", "Breaking Bad", "Taylor Swift")
             limit: Maximum number of results to return
+            include_music: Also search the music sources; leave them out for
+                titles known to be a movie or TV show, as MusicBrainz is slow
             
         Returns:
             List of MediaMatch objects sorted by confidence score (highest first)
+
+        Raises:
+            UpstreamBusyError: When TMDb's budget is used up, or the music
+                sources' budget is and TMDb found nothing; callers answer 429.
         """
         logging.info(f"Classifying media request: '{query}'")
         
         all_matches = []
         
-        # Parallel search across all services
-        all_matches.extend(self._search_tmdb_movies(query))
-        all_matches.extend(self._search_tmdb_tv(query))
-        all_matches.extend(self._search_music(query))
+        # Search each service in turn
+        with CLASSIFIER_SECONDS.time(source='tmdb_movie'):
+            all_matches.extend(self._search_tmdb_movies(query))
+        with CLASSIFIER_SECONDS.time(source='tmdb_tv'):
+            all_matches.extend(self._search_tmdb_tv(query))
+        music_busy = None
+        if include_music:
+            with CLASSIFIER_SECONDS.time(source='music'):
+                try:
+                    all_matches.extend(self._search_music(query))
+                except UpstreamBusyError as e:
+                    music_busy = e
+        
+        return self._rank(query, all_matches, limit, music_busy)
+
+    async def classify_async(self, query: str, limit: int = 10) -> List[MediaMatch]:
+        """Async variant of classify: TMDb movies, TMDb TV and music are searched concurrently."""
+        logging.info(f"Classifying media request: '{query}'")
+
+        async def timed(source, search):
+            with CLASSIFIER_SECONDS.time(source=source):
+                return await search
+
+        async def music():
+            try:
+                return await self._search_music_async(query), None
+            except UpstreamBusyError as e:
+                return [], e
+
+        movies, tv, (music_matches, music_busy) = await asyncio.gather(
+            timed('tmdb_movie', self._search_tmdb_movies_async(query)),
+            timed('tmdb_tv', self._search_tmdb_tv_async(query)),
+            timed('music', music())
+        )
+        return self._rank(query, movies + tv + music_matches, limit, music_busy)
+
+    def _rank(self, query: str, all_matches: List[MediaMatch], limit: int,
+              music_busy: Optional[UpstreamBusyError] = None) -> List[MediaMatch]:
+        if music_busy is not None:
+            # MusicBrainz allows one call a second, so a busy music source is common; TMDb's matches still help
+            if not all_matches:
+                raise music_busy
+            logging.warning(f"Classifying '{query}' without music sources: {music_busy}")
         
         # Sort by confidence score (descending)
         all_matches.sort(key=lambda m: m.confidence, reverse=True)
@@ -96,18 +146,18 @@ class MediaClassifier:
         if all_matches:
             logging.info(f"Found {len(all_matches)} potential matches for '{query}'")
             for i, match in enumerate(all_matches[:3]):
-                logging.info(f"  {i+1}. {match}")
+                log_sampled('classifier.match', logging.INFO, f"  {i+1}. {match}")
         else:
             logging.warning(f"No matches found for '{query}'")
         
         return all_matches[:limit]
 
-    def get_best_match(self, query: str) -> Optional[MediaMatch]:
+    def get_best_match(self, query: str, include_music: bool = True) -> Optional[MediaMatch]:
         """
         Get the single best match for a query.
         Returns None if no confident match is found.
         """
-        matches = self.classify(query, limit=1)
+        matches = self.classify(query, limit=1, include_music=include_music)
         if matches and matches[0].confidence >= 0.5:  # Minimum confidence threshold
             return matches[0]
         return None
@@ -123,8 +173,11 @@ class MediaClassifier:
         Returns:
             True if disambiguation is needed
         """
-        matches = self.classify(query, limit=5)
-        
+        return self.is_ambiguous(self.classify(query, limit=5), threshold)
+
+    @staticmethod
+    def is_ambiguous(matches: List[MediaMatch], threshold: float = 0.15) -> bool:
+        """Whether ranked matches have plausible alternatives on a different service than the best one."""
         if len(matches) < 2:
             return False
         
@@ -145,86 +198,118 @@ class MediaClassifier:
             return []
         
         try:
-            url = f"{self.tmdb_base_url}/search/movie"
-            params = {
-                "api_key": self.tmdb_api_key,
-                "query": query,
-                "include_adult": "false",
-                "language": "en-US"
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            matches = []
-            for result in data.get("results", [])[:5]:  # Top 5 movie results
-                confidence = self._calculate_movie_confidence(result, query)
-                
-                matches.append(MediaMatch(
-                    title=result.get("title", "Unknown"),
-                    media_type=MediaType.MOVIE,
-                    service=MediaService.RADARR,
-                    confidence=confidence,
-                    external_id=str(result.get("id")),
-                    year=self._extract_year(result.get("release_date")),
-                    description=result.get("overview"),
-                    poster_url=self._build_tmdb_poster_url(result.get("poster_path")),
-                    additional_data={"popularity": result.get("popularity", 0)}
-                ))
-            
-            return matches
-            
+            data = self._get_tmdb_json(*self._tmdb_search_request('movie', query))
+            return self._movie_matches(data, query)
+        except UpstreamBusyError:
+            raise
+        except Exception as e:
+            logging.error(f"Error searching TMDb movies: {e}")
+            return []
+
+    async def _search_tmdb_movies_async(self, query: str) -> List[MediaMatch]:
+        if not self.tmdb_api_key:
+            return []
+
+        try:
+            data = await self._get_tmdb_json_async(*self._tmdb_search_request('movie', query))
+            return self._movie_matches(data, query)
+        except UpstreamBusyError:
+            raise
         except Exception as e:
             logging.error(f"Error searching TMDb movies: {e}")
             return []
 
+    def _tmdb_search_request(self, media_type: str, query: str) -> Tuple[str, Dict]:
+        """Return the (url, params) of a TMDb search."""
+        url = f"{self.tmdb_base_url}/search/{media_type}"
+        params = {
+            "api_key": self.tmdb_api_key,
+            "query": query,
+            "include_adult": "false",
+            "language": "en-US"
+        }
+        return url, params
+
+    def _movie_matches(self, data: Dict, query: str) -> List[MediaMatch]:
+        matches = []
+        for result in data.get("results", [])[:5]:  # Top 5 movie results
+            confidence = self._calculate_movie_confidence(result, query)
+            
+            matches.append(MediaMatch(
+                title=result.get("title", "Unknown"),
+                media_type=MediaType.MOVIE,
+                service=MediaService.RADARR,
+                confidence=confidence,
+                external_id=str(result.get("id")),
+                year=self._extract_year(result.get("release_date")),
+                description=result.get("overview"),
+                poster_url=self._build_tmdb_poster_url(result.get("poster_path")),
+                additional_data={"popularity": result.get("popularity", 0)}
+            ))
+        
+        return matches
+
     def _search_tmdb_tv(self, query: str) -> List[MediaMatch]:
         """Search TMDb for TV shows."""
         if not self.tmdb_api_key:
             return []
         
         try:
-            url = f"{self.tmdb_base_url}/search/tv"
-            params = {
-                "api_key": self.tmdb_api_key,
-                "query": query,
-                "include_adult": "false",
-                "language": "en-US"
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            matches = []
-            for result in data.get("results", [])[:5]:  # Top 5 TV results
-                confidence = self._calculate_tv_confidence(result, query)
-                
-                # Fetch external IDs (TVDB) for TV shows
-                tvdb_id = self._get_tvdb_id(result.get("id"))
-                
-                matches.append(MediaMatch(
-                    title=result.get("name", "Unknown"),
-                    media_type=MediaType.TV_SERIES,
-                    service=MediaService.SONARR,
-                    confidence=confidence,
-                    external_id=tvdb_id or str(result.get("id")),  # Prefer TVDB, fallback to TMDB
-                    year=self._extract_year(result.get("first_air_date")),
-                    description=result.get("overview"),
-                    poster_url=self._build_tmdb_poster_url(result.get("poster_path")),
-                    additional_data={
-                        "popularity": result.get("popularity", 0),
-                        "tmdb_id": str(result.get("id"))
-                    }
-                ))
+            data = self._get_tmdb_json(*self._tmdb_search_request('tv', query))
             
-            return matches
+            results = data.get("results", [])[:5]  # Top 5 TV results
             
+            # Fetch external IDs (TVDB) for all TV shows concurrently, one details call each
+            details = self.tmdb_helper.get_details_batch(
+                [result.get("id") for result in results if result.get("id")], 'tv'
+            )
+            return self._tv_matches(results, details, query)
+        except UpstreamBusyError:
+            raise
+        except Exception as e:
+            logging.error(f"Error searching TMDb TV shows: {e}")
+            return []
+
+    async def _search_tmdb_tv_async(self, query: str) -> List[MediaMatch]:
+        if not self.tmdb_api_key:
+            return []
+
+        try:
+            data = await self._get_tmdb_json_async(*self._tmdb_search_request('tv', query))
+            results = data.get("results", [])[:5]
+            details = await self.tmdb_helper.get_details_batch_async(
+                [result.get("id") for result in results if result.get("id")], 'tv'
+            )
+            return self._tv_matches(results, details, query)
+        except UpstreamBusyError:
+            raise
         except Exception as e:
             logging.error(f"Error searching TMDb TV shows: {e}")
             return []
 
+    def _tv_matches(self, results: List[Dict], details: Dict, query: str) -> List[MediaMatch]:
+        matches = []
+        for result in results:
+            confidence = self._calculate_tv_confidence(result, query)
+            tvdb_id = self._tvdb_id_from_details(details.get(result.get("id")))
+            
+            matches.append(MediaMatch(
+                title=result.get("name", "Unknown"),
+                media_type=MediaType.TV_SERIES,
+                service=MediaService.SONARR,
+                confidence=confidence,
+                external_id=tvdb_id or str(result.get("id")),  # Prefer TVDB, fallback to TMDB
+                year=self._extract_year(result.get("first_air_date")),
+                description=result.get("overview"),
+                poster_url=self._build_tmdb_poster_url(result.get("poster_path")),
+                additional_data={
+                    "popularity": result.get("popularity", 0),
+                    "tmdb_id": str(result.get("id"))
+                }
+            ))
+        
+        return matches
+
     def _search_music(self, query: str) -> List[MediaMatch]:
         """Search for music via Spotify and MusicBrainz."""
         matches = []
@@ -238,6 +323,12 @@ class MediaClassifier:
         
         return matches
 
+    async def _search_music_async(self, query: str) -> List[MediaMatch]:
+        matches = await self._search_spotify_async(query)
+        if len(matches) < 2:
+            matches.extend(await self._search_musicbrainz_async(query))
+        return matches
+
     def _search_spotify(self, query: str) -> List[MediaMatch]:
         """Search Spotify for artists and albums."""
         if not self.spotify_client_id or not self.spotify_client_secret:
@@ -251,111 +342,162 @@ class MediaClassifier:
             if not self.spotify_token:
                 return []
             
-            url = "https://api.spotify.com/v1/search"
+            url, params = self._spotify_search_request(query)
             headers = {"Authorization": f"Bearer {self.spotify_token}"}
-            params = {
-                "q": query,
-                "type": "artist,album",
-                "limit": 5
-            }
-            
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = timed_request('spotify', 'GET', url, headers=headers, params=params, timeout=10)
             
             # Token expired - retry with new token
             if response.status_code == 401:
                 self.spotify_token = self._get_spotify_token()
                 headers = {"Authorization": f"Bearer {self.spotify_token}"}
-                response = requests.get(url, headers=headers, params=params, timeout=10)
+                response = timed_request('spotify', 'GET', url, headers=headers, params=params, timeout=10)
             
             response.raise_for_status()
-            data = response.json()
-            
-            matches = []
-            
-            # Process artist results
-            for artist in data.get("artists", {}).get("items", [])[:3]:
-                confidence = self._calculate_music_confidence(artist, query, "artist")
-                
-                matches.append(MediaMatch(
-                    title=artist.get("name", "Unknown"),
-                    media_type=MediaType.MUSIC,
-                    service=MediaService.LIDARR,
-                    confidence=confidence,
-                    external_id=None,  # Would need MusicBrainz ID for Lidarr
-                    description=f"Artist with {artist.get('followers', {}).get('total', 0):,} followers",
-                    poster_url=artist.get("images", [{}])[0].get("url") if artist.get("images") else None,
-                    additional_data={
-                        "spotify_id": artist.get("id"),
-                        "type": "artist",
-                        "popularity": artist.get("popularity", 0)
-                    }
-                ))
-            
-            # Process album results
-            for album in data.get("albums", {}).get("items", [])[:2]:
-                confidence = self._calculate_music_confidence(album, query, "album")
-                
-                matches.append(MediaMatch(
-                    title=f"{album.get('name')} - {album.get('artists', [{}])[0].get('name', 'Unknown')}",
-                    media_type=MediaType.MUSIC,
-                    service=MediaService.LIDARR,
-                    confidence=confidence * 0.95,  # Slight penalty for albums vs artists
-                    external_id=None,
-                    year=self._extract_year(album.get("release_date")),
-                    description=f"Album by {album.get('artists', [{}])[0].get('name', 'Unknown')}",
-                    poster_url=album.get("images", [{}])[0].get("url") if album.get("images") else None,
-                    additional_data={
-                        "spotify_id": album.get("id"),
-                        "type": "album",
-                        "artist": album.get('artists', [{}])[0].get('name')
-                    }
-                ))
-            
-            return matches
+            return self._spotify_matches(response.json(), query)
             
+        except UpstreamBusyError:
+            raise
         except Exception as e:
             logging.error(f"Error searching Spotify: {e}")
             return []
 
-    def _search_musicbrainz(self, query: str) -> List[MediaMatch]:
-        """Search MusicBrainz for artists (provides MusicBrainz IDs needed by Lidarr)."""
+    async def _search_spotify_async(self, query: str) -> List[MediaMatch]:
+        if not self.spotify_client_id or not self.spotify_client_secret:
+            return []
+
         try:
-            url = f"{self.musicbrainz_base_url}/artist"
-            headers = {"User-Agent": "MediaManagementSystem/1.0 (https://github.com/zy538324/Media_management)"}
-            params = {
-                "query": query,
-                "fmt": "json",
-                "limit": 3
-            }
-            
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            if not self.spotify_token:
+                self.spotify_token = await self._get_spotify_token_async()
+            if not self.spotify_token:
+                return []
+
+            url, params = self._spotify_search_request(query)
+            headers = {"Authorization": f"Bearer {self.spotify_token}"}
+            response = await async_timed_request('spotify', 'GET', url, headers=headers, params=params, timeout=10)
+            if response.status_code == 401:
+                self.spotify_token = await self._get_spotify_token_async()
+                headers = {"Authorization": f"Bearer {self.spotify_token}"}
+                response = await async_timed_request('spotify', 'GET', url, headers=headers, params=params, timeout=10)
+
             response.raise_for_status()
-            data = response.json()
+            return self._spotify_matches(response.json(), query)
+        except UpstreamBusyError:
+            raise
+        except Exception as e:
+            logging.error(f"Error searching Spotify: {e}")
+            return []
+
+    @staticmethod
+    def _spotify_search_request(query: str) -> Tuple[str, Dict]:
+        url = "https://api.spotify.com/v1/search"
+        params = {
+            "q": query,
+            "type": "artist,album",
+            "limit": 5
+        }
+        return url, params
+
+    def _spotify_matches(self, data: Dict, query: str) -> List[MediaMatch]:
+        matches = []
+        
+        # Process artist results
+        for artist in data.get("artists", {}).get("items", [])[:3]:
+            confidence = self._calculate_music_confidence(artist, query, "artist")
             
-            matches = []
-            for artist in data.get("artists", []):
-                confidence = self._calculate_musicbrainz_confidence(artist, query)
-                
-                matches.append(MediaMatch(
-                    title=artist.get("name", "Unknown"),
-                    media_type=MediaType.MUSIC,
-                    service=MediaService.LIDARR,
-                    confidence=confidence,
-                    external_id=artist.get("id"),  # MusicBrainz ID - critical for Lidarr
-                    description=f"{artist.get('type', 'Artist')} - {artist.get('disambiguation', '')}".strip(" -"),
-                    additional_data={
-                        "country": artist.get("country"),
-                        "type": artist.get("type"),
-                        "score": artist.get("score", 0)
-                    }
-                ))
+            matches.append(MediaMatch(
+                title=artist.get("name", "Unknown"),
+                media_type=MediaType.MUSIC,
+                service=MediaService.LIDARR,
+                confidence=confidence,
+                external_id=None,  # Would need MusicBrainz ID for Lidarr
+                description=f"Artist with {artist.get('followers', {}).get('total', 0):,} followers",
+                poster_url=artist.get("images", [{}])[0].get("url") if artist.get("images") else None,
+                additional_data={
+                    "spotify_id": artist.get("id"),
+                    "type": "artist",
+                    "popularity": artist.get("popularity", 0)
+                }
+            ))
+        
+        # Process album results
+        for album in data.get("albums", {}).get("items", [])[:2]:
+            confidence = self._calculate_music_confidence(album, query, "album")
             
-            return matches
+            matches.append(MediaMatch(
+                title=f"{album.get('name')} - {album.get('artists', [{}])[0].get('name', 'Unknown')}",
+                media_type=MediaType.MUSIC,
+                service=MediaService.LIDARR,
+                confidence=confidence * 0.95,  # Slight penalty for albums vs artists
+                external_id=None,
+                year=self._extract_year(album.get("release_date")),
+                description=f"Album by {album.get('artists', [{}])[0].get('name', 'Unknown')}",
+                poster_url=album.get("images", [{}])[0].get("url") if album.get("images") else None,
+                additional_data={
+                    "spotify_id": album.get("id"),
+                    "type": "album",
+                    "artist": album.get('artists', [{}])[0].get('name')
+                }
+            ))
+        
+        return matches
+
+    def _search_musicbrainz(self, query: str) -> List[MediaMatch]:
+        """Search MusicBrainz for artists (provides MusicBrainz IDs needed by Lidarr)."""
+        try:
+            url, headers, params = self._musicbrainz_search_request(query)
+            response = timed_request('musicbrainz', 'GET', url, headers=headers, params=params, timeout=10)
+            response.raise_for_status()
+            return self._musicbrainz_matches(response.json(), query)
             
+        except UpstreamBusyError:
+            raise
         except Exception as e:
             logging.error(f"Error searching MusicBrainz: {e}")
             return []
 
+    async def _search_musicbrainz_async(self, query: str) -> List[MediaMatch]:
+        try:
+            url, headers, params = self._musicbrainz_search_request(query)
+            response = await async_timed_request('musicbrainz', 'GET', url, headers=headers, params=params, timeout=10)
+            response.raise_for_status()
+            return self._musicbrainz_matches(response.json(), query)
+        except UpstreamBusyError:
+            raise
+        except Exception as e:
+            logging.error(f"Error searching MusicBrainz: {e}")
+            return []
+
+    def _musicbrainz_search_request(self, query: str) -> Tuple[str, Dict, Dict]:
+        url = f"{self.musicbrainz_base_url}/artist"
+        headers = {"User-Agent": "MediaManagementSystem/1.0 (https://github.com/zy538324/Media_management)"}
+        params = {
+            "query": query,
+            "fmt": "json",
+            "limit": 3
+        }
+        return url, headers, params
+
+    def _musicbrainz_matches(self, data: Dict, query: str) -> List[MediaMatch]:
+        matches = []
+        for artist in data.get("artists", []):
+            confidence = self._calculate_musicbrainz_confidence(artist, query)
+            
+            matches.append(MediaMatch(
+                title=artist.get("name", "Unknown"),
+                media_type=MediaType.MUSIC,
+                service=MediaService.LIDARR,
+                confidence=confidence,
+                external_id=artist.get("id"),  # MusicBrainz ID - critical for Lidarr
+                description=f"{artist.get('type', 'Artist')} - {artist.get('disambiguation', '')}".strip(" -"),
+                additional_data={
+                    "country": artist.get("country"),
+                    "type": artist.get("type"),
+                    "score": artist.get("score", 0)
+                }
+            ))
+        
+        return matches
+
     def _get_spotify_token(self) -> Optional[str]:
         """Get Spotify API access token via client credentials flow."""
         try:
@@ -363,34 +505,50 @@ class MediaClassifier:
             data = {"grant_type": "client_credentials"}
             auth = (self.spotify_client_id, self.spotify_client_secret)
             
-            response = requests.post(url, data=data, auth=auth, timeout=10)
+            response = timed_request('spotify', 'POST', url, data=data, auth=auth, timeout=10)
             response.raise_for_status()
             
             return response.json().get("access_token")
+        except UpstreamBusyError:
+            raise
         except Exception as e:
             logging.error(f"Error getting Spotify token: {e}")
             return None
 
-    def _get_tvdb_id(self, tmdb_id: int) -> Optional[str]:
-        """Fetch TVDB ID from TMDb external IDs endpoint."""
-        if not self.tmdb_api_key or not tmdb_id:
-            return None
-        
+    async def _get_spotify_token_async(self) -> Optional[str]:
         try:
-            url = f"{self.tmdb_base_url}/tv/{tmdb_id}/external_ids"
-            params = {"api_key": self.tmdb_api_key}
-            
-            response = requests.get(url, params=params, timeout=10)
+            response = await async_timed_request(
+                'spotify', 'POST', "https://accounts.spotify.com/api/token",
+                data={"grant_type": "client_credentials"}, auth=(self.spotify_client_id, self.spotify_client_secret),
+                timeout=10
+            )
             response.raise_for_status()
-            data = response.json()
-            
-            tvdb_id = data.get("tvdb_id")
-            return str(tvdb_id) if tvdb_id else None
-            
+            return response.json().get("access_token")
+        except UpstreamBusyError:
+            raise
         except Exception as e:
-            logging.error(f"Error fetching TVDB ID for TMDB ID {tmdb_id}: {e}")
+            logging.error(f"Error getting Spotify token: {e}")
             return None
 
+    def _get_tvdb_id(self, tmdb_id: int) -> Optional[str]:
+        """Fetch TVDB ID from the external IDs appended to the TMDb details response."""
+        if not self.tmdb_api_key or not tmdb_id:
+            return None
+        
+        return self._tvdb_id_from_details(self.tmdb_helper.get_details(tmdb_id, 'tv'))
+
+    def _tvdb_id_from_details(self, details: Optional[Dict]) -> Optional[str]:
+        """Extract the TVDB ID from a TMDb details response with appended external_ids."""
+        tvdb_id = (details or {}).get("external_ids", {}).get("tvdb_id")
+        return str(tvdb_id) if tvdb_id else None
+
+    def _get_tmdb_json(self, url: str, params: Dict) -> Dict:
+        """GET a TMDb endpoint through the shared response cache."""
+        return self.tmdb_cache.get_json(url, params, timeout=10)
+
+    async def _get_tmdb_json_async(self, url: str, params: Dict) -> Dict:
+        return await self.tmdb_cache.get_json_async(url, params, timeout=10)
+
     def _calculate_movie_confidence(self, result: Dict, query: str) -> float:
         """Calculate confidence score for a movie result."""
         score = 0.0
@@ -0,0 +1,469 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+from app.extensions import db
+from app.helpers.logging_setup import log_queue_depth
+from app.helpers.tracing import record_span
+from app.helpers.upstream_limiter import UpstreamBusyError, get_upstream_limiter
+
+# Upper bounds in seconds shared by the latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+JOB_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+# Seconds between writes of a process's counters to the shared metrics directory
+METRICS_FLUSH_INTERVAL = 5
+
+_metrics = []
+_collectors = []
+_store = None
+_store_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base for metrics kept in this process and rendered by render_metrics()."""
+
+    kind = None
+    shared = True  # Summed over every process of the host by MetricsStore
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.label_names)
+
+    def render(self, values=None):
+        """Render this process's series, or values ({label values tuple: value}) instead when given."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        if values is None:
+            with self._lock:
+                items = sorted(self._values.items())
+        else:
+            items = sorted(values.items())
+        lines.extend(self._render_items(items))
+        return lines
+
+    def snapshot(self):
+        """Return this process's series as JSON-ready [label values, value] pairs."""
+        with self._lock:
+            return [[list(key), self._copy(value)] for key, value in self._values.items()]
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    @staticmethod
+    def _add(total, value):
+        return total + value
+
+    def _render_items(self, items):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value read off this process (or the database) when scraped; never summed over processes."""
+
+    kind = 'gauge'
+    shared = False
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def replace(self, values):
+        """Replace every series at once with {label values tuple: value}, e.g. from a collector."""
+        with self._lock:
+            self._values = dict(values)
+
+
+class Histogram(_Metric):
+    """
+    Counts observations into fixed buckets.
+
+    Each series keeps one count per bucket plus the sum, so observe() is a
+    bisect and two additions under a lock; buckets are only accumulated when
+    the metrics are rendered.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @staticmethod
+    def _copy(value):
+        return [list(value[0]), value[1]]
+
+    @staticmethod
+    def _add(total, value):
+        if len(total[0]) != len(value[0]):
+            return total  # Written with other buckets, by a process from before a deploy
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1]]
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_items(self, items):
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def register_collector(collector):
+    """
+    Register collector(), called on every scrape to refresh gauges that are
+    cheaper to read when asked for than to keep up to date (e.g. table counts).
+    Can be used as a decorator.
+    """
+    _collectors.append(collector)
+    return collector
+
+
+class MetricsStore:
+    """
+    Adds up the counters and histograms of every process on the host, so
+    /metrics returns the same monotonic totals whichever worker answers.
+
+    Each process writes its series to <pid>.json in a shared directory every
+    few seconds and before it answers a scrape; the scrape sums every file.
+    Files of processes that have exited are folded into exited.json, which
+    keeps their counts without the directory growing with every restart.
+    """
+
+    EXITED = 'exited.json'
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self):
+        """Write this process's counters and histograms to its file."""
+        self._write_json(f"{os.getpid()}.json", {metric.name: metric.snapshot() for metric in list(_metrics) if metric.shared})
+
+    def totals(self):
+        """Return {metric name: {label values tuple: value}} summed over every process."""
+        self.write()
+        with self._locked() as exclusive:
+            if exclusive:
+                self._fold_exited()
+            totals = {}
+            for name in os.listdir(self.directory):
+                if name.endswith('.json'):
+                    self._merge(totals, self._read_json(name))
+        return totals
+
+    def _fold_exited(self):
+        finished = [
+            name for name in os.listdir(self.directory)
+            if name.removesuffix('.json').isdigit() and not self._running(int(name.removesuffix('.json')))
+        ]
+        if not finished:
+            return
+        exited = {}
+        for name in [self.EXITED] + finished:
+            self._merge(exited, self._read_json(name))
+        self._write_json(self.EXITED, {
+            metric: [[list(key), value] for key, value in series.items()] for metric, series in exited.items()
+        })
+        for name in finished:
+            os.remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def _running(pid):
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)  # Signal 0 only checks that the process exists
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    @staticmethod
+    def _merge(totals, payload):
+        for metric in list(_metrics):
+            if not metric.shared:
+                continue
+            series = totals.setdefault(metric.name, {})
+            for key, value in payload.get(metric.name, ()):
+                key = tuple(key)
+                series[key] = metric._add(series[key], value) if key in series else value
+
+    def _read_json(self, name):
+        try:
+            with open(os.path.join(self.directory, name)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable metrics file {name}: {e}")
+            return {}
+
+    def _write_json(self, name, payload):
+        path = os.path.join(self.directory, name)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, 'w') as file:
+            json.dump(payload, file)
+        os.replace(temporary, path)  # Readers never see a half-written file
+
+    @contextmanager
+    def _locked(self):
+        """Hold the directory's lock while folding and reading; yields False where flock is unavailable."""
+        try:
+            import fcntl
+        except ImportError:
+            yield False  # Without flock (or a safe process check) exited files are simply kept
+            return
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _start_store(directory):
+    """Create this process's metrics store and keep its file up to date."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            return
+        _store = MetricsStore(directory)
+
+    def flush():
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                _store.write()
+            except OSError as e:
+                logging.warning(f"Could not write metrics to {directory}: {e}")
+
+    threading.Thread(target=flush, name='metrics-flush', daemon=True).start()
+    atexit.register(_store.write)
+
+
+def render_metrics():
+    """Return every metric in the Prometheus text exposition format, counters summed over the host's processes."""
+    for collector in list(_collectors):
+        try:
+            collector()
+        except Exception as e:
+            logging.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+    totals = None
+    if _store is not None:
+        try:
+            totals = _store.totals()
+        except OSError as e:
+            logging.warning(f"Could not add up the metrics of other processes: {e}")
+    lines = []
+    for metric in list(_metrics):
+        values = totals.get(metric.name, {}) if totals is not None and metric.shared else None
+        lines.extend(metric.render(values))
+    return '\n'.join(lines) + '\n'
+
+
+UPSTREAM_REQUESTS = Counter(
+    'upstream_requests_total', 'HTTP requests sent to external services.', ('service', 'status')
+)
+UPSTREAM_SECONDS = Histogram(
+    'upstream_request_seconds', 'Time until an external service answered.', ('service',)
+)
+CLASSIFIER_SECONDS = Histogram(
+    'classifier_source_seconds', 'Time the media classifier spent on each source.', ('source',)
+)
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'Requests handled, by endpoint and status.', ('endpoint', 'method', 'status')
+)
+HTTP_SECONDS = Histogram(
+    'http_request_seconds', 'Time to handle a request, by endpoint.', ('endpoint',)
+)
+DB_QUERY_SECONDS = Histogram(
+    'db_query_seconds', 'Time spent executing SQL statements.', ('statement',), buckets=DB_BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    'cache_lookups_total', 'Response cache lookups by result (hit, stale or miss).', ('cache', 'result')
+)
+MEDIA_REQUESTS = Gauge(
+    'media_requests', 'Media requests by status.', ('status',)
+)
+JOB_SECONDS = Histogram(
+    'job_duration_seconds', 'Duration of scheduled job runs.', ('job', 'status'), buckets=JOB_BUCKETS
+)
+CIRCUIT_OPEN = Gauge(
+    'circuit_open', 'Whether a service circuit is open (1) or half open (0.5).', ('service',)
+)
+LOG_QUEUE_DEPTH = Gauge(
+    'log_queue_depth', 'Log records waiting to be written.'
+)
+
+SQL_STATEMENTS = {'select', 'insert', 'update', 'delete'}
+
+
+def timed_request(service, method, url, **kwargs):
+    """
+    Send an HTTP request with requests once the service's upstream budget
+    allows, counting it and its latency under the service's name and adding
+    it to the current trace.
+    """
+    limiter = get_upstream_limiter()
+    queued = time.perf_counter()
+    try:
+        lease = limiter.acquire(service)
+    except UpstreamBusyError:
+        UPSTREAM_REQUESTS.inc(service=service, status='throttled')
+        raise
+    start = time.perf_counter()
+    if start - queued > 0.001:
+        record_span(f"wait for {service}", 'throttled', queued, start)
+    status = 'error'
+    try:
+        response = requests.request(method, url, **kwargs)
+        status = str(response.status_code)
+        return response
+    finally:
+        end = time.perf_counter()
+        limiter.release(lease)
+        UPSTREAM_REQUESTS.inc(service=service, status=status)
+        UPSTREAM_SECONDS.observe(end - start, service=service)
+        # The path only: query strings carry API keys
+        record_span(f"{method} {urlsplit(url).path}", service, start, end, status=status)
+
+
+def init_metrics(app):
+    """Time every request of the app, and every SQL statement of any engine."""
+    config = Config()
+    if config.METRICS_ENABLED:
+        _start_store(config.METRICS_DIR)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        _record_request(response.status_code)
+        return response
+
+    @app.teardown_request
+    def record_failed_request(exc):
+        # after_request is skipped when a view raises, so count those here
+        if exc is not None:
+            _record_request(500)
+
+    def _record_request(status):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=str(status))
+        HTTP_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+
+    if not event.contains(Engine, 'before_cursor_execute', _start_query_timer):
+        event.listen(Engine, 'before_cursor_execute', _start_query_timer)
+        event.listen(Engine, 'after_cursor_execute', _record_query)
+
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own context: a statement that fails never reaches the after hook
+    if context is not None:
+        context._metrics_query_start = time.perf_counter()
+
+
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_metrics_query_start', None)
+    if start is None:
+        return
+    verb = statement.lstrip()[:6].lower()
+    DB_QUERY_SECONDS.observe(time.perf_counter() - start, statement=verb if verb in SQL_STATEMENTS else 'other')
+
+
+@register_collector
+def _collect_media_requests():
+    if not has_app_context():
+        return
+    from app.models import Request
+    counts = db.session.query(Request.status, db.func.count(Request.id)).group_by(Request.status).all()
+    MEDIA_REQUESTS.replace({(status or 'Unknown',): count for status, count in counts})
+
+
+@register_collector
+def _collect_circuits():
+    from app.helpers.circuit_breaker import OPEN, HALF_OPEN, circuit_breakers
+    levels = {OPEN: 1, HALF_OPEN: 0.5}
+    CIRCUIT_OPEN.replace({(status['service'],): levels.get(status['state'], 0) for status in circuit_breakers()})
+
+
+@register_collector
+def _collect_log_queue():
+    LOG_QUEUE_DEPTH.set(log_queue_depth())
@@ -0,0 +1,239 @@
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+
+PROFILE_DIR = os.path.abspath(os.path.join("./logs", "profiles"))  # send_file resolves relative paths against the app root
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+MAX_WINDOW_SECONDS = 600  # Longest any session runs, also one waiting for requests that never reach this worker
+TRACEMALLOC_FRAMES = 25
+
+_session = None
+_session_lock = threading.Lock()
+_snapshots = []  # (label, tracemalloc snapshot), oldest first
+_snapshots_lock = threading.Lock()
+_memory_report = None
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical CPU profiler: a background thread records the stack of the
+    watched threads every interval seconds and counts identical stacks.
+
+    The result is in the folded format read by flamegraph.pl, speedscope and
+    most flamegraph viewers: one "outer;...;inner count" line per stack.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, all_threads=False):
+        self.interval = interval
+        self.all_threads = all_threads
+        self.thread_ids = set()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            watched = None if self.all_threads else set(self.thread_ids)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (watched is not None and thread_id not in watched):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def folded(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+class ProfileSession:
+    """Profiles either the next `remaining` requests to one endpoint, or every thread, until ends_at."""
+
+    def __init__(self, endpoint=None, requests=0, seconds=MAX_WINDOW_SECONDS):
+        self.endpoint = endpoint
+        self.remaining = requests
+        self.started_at = time.time()
+        self.ends_at = self.started_at + seconds
+        self.profiler = SamplingProfiler(all_threads=endpoint is None)
+        self.timer = threading.Timer(seconds, finish_profile, args=(self,))
+        self.timer.daemon = True
+
+    @property
+    def description(self):
+        left = f"{max(self.ends_at - time.time(), 0):.0f}s"
+        if self.endpoint:
+            return f"next {self.remaining} requests to {self.endpoint} (at most {left} more)"
+        return f"all threads for {left} more"
+
+
+def active_profile():
+    """Return the active session, or None."""
+    return _session
+
+
+def start_request_profile(endpoint, count):
+    """
+    Profile the next count requests to an endpoint in this process. The
+    session ends after MAX_WINDOW_SECONDS even if fewer requests came, as
+    with several workers they may all be served by another process.
+    """
+    _start(ProfileSession(endpoint=endpoint, requests=count))
+
+
+def start_window_profile(seconds):
+    """Profile every thread of this process for the given number of seconds."""
+    _start(ProfileSession(seconds=min(seconds, MAX_WINDOW_SECONDS)))
+
+
+def _start(session):
+    global _session
+    with _session_lock:
+        if _session is not None:
+            raise RuntimeError(f"Already profiling the {_session.description}.")
+        session.profiler.start()
+        session.timer.start()
+        _session = session
+    logging.info(f"Started profiling the {session.description}.")
+
+
+def finish_profile(session=None):
+    """
+    Stop the active session (or only the given one, if it is still active)
+    and write its profile. Returns the file name, or None if nothing was running.
+    """
+    global _session
+    with _session_lock:
+        if _session is None or (session is not None and _session is not session):
+            return None
+        session, _session = _session, None
+    session.timer.cancel()
+    session.profiler.stop()
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    target = (session.endpoint or 'all').replace('.', '-')
+    name = f"{datetime.now():%Y%m%d_%H%M%S}_{target}.folded"
+    with open(os.path.join(PROFILE_DIR, name), 'w') as file:
+        file.write(session.profiler.folded())
+    logging.info(f"Wrote CPU profile {name} ({session.profiler.samples} samples).")
+    return name
+
+
+def list_profiles():
+    """Return [(name, size in bytes)] of saved profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith('.folded')), reverse=True)
+    return [(name, os.path.getsize(os.path.join(PROFILE_DIR, name))) for name in names]
+
+
+def init_profiler(app):
+    """Add the hooks that attach profiled requests to the sampler; they return at once when profiling is off."""
+
+    @app.before_request
+    def start_request_sampling():
+        session = _session
+        if session is None or session.endpoint != request.endpoint:
+            return
+        with _session_lock:
+            # Counted and attached in one step, so a concurrent teardown can't finish the session in between
+            if session is not _session or session.remaining <= 0:
+                return
+            session.remaining -= 1
+            session.profiler.thread_ids.add(threading.get_ident())
+        g.profile_session = session
+
+    @app.teardown_request
+    def stop_request_sampling(exc):
+        session = g.pop('profile_session', None)
+        if session is None:
+            return
+        with _session_lock:
+            session.profiler.thread_ids.discard(threading.get_ident())
+            done = session.remaining <= 0 and not session.profiler.thread_ids
+        if done:
+            finish_profile(session)
+
+
+def start_memory_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        logging.info("Started tracing memory allocations.")
+
+
+def stop_memory_tracing():
+    global _memory_report
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        logging.info("Stopped tracing memory allocations.")
+    with _snapshots_lock:
+        _snapshots.clear()
+    _memory_report = None
+
+
+def take_memory_snapshot(limit=25):
+    """
+    Take a tracemalloc snapshot and compare it with the previous one.
+
+    The report lists the largest allocation sites and, from the second
+    snapshot on, the sites that grew most since the previous one. Each
+    snapshot is also written to PROFILE_DIR for offline analysis with
+    tracemalloc.Snapshot.load().
+    """
+    global _memory_report
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("Memory tracing is not running.")
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen importlib._bootstrap>')]
+    snapshot = tracemalloc.take_snapshot().filter_traces(filters)
+    label = f"{datetime.now():%Y%m%d_%H%M%S}"
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    snapshot.dump(os.path.join(PROFILE_DIR, f"{label}.tracemalloc"))
+
+    with _snapshots_lock:
+        previous = _snapshots[-1] if _snapshots else None
+        _snapshots.append((label, snapshot))
+        del _snapshots[:-2]
+
+    report = {
+        'label': label,
+        'previous': previous[0] if previous else None,
+        'traced': tracemalloc.get_traced_memory()[0],
+        'top': [
+            {'location': str(stat.traceback), 'size': stat.size, 'count': stat.count}
+            for stat in snapshot.statistics('lineno')[:limit]
+        ],
+        'growth': [
+            {'location': str(stat.traceback), 'size': stat.size, 'size_diff': stat.size_diff, 'count': stat.count}
+            for stat in snapshot.compare_to(previous[1], 'lineno')[:limit] if stat.size_diff > 0
+        ] if previous else []
+    }
+    _memory_report = report
+    return report
+
+
+def memory_report():
+    """Return the report of the latest memory snapshot, or None."""
+    return _memory_report
@@ -1,65 +1,101 @@
-from qbittorrentapi import Client, LoginFailed
-from config import Config
+from config import Config, on_config_change
+from app.helpers.circuit_breaker import get_circuit_breaker
+from app.helpers.metrics import UPSTREAM_SECONDS
+from app.helpers.tracing import span
 import logging
-import time
+import threading
+
+# States qBittorrent's own 'downloading' filter matches
+DOWNLOADING_STATES = {
+    'downloading', 'metaDL', 'forcedMetaDL', 'stalledDL', 'checkingDL', 'pausedDL', 'stoppedDL',
+    'queuedDL', 'forcedDL', 'allocating'
+}
+COMPLETED_STATES = {'seeding', 'pausedUP', 'stoppedUP', 'completed'}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_qbittorrent_client():
+    """
+    Return the process-wide qBittorrent client, creating it on first use.
+
+    Creating the client does not contact qBittorrent: it logs in on its first
+    request and keeps the session cookie, and qbittorrentapi logs in again by
+    itself whenever a request is rejected with 403 (expired session or a
+    qBittorrent restart). Requests from all threads share one pooled session.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Imported here so the client library only loads once qBittorrent is used
+                from qbittorrentapi import Client
+                config = Config()
+                _client = Client(
+                    host=config.QB_API_URL,
+                    username=config.QB_USERNAME,
+                    password=config.QB_PASSWORD,
+                    REQUESTS_ARGS={'timeout': (3.1, config.QB_TIMEOUT)},
+                    HTTPADAPTER_ARGS={'pool_connections': 1, 'pool_maxsize': config.QB_POOL_SIZE, 'pool_block': True}
+                )
+    return _client
+
+
+@on_config_change
+def _reset_client(old, new):
+    # The next get_qbittorrent_client() connects with the new host and credentials
+    global _client
+    if old.get('qBittorrent') != new.get('qBittorrent'):
+        with _client_lock:
+            _client = None
 
-logging.basicConfig(level=logging.INFO)
 
 class QBittorrentHelper:
-    def __init__(self, max_retries=3, retry_delay=5):
-        config = Config()
-        qb_config = {
-            'host': config.QB_API_URL,
-            'username': config.QB_USERNAME,
-            'password': config.QB_PASSWORD
-        }
-        self.max_retries = max_retries
-        self.retry_delay = retry_delay
-        self.qb = None
+    def __init__(self):
+        # Shared and lazily connected, so constructing a helper costs no login round trip
+        self.qb = get_qbittorrent_client()
+        # Torrent lists are read from a mirror kept current with sync/maindata deltas
+        from app.helpers.torrent_state import get_torrent_state
+        self.state = get_torrent_state()
+        # Calls fail fast while qBittorrent is down; the probe checks for recovery in the background
+        self.breaker = get_circuit_breaker('qbittorrent', probe=self.qb.app_version)
 
+    def check_connection(self):
+        """Log in if needed and report whether qBittorrent is reachable."""
+        from qbittorrentapi import LoginFailed
         try:
-            self.qb = Client(
-                host=qb_config['host'],
-                username=qb_config['username'],
-                password=qb_config['password']
-            )
             self.qb.auth_log_in()
             logging.info("Connected to qBittorrent successfully.")
+            return True
         except LoginFailed:
             logging.error("Login to qBittorrent failed. Check your username and password.")
         except Exception as e:
             logging.error(f"Error connecting to qBittorrent: {e}")
+        return False
 
-    def retry_operation(method):
-        """Decorator to retry a method on failure."""
+    def guarded_operation(method):
+        """Decorator to run a method through the qBittorrent circuit breaker."""
         def wrapper(self, *args, **kwargs):
             if not self.qb:
                 logging.error(f"Operation {method.__name__} failed: qBittorrent client is not initialized.")
                 return None
-            for attempt in range(1, self.max_retries + 1):
-                try:
-                    return method(self, *args, **kwargs)
-                except Exception as e:
-                    logging.warning(f"Attempt {attempt} for {method.__name__} failed: {e}")
-                    if attempt < self.max_retries:
-                        time.sleep(self.retry_delay)
-                    else:
-                        logging.error(f"Operation {method.__name__} failed after {self.max_retries} attempts.")
-                        raise e
+            with UPSTREAM_SECONDS.time(service='qbittorrent'), span(method.__name__, 'qbittorrent'):
+                return self.breaker.call(method, self, *args, **kwargs)
         return wrapper
 
-    @retry_operation
+    @guarded_operation
     def get_active_downloads(self):
         """Retrieve active torrents and return details."""
         try:
-            torrents = self.qb.torrents_info(status_filter='downloading')
+            torrents = self.state.torrents(DOWNLOADING_STATES)
             logging.info(f"Retrieved {len(torrents)} active downloads.")
             return torrents
         except Exception as e:
             logging.error(f"Error fetching active downloads: {e}")
             raise e
 
-    @retry_operation
+    @guarded_operation
     def add_torrent(self, magnet_link, save_path, rename=None):
         """Add a torrent using a magnet link."""
         try:
@@ -78,31 +114,31 @@ class QBittorrentHelper:
             logging.error(f"Error in add_torrent: {e}")
             raise e
 
-    @retry_operation
+    @guarded_operation
     def remove_completed_torrents(self, delete_files=False):
         """Remove torrents that are completed."""
         try:
-            torrents = self.qb.torrents_info()
-            for torrent in torrents:
-                if torrent.state in ['seeding', 'pausedUP', 'completed']:
-                    logging.info(f"Removing completed torrent: {torrent.name}")
-                    self.qb.torrents_delete(delete_files=delete_files, torrent_hashes=torrent.hash)
+            completed = self.state.torrents(COMPLETED_STATES)
+            for torrent in completed:
+                logging.info(f"Removing completed torrent: {torrent.name}")
+            if completed:
+                self.qb.torrents_delete(delete_files=delete_files, torrent_hashes=[t.hash for t in completed])
         except Exception as e:
             logging.error(f"Error removing completed torrents: {e}")
             raise e
 
-    @retry_operation
+    @guarded_operation
     def get_stalled_torrents(self):
         """Retrieve stalled torrents."""
         try:
-            stalled_torrents = [t for t in self.qb.torrents_info() if t.state == 'stalledDL']
+            stalled_torrents = self.state.torrents({'stalledDL'})
             logging.info(f"Retrieved {len(stalled_torrents)} stalled torrents.")
             return stalled_torrents
         except Exception as e:
             logging.error(f"Error fetching stalled torrents: {e}")
             raise e
 
-    @retry_operation
+    @guarded_operation
     def pause_all_downloads(self):
         """Pause all active downloads."""
         try:
@@ -112,7 +148,7 @@ class QBittorrentHelper:
             logging.error(f"Error pausing all downloads: {e}")
             raise e
 
-    @retry_operation
+    @guarded_operation
     def resume_all_downloads(self):
         """Resume all paused downloads."""
         try:
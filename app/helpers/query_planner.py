@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from app.helpers.tmdb_helper import TMDbHelper
+from app.helpers.tracing import run_in_trace
+from app.helpers.upstream_limiter import UpstreamBusyError
+
+YEAR_PATTERN = re.compile(r'\(?\b((?:19|20)\d{2})\)?\s*$')
+# Jackett category -> TMDb media type used to look up alternative titles
+TMDB_MEDIA_TYPES = {"Movies": "movie", "TV": "tv"}
+# How long the other variants may still add results once the formatted query has finished with some
+VARIANT_GRACE_SECONDS = 1.5
+
+
+class QueryPlanner:
+    """
+    Builds several Jackett queries for one title and runs them concurrently.
+
+    Movies are searched with and without the year and the resolution keyword,
+    TV with and without the season keyword. The formatted query is started
+    first and sets the pace: results of the other variants are merged by
+    infohash as they arrive. As soon as any variant yields a release scoring
+    at least good_score, or grace seconds after the formatted query finished
+    with lesser results, the merged results are returned and the remaining
+    variants finish in the background, filling the search cache. Only when
+    every variant came back empty are alternative titles looked up on TMDb
+    and searched as well.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='jackett-variant')
+    _tasks = set()  # Variants of run_async still running; the loop itself only keeps weak references
+
+    def __init__(self, good_score, max_variants=6, grace=VARIANT_GRACE_SECONDS):
+        self.good_score = good_score
+        self.max_variants = max_variants
+        self.grace = grace
+
+    @staticmethod
+    def clean_title(query):
+        return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', YEAR_PATTERN.sub('', query))).strip()
+
+    def variants(self, query, category, primary):
+        """Return the query variants for a title, the original formatted query first."""
+        title = self.clean_title(query)
+        year = YEAR_PATTERN.search(query)
+        variants = [primary]
+        if category == "Movies":
+            if year:
+                variants.append(f"{title} {year.group(1)}")
+            variants.append(title)
+        elif category == "TV":
+            variants.append(title)
+        return list(dict.fromkeys(variant for variant in variants if variant))
+
+    def alternative_variants(self, query, category):
+        """Return queries for the title's alternative names on TMDb."""
+        media_type = TMDB_MEDIA_TYPES.get(category)
+        if not media_type:
+            return []
+        try:
+            alternatives = TMDbHelper().get_alternative_titles(self.clean_title(query), media_type)
+        except UpstreamBusyError as e:
+            logging.info(f"Skipping alternative titles for '{query}': {e}")  # Optional extra queries; not worth a 429
+            return []
+        return [self.clean_title(name) for name in alternatives]
+
+    def run(self, query, category, primary, search):
+        """
+        Run every variant through search(variant) and merge the results.
+
+        Args:
+            search: Callable returning the ranked result dicts for one query.
+
+        Returns:
+            list: Merged results, best score first.
+        """
+        seen = set()
+        pending = {}
+
+        def submit(variants):
+            for variant in variants:
+                if variant not in seen and len(seen) < self.max_variants:
+                    seen.add(variant)
+                    pending[self._executor.submit(run_in_trace(search), variant)] = variant
+
+        submit(self.variants(query, category, primary))
+        if not pending:
+            return []
+        first = next(iter(pending))
+        deadline = None
+        alternatives = None
+        look_up_alternatives = category in TMDB_MEDIA_TYPES
+
+        merged = {}
+        while pending or alternatives:
+            waiting = list(pending) + ([alternatives] if alternatives else [])
+            done, _ = wait(waiting, timeout=self._remaining(deadline), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future is alternatives:
+                    alternatives = None
+                    try:
+                        submit(future.result())
+                    except Exception as e:
+                        logging.warning(f"Could not look up alternative titles for '{query}': {e}")
+                    continue
+                self._merge(merged, pending.pop(future), future)
+
+            if any(result['score'] >= self.good_score for result in merged.values()):
+                break
+            if first not in pending:
+                if merged:
+                    # Give the other variants a moment to beat what was found, but don't hold it back for long
+                    deadline = deadline or time.monotonic() + self.grace
+                    if not pending or time.monotonic() >= deadline:
+                        break
+                elif look_up_alternatives and not pending:
+                    look_up_alternatives = False
+                    alternatives = self._executor.submit(run_in_trace(self.alternative_variants), query, category)
+
+        return self._ranked(query, merged, pending)
+
+    async def run_async(self, query, category, primary, search):
+        """Async variant of run, for a search(variant) returning a coroutine. Variants run as tasks on the loop."""
+        seen = set()
+        pending = {}
+
+        def submit(variants):
+            for variant in variants:
+                if variant not in seen and len(seen) < self.max_variants:
+                    seen.add(variant)
+                    task = asyncio.ensure_future(search(variant))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                    pending[task] = variant
+
+        submit(self.variants(query, category, primary))
+        if not pending:
+            return []
+        first = next(iter(pending))
+        deadline = None
+        alternatives = None
+        look_up_alternatives = category in TMDB_MEDIA_TYPES
+
+        merged = {}
+        while pending or alternatives:
+            waiting = list(pending) + ([alternatives] if alternatives else [])
+            done, _ = await asyncio.wait(waiting, timeout=self._remaining(deadline), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is alternatives:
+                    alternatives = None
+                    try:
+                        submit(task.result())
+                    except Exception as e:
+                        logging.warning(f"Could not look up alternative titles for '{query}': {e}")
+                    continue
+                self._merge(merged, pending.pop(task), task)
+
+            if any(result['score'] >= self.good_score for result in merged.values()):
+                break
+            if first not in pending:
+                if merged:
+                    # Give the other variants a moment to beat what was found, but don't hold it back for long
+                    deadline = deadline or time.monotonic() + self.grace
+                    if not pending or time.monotonic() >= deadline:
+                        break
+                elif look_up_alternatives and not pending:
+                    look_up_alternatives = False
+                    # The TMDb lookup is blocking, so it runs on a worker thread
+                    alternatives = asyncio.ensure_future(asyncio.to_thread(self.alternative_variants, query, category))
+
+        return self._ranked(query, merged, pending)
+
+    @staticmethod
+    def _remaining(deadline):
+        return None if deadline is None else max(0, deadline - time.monotonic())
+
+    @staticmethod
+    def _merge(merged, variant, future):
+        """Merge a finished variant's results into merged, keeping the best score per release."""
+        try:
+            results = future.result() or []
+        except Exception as e:
+            logging.error(f"Jackett search for variant '{variant}' failed: {e}")
+            return
+        for result in results:
+            key = result.get('infohash') or result['magnet']
+            if key not in merged or result['score'] > merged[key]['score']:
+                merged[key] = result
+
+    @staticmethod
+    def _ranked(query, merged, pending):
+        if pending:
+            logging.info(f"Returning results for '{query}'; {len(pending)} query variants finish in the background.")
+        return sorted(merged.values(), key=lambda result: result['score'], reverse=True)
@@ -1,6 +1,7 @@
 import logging
 import requests # For type hinting and eventual use
 from config import Config
+from app.helpers.circuit_breaker import guarded_request, get_circuit_breaker, http_probe
 
 class RadarrHelper:
     def __init__(self):
@@ -11,6 +12,10 @@ class RadarrHelper:
 
         if not self.api_url or not self.api_key:
             self.logger.warning("Radarr API URL or API Key is not configured. RadarrHelper may not function.")
+        else:
+            get_circuit_breaker('radarr', probe=http_probe(
+                f"{self.api_url.rstrip('/')}/api/v3/system/status", headers={'X-Api-Key': self.api_key}
+            ))
 
     def check_movie_exists(self, tmdb_id):
         """
@@ -25,7 +30,7 @@ class RadarrHelper:
             endpoint = f"{self.api_url.rstrip('/')}/api/v3/movie"
             headers = {'X-Api-Key': self.api_key}
             
-            response = requests.get(endpoint, headers=headers)
+            response = guarded_request('radarr', 'GET', endpoint, headers=headers)
             response.raise_for_status()
             movies = response.json()
             
@@ -54,12 +59,10 @@ class RadarrHelper:
         headers = {'X-Api-Key': self.api_key}
 
         try:
-            response = requests.get(endpoint, headers=headers)
+            response = guarded_request('radarr', 'GET', endpoint, headers=headers)
             response.raise_for_status()
             folders = response.json()
-            self.logger.info(f"Found {len(folders)} root folders in Radarr")
-            for folder in folders:
-                self.logger.info(f"  - {folder.get('path')}")
+            self.logger.info(f"Found {len(folders)} root folders in Radarr: {', '.join(str(folder.get('path')) for folder in folders)}")
             return folders
         except Exception as e:
             self.logger.error(f"Error getting root folders from Radarr: {e}")
@@ -114,7 +117,7 @@ class RadarrHelper:
         self.logger.info(f"Radarr add_movie headers: {headers.get('X-Api-Key', 'Key_Not_Set')[:5]}...") # Log first 5 chars of key for verification
 
         try:
-            response = requests.post(endpoint, json=payload, headers=headers)
+            response = guarded_request('radarr', 'POST', endpoint, json=payload, headers=headers)
             response.raise_for_status()  # Raise an exception for HTTP errors (4xx or 5xx)
             self.logger.info(f"Movie '{title}' added to Radarr successfully. Response: {response.json()}")
             return True
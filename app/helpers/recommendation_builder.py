@@ -0,0 +1,149 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import or_, insert
+from config import Config
+from app.models import db, Media, Recommendation, PastRecommendation, RecommendationSource, MediaRecommendation
+from app.helpers.tmdb_helper import TMDbHelper
+
+
+class RecommendationBuilder:
+    """
+    Background builder that materializes TMDb recommendations for library items.
+
+    Every library item gets a RecommendationSource row tracking when its
+    recommendations were last fetched. Each run only refreshes sources that have
+    never been built or are older than the configured max age, so the
+    /recommendations page can read the media_recommendations table directly.
+    """
+
+    def __init__(self, max_age_hours=None, batch_size=None):
+        config = Config()
+        self.tmdb_helper = TMDbHelper()
+        self.max_age = timedelta(hours=max_age_hours or config.RECOMMENDATIONS_MAX_AGE_HOURS)
+        self.batch_size = batch_size or config.RECOMMENDATIONS_BATCH_SIZE
+
+    def sync_sources(self):
+        """Add sources for new library items and drop sources no longer in the library."""
+        library = set(db.session.query(Media.media_type, Media.title).distinct())
+        existing = {(source.media_type, source.title): source for source in RecommendationSource.query.all()}
+
+        added = library - existing.keys()
+        removed = existing.keys() - library
+
+        for media_type, title in added:
+            db.session.add(RecommendationSource(media_type=media_type, title=title))
+        for key in removed:
+            db.session.delete(existing[key])
+
+        db.session.commit()
+        if added or removed:
+            logging.info(f"Recommendation sources synced: {len(added)} added, {len(removed)} removed")
+
+    def get_stale_sources(self):
+        """Return the sources whose recommendations need (re)building, oldest first."""
+        cutoff = datetime.utcnow() - self.max_age
+        return RecommendationSource.query.filter(
+            or_(RecommendationSource.refreshed_at.is_(None), RecommendationSource.refreshed_at < cutoff)
+        ).order_by(
+            RecommendationSource.refreshed_at.asc().nullsfirst()
+        ).limit(self.batch_size).all()
+
+    def refresh_source(self, source, fetched):
+        """Replace the stored recommendations for a single source with a fetch_recommendations() result."""
+        now = datetime.utcnow()
+
+        if fetched is None:
+            # Keep the previous recommendations; the source is retried once it goes stale again
+            source.last_error = "TMDb lookup failed"
+            source.refreshed_at = now
+            return False
+
+        tmdb_id, recommendations = fetched
+        MediaRecommendation.query.filter_by(source_id=source.id).delete(synchronize_session=False)
+        for rec in recommendations:
+            db.session.add(MediaRecommendation(
+                source_id=source.id,
+                tmdb_id=rec['tmdb_id'],
+                title=rec['title'],
+                media_type=source.media_type,
+                url=rec['url'],
+                description=rec['overview'],
+                thumbnail_url=rec['thumbnail_url'],
+                score=rec['score'],
+                refreshed_at=now
+            ))
+
+        source.tmdb_id = tmdb_id
+        source.last_error = None
+        source.refreshed_at = now
+        return True
+
+    def refresh(self):
+        """Run one incremental refresh. Returns the number of sources rebuilt."""
+        self.sync_sources()
+        stale_sources = self.get_stale_sources()
+        if not stale_sources:
+            logging.info("All library recommendations are fresh.")
+            return 0
+
+        logging.info(f"Refreshing recommendations for {len(stale_sources)} library items.")
+        fetched = self.tmdb_helper.fetch_recommendations_batch(
+            (source.title, source.media_type) for source in stale_sources
+        )
+
+        refreshed = 0
+        for source in stale_sources:
+            try:
+                if self.refresh_source(source, fetched.get((source.title, source.media_type))):
+                    refreshed += 1
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error refreshing recommendations for '{source.title}': {e}", exc_info=True)
+
+        logging.info(f"Recommendation refresh completed: {refreshed}/{len(stale_sources)} items rebuilt.")
+        return refreshed
+
+    def generate_user_recommendations(self, user_id):
+        """
+        Create Recommendation rows for a user from every library item.
+
+        TMDb lookups run concurrently under the shared rate limit. Duplicates are
+        checked against a preloaded set of (media_title, related_media_title) pairs
+        and new rows are written with a single bulk insert.
+
+        Returns:
+            int: Number of recommendations created.
+        """
+        media_items = db.session.query(Media.title, Media.media_type).distinct().all()
+
+        existing_pairs = {tuple(pair) for pair in db.session.query(Recommendation.media_title, Recommendation.related_media_title)}
+        existing_pairs.update(tuple(pair) for pair in db.session.query(PastRecommendation.media_title, PastRecommendation.related_media_title))
+
+        fetched = self.tmdb_helper.fetch_recommendations_batch(tuple(item) for item in media_items)
+
+        rows = []
+        for (title, media_type), result in fetched.items():
+            if not result:
+                continue
+            for rec in result[1]:
+                pair = (title, rec['title'])
+                if pair in existing_pairs:
+                    continue
+                existing_pairs.add(pair)
+                rows.append({
+                    'user_id': user_id,
+                    'media_title': title,
+                    'related_media_title': rec['title'],
+                    'media_type': media_type,
+                    'url': rec['url'],
+                    'description': rec['overview'],
+                    'thumbnail_url': rec['thumbnail_url']
+                })
+
+        if rows:
+            db.session.execute(insert(Recommendation), rows)
+        db.session.commit()
+
+        logging.info(f"Generated {len(rows)} recommendations from {len(media_items)} library items.")
+        return len(rows)
@@ -0,0 +1,152 @@
+import json
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from app.helpers.tmdb_helper import TMDbHelper, get_tmdb_cache
+from app.helpers.concurrent_fetcher import ConcurrentFetcher
+
+# Regions shown on the /future_releases page
+RELEASE_REGIONS = ('US', 'GB')
+UPCOMING_WINDOW_DAYS = 90
+
+
+class ReleaseCalendar:
+    """
+    Daily snapshot of upcoming movies and TV airing today, built from TMDb.
+
+    Each region's /movie/upcoming and the (region independent) /tv/airing_today
+    feed are fetched once, concurrently, with their pages fetched in parallel.
+    Movies released in several regions are stored once with the list of
+    regions they appear in. The snapshot is kept in memory and in the TMDb
+    cache's meta table, so every worker renders /future_releases from it
+    without calling TMDb until the next day's refresh.
+    """
+
+    META_KEY = 'release_calendar'
+
+    _snapshot = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.tmdb_helper = TMDbHelper()
+        self.cache = get_tmdb_cache()
+
+    def get(self):
+        """
+        Return the newest snapshot. A snapshot from an earlier day is returned
+        as is while a background thread builds today's; only the very first
+        build, with nothing to show yet, makes the caller wait.
+        """
+        snapshot = self._current()
+        if snapshot and snapshot['date'] == date.today().isoformat():
+            return snapshot
+
+        if snapshot:
+            self._refresh_in_background()
+            return snapshot
+
+        with self._lock:
+            snapshot = self._current()  # Another thread may have refreshed while we waited
+            if snapshot and snapshot['date'] == date.today().isoformat():
+                return snapshot
+            return self.refresh() or snapshot
+
+    def _refresh_in_background(self):
+        if not self._lock.acquire(blocking=False):
+            return  # A refresh is already running
+
+        def refresh():
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"Background release calendar refresh failed: {e}")
+            finally:
+                self._lock.release()
+
+        threading.Thread(target=refresh, name='release-calendar-refresh', daemon=True).start()
+
+    def refresh(self):
+        """Rebuild and store the snapshot. Returns it, or None if TMDb could not be read."""
+        if not self.tmdb_helper.api_key:
+            logging.error("TMDb API key is not configured correctly.")
+            return None
+
+        # The feeds change daily but are cached for hours (and served stale for longer), so read them fresh
+        for endpoint in ('/tv/airing_today', '/movie/upcoming'):
+            self.cache.invalidate(f"{self.tmdb_helper.base_url}{endpoint}?%")
+
+        today = date.today()
+        horizon = today + timedelta(days=UPCOMING_WINDOW_DAYS)
+
+        def fetch_feed(feed):
+            kind, region = feed
+            if kind == 'tv':
+                # Airing today is keyed by timezone, not region, so one fetch serves every region
+                return self.tmdb_helper.get_all_pages('/tv/airing_today', {"api_key": self.tmdb_helper.api_key, "language": "en-GB"})
+            return self.tmdb_helper.get_all_pages('/movie/upcoming', {"api_key": self.tmdb_helper.api_key, "language": "en-US", "region": region})
+
+        feeds = [('movie', region) for region in RELEASE_REGIONS] + [('tv', None)]
+        results = ConcurrentFetcher(max_workers=len(feeds)).map(fetch_feed, feeds)
+        if any(items is None for items in results.values()):
+            logging.error("Could not refresh the release calendar; keeping the previous snapshot.")
+            return None
+
+        movies = {}
+        for region in RELEASE_REGIONS:
+            for item in results[('movie', region)]:
+                release_date = item.get('release_date')
+                if not release_date or not today.isoformat() <= release_date <= horizon.isoformat():
+                    continue
+                movie = movies.setdefault(item['id'], self._format(item, is_movie=True))
+                if region not in movie['regions']:
+                    movie['regions'].append(region)
+
+        tv_shows = {}
+        for item in results[('tv', None)]:
+            if item.get('original_language') in ['en', 'en-US']:
+                tv_shows.setdefault(item['id'], self._format(item, is_movie=False))
+
+        snapshot = {
+            'date': today.isoformat(),
+            'built_at': datetime.utcnow().isoformat(),
+            'movies': sorted(movies.values(), key=lambda movie: movie['release_date']),
+            'tv_shows': list(tv_shows.values())
+        }
+        self.cache.set_meta(self.META_KEY, json.dumps(snapshot))
+        ReleaseCalendar._snapshot = snapshot
+        logging.info(f"Release calendar refreshed: {len(movies)} movies, {len(tv_shows)} TV shows.")
+        return snapshot
+
+    @staticmethod
+    def movies_for(snapshot, region):
+        return [movie for movie in snapshot['movies'] if region in movie['regions']] if snapshot else []
+
+    @staticmethod
+    def tv_shows(snapshot):
+        return snapshot['tv_shows'] if snapshot else []
+
+    def _current(self):
+        """Return the newest snapshot in memory or, failing that, in the shared cache."""
+        snapshot = ReleaseCalendar._snapshot
+        if snapshot and snapshot['date'] == date.today().isoformat():
+            return snapshot
+
+        stored = self.cache.get_meta(self.META_KEY)
+        if stored:
+            stored = json.loads(stored)
+            if not snapshot or stored['date'] >= snapshot['date']:
+                ReleaseCalendar._snapshot = snapshot = stored
+        return snapshot
+
+    @staticmethod
+    def _format(item, is_movie):
+        kind = 'movie' if is_movie else 'tv'
+        return {
+            'tmdb_id': item['id'],
+            'title': item.get('title') if is_movie else item.get('name'),
+            'release_date': item.get('release_date') if is_movie else item.get('first_air_date'),
+            'thumbnail_url': item.get('poster_path'),
+            'overview': item.get('overview') or 'No description available.',
+            'url': f"https://www.themoviedb.org/{kind}/{item['id']}",
+            'regions': []
+        }
@@ -0,0 +1,200 @@
+import heapq
+import math
+import re
+from collections import namedtuple
+
+# Release names are split into tokens and each token is looked up in RELEASE_TAGS,
+# which is much cheaper than running a pattern per tag over thousands of titles
+TOKEN_SPLIT_PATTERN = re.compile(r'[\s._\[\]()+,\-]+')
+EPISODE_TOKEN_PATTERN = re.compile(r's(\d{1,2})(?:e(\d{1,3}))?')
+# Cyrillic script, or Russian voice-over tags (MVO/AVO/DVO) inside brackets
+NON_ENGLISH_PATTERN = re.compile(r'[\u0400-\u04FF]|\[[^\]]*\b[MAD]VO\b[^\]]*\]')
+GROUP_PATTERN = re.compile(r'-\s*([A-Za-z0-9]+)\s*(?:\[[^\]]*\]|\.\w{2,4})?\s*$')
+INFOHASH_PATTERN = re.compile(r'urn:btih:([0-9a-fA-F]{40}|[A-Za-z2-7]{32})')
+# Tags that contain a separator, joined before splitting
+JOINED_TAGS = (('blu-ray', 'bluray'), ('web-dl', 'webdl'), ('h.264', 'h264'), ('h.265', 'h265'))
+JOINED_TAG_NAMES = {joined for joined, _ in JOINED_TAGS}
+
+
+def _tags(kind, mapping):
+    return {token: (kind, value) for token, value in mapping.items()}
+
+
+RELEASE_TAGS = {
+    **_tags('resolution', {'2160p': '2160p', '4k': '2160p', 'uhd': '2160p', '1080p': '1080p', '1080i': '1080p',
+                           '720p': '720p', '576p': '576p', '480p': '480p'}),
+    **_tags('source', {'remux': 'remux', 'bluray': 'bluray', 'bdrip': 'bluray', 'brrip': 'bluray',
+                       'webdl': 'web-dl', 'web': 'web-dl', 'webrip': 'webrip', 'hdrip': 'webrip', 'hdtv': 'hdtv',
+                       'dvdrip': 'dvdrip', 'cam': 'cam', 'camrip': 'cam', 'hdcam': 'cam', 'telesync': 'cam',
+                       'hdts': 'cam', 'ts': 'cam', 'tc': 'cam', 'dvdscr': 'screener', 'screener': 'screener'}),
+    **_tags('codec', {'x265': 'x265', 'h265': 'x265', 'hevc': 'x265', 'x264': 'x264', 'h264': 'x264',
+                      'avc': 'x264', 'av1': 'av1', 'xvid': 'xvid', 'divx': 'xvid'}),
+    # Multi-audio releases normally include the English track
+    **_tags('language', {'multi': 'multi', 'dual': 'multi', 'truefrench': 'fr', 'french': 'fr', 'vostfr': 'fr',
+                         'german': 'de', 'spanish': 'es', 'castellano': 'es', 'italian': 'it', 'ita': 'it',
+                         'hindi': 'hi', 'russian': 'ru', 'rus': 'ru', 'ukr': 'uk', 'korean': 'ko', 'japanese': 'ja'}),
+}
+
+RESOLUTION_SCORES = {'1080p': 30, '2160p': 20, '720p': 15, '576p': 5, '480p': 0}
+SOURCE_SCORES = {'remux': 15, 'bluray': 15, 'web-dl': 12, 'webrip': 10, 'hdtv': 6, 'dvdrip': 3, 'cam': -100, 'screener': -100}
+CODEC_SCORES = {'x265': 5, 'x264': 4, 'av1': 3}
+# Below these sizes a "movie" or "season" is almost certainly a fake or a sample
+MIN_SIZES = {'Movies': 300 * 1024 * 1024, 'TV': 50 * 1024 * 1024}
+
+Release = namedtuple('Release', [
+    'title', 'seeders', 'peers', 'size', 'magnet', 'infohash', 'indexer',
+    'resolution', 'source', 'codec', 'group', 'season', 'episode', 'language', 'foreign'
+])
+
+
+def parse_release(result):
+    """
+    Parse a Jackett result dict into a Release record.
+
+    Returns None for results that can't be downloaded (no magnet link or no seeders).
+    """
+    seeders = result.get('Seeders') or 0
+    magnet = result.get('MagnetUri')
+    if seeders <= 0 or not magnet:
+        return None
+
+    title = result.get('Title') or 'Unknown Title'
+    normalized = title.lower()
+    for joined, replacement in JOINED_TAGS:
+        normalized = normalized.replace(joined, replacement)
+
+    # The first tag of each kind wins, except that REMUX beats any other source
+    tags = {}
+    for token in TOKEN_SPLIT_PATTERN.split(normalized):
+        tag = RELEASE_TAGS.get(token)
+        if tag:
+            kind, value = tag
+            if kind not in tags or value == 'remux':
+                tags[kind] = value
+        elif token[:1] == 's' and 'season' not in tags:
+            match = EPISODE_TOKEN_PATTERN.fullmatch(token)
+            if match:
+                tags['season'], tags['episode'] = match.groups()
+
+    foreign = bool(NON_ENGLISH_PATTERN.search(title))
+    language = tags.get('language') or ('ru' if foreign else 'en')
+
+    infohash = result.get('InfoHash')
+    if not infohash:
+        match = INFOHASH_PATTERN.search(magnet)
+        infohash = match.group(1) if match else magnet
+
+    return Release(
+        title=title,
+        seeders=seeders,
+        peers=result.get('Peers') or 0,
+        size=result.get('Size') or 0,
+        magnet=magnet,
+        infohash=infohash.lower(),
+        indexer=result.get('Tracker') or result.get('TrackerId'),
+        resolution=tags.get('resolution'),
+        source=tags.get('source'),
+        codec=tags.get('codec'),
+        group=_release_group(title),
+        season=int(tags['season']) if tags.get('season') else None,
+        episode=int(tags['episode']) if tags.get('episode') else None,
+        language=language,
+        foreign=foreign
+    )
+
+
+def _release_group(title):
+    """Return the group after the title's last dash, unless the dash belongs to a tag like WEB-DL or x264."""
+    match = GROUP_PATTERN.search(title)
+    if not match:
+        return None
+    group = match.group(1)
+    previous = TOKEN_SPLIT_PATTERN.split(title[:match.start()])[-1]
+    if group.lower() in RELEASE_TAGS or f"{previous}-{group}".lower() in JOINED_TAG_NAMES:
+        return None
+    return group
+
+
+def score_release(release, category="Movies"):
+    """Rank a release: seeders on a log scale plus quality, source and codec preferences."""
+    score = 10 * math.log2(1 + release.seeders)
+    if category != "Music":
+        score += RESOLUTION_SCORES.get(release.resolution, 5)
+        score += SOURCE_SCORES.get(release.source, 0)
+        score += CODEC_SCORES.get(release.codec, 0)
+    if release.size and release.size < MIN_SIZES.get(category, 0):
+        score -= 30
+    return score
+
+
+def select_releases(releases, category="Movies", limit=50, languages=None, settle_after=None):
+    """
+    Select the best `limit` releases from an iterable of Release records (None entries are skipped).
+
+    Only a min-heap of the current best `limit` is kept, so memory stays bounded and
+    thousands of releases don't need a full sort. Releases seen on several indexers
+    are merged by infohash, keeping the best scoring copy. With settle_after, the
+    iterable stops being consumed once that many releases in a row failed to
+    change a full top list.
+
+    Releases in Cyrillic or with bracketed Russian voice-over tags are always
+    skipped. Pass languages, e.g. ('en', 'multi'), to also keep only releases
+    whose language tag is one of them; untagged releases count as 'en'.
+
+    Returns:
+        list: (score, Release) tuples, best first.
+    """
+    heap = []  # (score, sequence, release), worst of the current best first
+    by_infohash = {}
+    unchanged = 0
+
+    for sequence, release in enumerate(releases):
+        if release is None or release.foreign or (languages and release.language not in languages):
+            unchanged += 1
+        else:
+            entry = (score_release(release, category), sequence, release)
+            existing = by_infohash.get(release.infohash)
+            if existing is not None:
+                if entry[0] > existing[0]:
+                    heap[heap.index(existing)] = entry
+                    heapq.heapify(heap)
+                    by_infohash[release.infohash] = entry
+                    unchanged = 0
+                else:
+                    unchanged += 1
+            elif len(heap) < limit:
+                heapq.heappush(heap, entry)
+                by_infohash[release.infohash] = entry
+                unchanged = 0
+            elif entry[0] > heap[0][0]:
+                removed = heapq.heapreplace(heap, entry)
+                del by_infohash[removed[2].infohash]
+                by_infohash[release.infohash] = entry
+                unchanged = 0
+            else:
+                unchanged += 1
+
+        if settle_after and len(heap) >= limit and unchanged >= settle_after:
+            break
+
+    return [(score, release) for score, _, release in sorted(heap, key=lambda entry: (-entry[0], entry[1]))]
+
+
+def release_to_result(release, score):
+    """Convert a ranked Release into the result dict search_jackett returns."""
+    return {
+        'title': release.title,
+        'seeders': release.seeders,
+        'peers': release.peers,
+        'size': release.size,
+        'magnet': release.magnet,
+        'infohash': release.infohash,
+        'indexer': release.indexer,
+        'resolution': release.resolution,
+        'source': release.source,
+        'codec': release.codec,
+        'group': release.group,
+        'season': release.season,
+        'episode': release.episode,
+        'score': round(score, 1)
+    }
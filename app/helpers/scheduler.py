@@ -0,0 +1,223 @@
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import text
+
+from app.extensions import db
+from app.helpers.metrics import JOB_SECONDS
+from app.helpers.upstream_limiter import BATCH, upstream_priority
+
+# Arbitrary key of the PostgreSQL advisory lock held by the scheduler leader
+SCHEDULER_LOCK_KEY = 740_111_823
+# Job runs older than this are deleted as new runs are recorded
+JOB_HISTORY_DAYS = 30
+
+
+class LeaderLock:
+    """
+    Cluster-wide lock deciding which process runs the scheduled jobs.
+
+    On PostgreSQL a session-level advisory lock is taken on a dedicated
+    connection: it is held for as long as that connection lives and released
+    by the server when the process dies. Other databases (SQLite) use an
+    exclusive flock on a file next to the cache, which the OS releases the
+    same way, so it covers every process on the host.
+    """
+
+    def __init__(self, engine, lock_file):
+        self.engine = engine
+        self.lock_file = lock_file
+        self._connection = None
+        self._file = None
+
+    @property
+    def held(self):
+        return self._connection is not None or self._file is not None
+
+    def try_acquire(self):
+        if self.held:
+            return True
+        if self.engine.dialect.name == 'postgresql':
+            return self._acquire_advisory_lock()
+        return self._acquire_file_lock()
+
+    def check(self):
+        """Return whether the lock is still held, dropping it if its connection has gone away."""
+        if self._connection is None:
+            return self.held
+        try:
+            self._connection.execute(text('SELECT 1'))
+            self._connection.commit()  # End the implicit transaction, or the connection sits idle in it
+            return True
+        except Exception as e:
+            logging.warning(f"Lost the scheduler lock connection: {e}")
+            self.release()
+            return False
+
+    def release(self):
+        if self._connection is not None:
+            try:
+                self._connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': SCHEDULER_LOCK_KEY})
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _acquire_advisory_lock(self):
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(
+                text('SELECT pg_try_advisory_lock(:key)'), {'key': SCHEDULER_LOCK_KEY}
+            ).scalar()
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if acquired:
+            self._connection = connection
+        else:
+            connection.close()
+        return bool(acquired)
+
+    def _acquire_file_lock(self):
+        try:
+            import fcntl
+        except ImportError:
+            # No flock on this platform; with a single process per host that is fine
+            logging.warning("File locking is unavailable; this process runs the scheduler unconditionally.")
+            self._file = open(os.devnull)
+            return True
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_file)), exist_ok=True)
+        lock = open(self.lock_file, 'a')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        self._file = lock
+        return True
+
+
+class SchedulerLeadership:
+    """
+    Starts a scheduler only in the process that holds the LeaderLock.
+
+    Every election_interval seconds a follower tries to take the lock (so a new
+    leader takes over within that time when the old one exits) and the leader
+    checks it still holds it, pausing its jobs if not.
+    """
+
+    def __init__(self, app, scheduler, lock, election_interval=30):
+        self.app = app
+        self.scheduler = scheduler
+        self.lock = lock
+        self.election_interval = election_interval
+        self.is_leader = False
+        self._stop = threading.Event()
+
+    def start(self):
+        self._elect()
+        thread = threading.Thread(target=self._run, name='scheduler-election', daemon=True)
+        thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        self.lock.release()
+
+    def _run(self):
+        while not self._stop.wait(self.election_interval):
+            try:
+                self._elect()
+            except Exception as e:
+                logging.error(f"Scheduler leader election failed: {e}")
+
+    def _elect(self):
+        with self.app.app_context():
+            if self.is_leader:
+                if self.lock.check():
+                    return
+                self.is_leader = False
+                self.scheduler.pause()
+                logging.warning("No longer the scheduler leader; paused scheduled jobs.")
+                return
+
+            if not self.lock.try_acquire():
+                return
+            self.is_leader = True
+            if self.scheduler.running:
+                self.scheduler.resume()
+            else:
+                self.scheduler.start()
+            logging.info(f"Became the scheduler leader ({process_name()}); scheduled jobs run in this process.")
+
+
+def process_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def recorded_job(app, func):
+    """
+    Wrap a scheduled job so it runs in an app context, with batch priority for
+    upstream calls, and each run is stored as a JobRun.
+
+    Exceptions are logged and recorded rather than propagated to the scheduler.
+    """
+    from app.models import JobRun
+
+    @wraps(func)
+    def run():
+        with app.app_context(), upstream_priority(BATCH):
+            job_run = JobRun(job_name=func.__name__, host=process_name())
+            try:
+                db.session.add(job_run)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f"Could not record start of {func.__name__}: {e}")
+                job_run = None
+
+            start = time.monotonic()
+            status, error = 'Success', None
+            try:
+                func()
+            except Exception as e:
+                db.session.rollback()
+                status, error = 'Failed', str(e)[:500]
+                current_app.logger.error(f"Error running {func.__name__}: {e}")
+            duration = time.monotonic() - start
+            JOB_SECONDS.observe(duration, job=func.__name__, status=status.lower())
+
+            if job_run is None:
+                return
+            try:
+                job_run.finished_at = datetime.utcnow()
+                job_run.duration = duration
+                job_run.status = status
+                job_run.error = error
+                JobRun.query.filter(
+                    JobRun.job_name == func.__name__,
+                    JobRun.started_at < datetime.utcnow() - timedelta(days=JOB_HISTORY_DAYS)
+                ).delete(synchronize_session=False)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f"Could not record result of {func.__name__}: {e}")
+    return run
+
+
+def recent_job_runs(limit=20):
+    """Return the latest job runs, newest first."""
+    from app.models import JobRun
+    return JobRun.query.order_by(JobRun.started_at.desc()).limit(limit).all()
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from app.helpers.metrics import CACHE_LOOKUPS
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    """Return the process-wide torrent search cache, creating it on first use."""
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                config = Config()
+                _search_cache = SearchCache(
+                    hit_ttl=config.JACKETT_CACHE_HIT_TTL,
+                    miss_ttl=config.JACKETT_CACHE_MISS_TTL,
+                    stale_ttl=config.JACKETT_CACHE_STALE_TTL,
+                    max_entries=config.JACKETT_CACHE_MAX_ENTRIES,
+                    redis_url=config.JACKETT_CACHE_REDIS_URL
+                )
+    return _search_cache
+
+
+class SearchCache:
+    """
+    TTL cache for search results, keyed by normalized query and category.
+
+    - Searches that found something are kept for hit_ttl, empty ones for the
+      shorter miss_ttl so a release that appears later is still picked up.
+      Failed searches (no answer at all) are never cached.
+    - For stale_ttl after expiry the old result is returned immediately while
+      the search is repeated in the background (stale-while-revalidate).
+    - Entries live in a bounded in-process LRU, or in Redis when redis_url is
+      set so every worker shares them.
+    """
+
+    _refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='search-cache-refresh')
+
+    def __init__(self, hit_ttl, miss_ttl, stale_ttl, max_entries, redis_url=None):
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_tasks = set()
+        self._redis = None
+
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=2)
+                self._redis.ping()
+            except Exception as e:
+                logging.warning(f"Search cache could not connect to Redis, using in-process cache: {e}")
+                self._redis = None
+
+    @staticmethod
+    def make_key(query, category):
+        normalized = re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', query.lower())).strip()
+        return f"search:{category}:{normalized}"
+
+    def get_or_search(self, query, category, search):
+        """
+        Return cached results for (query, category), or call search() and cache its result.
+
+        search() must return a list of JSON-serializable results, or None on failure.
+        """
+        key = self.make_key(query, category)
+        entry = self._lookup(key, query)
+        if entry is not None:
+            if entry['stale']:
+                self._schedule_refresh(key, search)
+            return entry['results']
+
+        results = search()
+        self._store(key, results)
+        return results if results is not None else []
+
+    async def get_or_search_async(self, query, category, search):
+        """Async variant of get_or_search, for a search() returning a coroutine. Redis is only used from worker threads."""
+        key = self.make_key(query, category)
+        entry = await asyncio.to_thread(self._lookup, key, query)
+        if entry is not None:
+            if entry['stale']:
+                self._schedule_refresh_async(key, search)
+            return entry['results']
+
+        results = await search()
+        await asyncio.to_thread(self._store, key, results)
+        return results if results is not None else []
+
+    def _lookup(self, key, query):
+        """Return the usable entry for key, with 'stale' set when it needs a refresh, or None on a miss."""
+        entry = self._load(key)
+        now = time.time()
+
+        if entry:
+            if now < entry['expires_at']:
+                CACHE_LOOKUPS.inc(cache='search', result='hit')
+                logging.info(f"Search cache hit for '{query}' ({len(entry['results'])} results).")
+                return {**entry, 'stale': False}
+            if now < entry['expires_at'] + self.stale_ttl:
+                CACHE_LOOKUPS.inc(cache='search', result='stale')
+                logging.info(f"Serving stale search results for '{query}' while refreshing.")
+                return {**entry, 'stale': True}
+
+        CACHE_LOOKUPS.inc(cache='search', result='miss')
+        return None
+
+    def invalidate(self, query, category):
+        key = self.make_key(query, category)
+        if self._redis is not None:
+            try:
+                self._redis.delete(key)
+            except Exception as e:
+                logging.warning(f"Search cache delete failed: {e}")
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _load(self, key):
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(key)
+                return json.loads(raw) if raw else None
+            except Exception as e:
+                logging.warning(f"Search cache read failed: {e}")
+                return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, results):
+        if results is None:
+            return
+
+        ttl = self.hit_ttl if results else self.miss_ttl
+        entry = {'results': results, 'expires_at': time.time() + ttl}
+        if self._redis is not None:
+            try:
+                self._redis.set(key, json.dumps(entry), ex=int(ttl + self.stale_ttl))
+            except Exception as e:
+                logging.warning(f"Search cache write failed: {e}")
+            return
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _schedule_refresh(self, key, search):
+        if not self._start_refresh(key):
+            return
+
+        def refresh():
+            try:
+                self._store(key, search())
+            except Exception as e:
+                logging.warning(f"Background search refresh failed for {key}: {e}")
+            finally:
+                self._end_refresh(key)
+
+        self._refresher.submit(refresh)
+
+    def _schedule_refresh_async(self, key, search):
+        if not self._start_refresh(key):
+            return
+
+        async def refresh():
+            try:
+                results = await search()
+                await asyncio.to_thread(self._store, key, results)
+            except Exception as e:
+                logging.warning(f"Background search refresh failed for {key}: {e}")
+            finally:
+                self._end_refresh(key)
+                self._refresh_tasks.discard(task)
+
+        task = asyncio.ensure_future(refresh())
+        self._refresh_tasks.add(task)
+
+    def _start_refresh(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _end_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
@@ -0,0 +1,81 @@
+import importlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from config import on_config_change
+
+# Service name -> (module, class). Modules are only imported when a service is first used,
+# so importing a blueprint neither contacts upstreams nor loads their client libraries.
+SERVICE_CLASSES = {
+    'qbittorrent': ('app.helpers.qbittorrent_helper', 'QBittorrentHelper'),
+    'jackett': ('app.helpers.jackett_helper', 'JackettHelper'),
+    'jellyfin': ('app.helpers.jellyfin_helper', 'JellyfinHelper'),
+    'tmdb': ('app.helpers.tmdb_helper', 'TMDbHelper'),
+    'spotify': ('app.helpers.spotify_helper', 'SpotifyHelper'),
+    'radarr': ('app.helpers.radarr_helper', 'RadarrHelper'),
+    'sonarr': ('app.helpers.sonarr_helper', 'SonarrHelper'),
+    'lidarr': ('app.helpers.lidarr_helper', 'LidarrHelper'),
+}
+
+_services = {}
+_init_times = {}
+_services_lock = threading.Lock()  # Guards the dicts above, never held while a helper is created
+_creation_locks = {}  # Service name -> lock held while that helper is created
+
+
+def get_service(name):
+    """Return the process-wide helper for a service, importing and creating it on first use."""
+    service = _services.get(name)
+    if service is None:
+        # One lock per service: a slow constructor only holds up callers of the same service,
+        # and a helper may use get_service() for another one while it is being created
+        with _services_lock:
+            creation_lock = _creation_locks.setdefault(name, threading.Lock())
+        with creation_lock:
+            service = _services.get(name)
+            if service is None:
+                module_name, class_name = SERVICE_CLASSES[name]
+                start = time.perf_counter()
+                service = getattr(importlib.import_module(module_name), class_name)()
+                with _services_lock:
+                    _init_times[name] = time.perf_counter() - start
+                    _services[name] = service
+                logging.info(f"Initialized {class_name} in {_init_times[name]:.3f}s.")
+    return service
+
+
+@on_config_change
+def _reset_services(old, new):
+    # Helpers read URLs and credentials when they are created, so rebuild them on next use
+    with _services_lock:
+        _services.clear()
+
+
+def service_report():
+    """Return [(service, seconds)] for the helpers created so far in this process, slowest first."""
+    with _services_lock:
+        return sorted(_init_times.items(), key=lambda item: item[1], reverse=True)
+
+
+class StartupTimer:
+    """Records how long each step of application startup takes and logs a summary."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps = []
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - start))
+
+    def report(self):
+        total = time.perf_counter() - self.started
+        steps = ', '.join(f"{name} {seconds:.3f}s" for name, seconds in self.steps)
+        logging.info(f"Application started in {total:.3f}s ({steps}).")
+        return {'total': total, 'steps': list(self.steps)}
@@ -1,6 +1,7 @@
 import logging
 import requests # For type hinting and eventual use
 from config import Config
+from app.helpers.circuit_breaker import guarded_request, get_circuit_breaker, http_probe
 
 class SonarrHelper:
     def __init__(self):
@@ -11,6 +12,10 @@ class SonarrHelper:
 
         if not self.api_url or not self.api_key:
             self.logger.warning("Sonarr API URL or API Key is not configured. SonarrHelper may not function.")
+        else:
+            get_circuit_breaker('sonarr', probe=http_probe(
+                f"{self.api_url.rstrip('/')}/api/v3/system/status", headers={'X-Api-Key': self.api_key}
+            ))
 
     def check_series_exists(self, tvdb_id):
         """
@@ -25,7 +30,7 @@ class SonarrHelper:
             endpoint = f"{self.api_url.rstrip('/')}/api/v3/series"
             headers = {'X-Api-Key': self.api_key}
             
-            response = requests.get(endpoint, headers=headers)
+            response = guarded_request('sonarr', 'GET', endpoint, headers=headers)
             response.raise_for_status()
             series_list = response.json()
             
@@ -54,12 +59,10 @@ class SonarrHelper:
         headers = {'X-Api-Key': self.api_key}
 
         try:
-            response = requests.get(endpoint, headers=headers)
+            response = guarded_request('sonarr', 'GET', endpoint, headers=headers)
             response.raise_for_status()
             folders = response.json()
-            self.logger.info(f"Found {len(folders)} root folders in Sonarr")
-            for folder in folders:
-                self.logger.info(f"  - {folder.get('path')}")
+            self.logger.info(f"Found {len(folders)} root folders in Sonarr: {', '.join(str(folder.get('path')) for folder in folders)}")
             return folders
         except Exception as e:
             self.logger.error(f"Error getting root folders from Sonarr: {e}")
@@ -125,7 +128,7 @@ class SonarrHelper:
         self.logger.info(f"Sonarr add_series X-Api-Key: {headers.get('X-Api-Key', 'Key_Not_Set')[:5]}...") # Log first 5 chars
 
         try:
-            response = requests.post(endpoint, json=payload, headers=headers)
+            response = guarded_request('sonarr', 'POST', endpoint, json=payload, headers=headers)
             response.raise_for_status()
             self.logger.info(f"Series '{title}' added to Sonarr successfully. Response: {response.json()}")
             return True
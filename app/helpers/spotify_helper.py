@@ -1,16 +1,8 @@
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-from app.helpers.jackett_helper import JackettHelper  # Corrected absolute import
-from app.helpers.qbittorrent_helper import QBittorrentHelper  # Corrected absolute import
+from app.helpers.services import get_service
+from app.helpers.tracing import span
 import logging
 from config import Config
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-
-# Load configuration details for helper classes
-jackett_helper = JackettHelper()
-qb_helper = QBittorrentHelper()
 
 class SpotifyHelper:
     def __init__(self):
@@ -25,7 +17,9 @@ class SpotifyHelper:
             self.client_secret = None
             self.spotify = None
         else:
-            # Initialize Spotipy with the credentials
+            # Initialize Spotipy with the credentials; imported here so it only loads when Spotify is used
+            import spotipy
+            from spotipy.oauth2 import SpotifyClientCredentials
             self.spotify = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
                 client_id=self.client_id,
                 client_secret=self.client_secret
@@ -38,7 +32,8 @@ class SpotifyHelper:
             return False
 
         try:
-            results = self.spotify.search(q=title, type='track,album,artist', limit=1)
+            with span('search', 'spotify'):
+                results = self.spotify.search(q=title, type='track,album,artist', limit=1)
             return len(results['tracks']['items']) > 0 or len(results['albums']['items']) > 0 or len(results['artists']['items']) > 0
         except Exception as e:
             logging.error(f"Error checking music for title '{title}': {e}")
@@ -51,7 +46,8 @@ class SpotifyHelper:
             return None
 
         try:
-            results = self.spotify.search(q=title, type='track,album,artist', limit=1)
+            with span('search', 'spotify'):
+                results = self.spotify.search(q=title, type='track,album,artist', limit=1)
             if results['tracks']['items']:
                 return results['tracks']['items'][0]
             elif results['albums']['items']:
@@ -69,13 +65,13 @@ def download_music(title):
     """Search for a music torrent using Jackett and add it to qBittorrent for downloading."""
     try:
         # Search for the torrent using Jackett
-        magnet_link = jackett_helper.search_jackett(title, category='Music')
+        magnet_link = get_service('jackett').search_jackett(title, category='Music')
         if not magnet_link:
             logging.error(f"No torrents found for music title: {title}")
             return
 
         # Add the torrent to qBittorrent for downloading
-        qb_helper.add_torrent(magnet_link, save_path="/mnt/media")  # Update with the desired save path
+        get_service('qbittorrent').add_torrent(magnet_link, save_path="/mnt/media")  # Update with the desired save path
         logging.info(f"Started download for: {title}")
     except Exception as e:
         logging.error(f"Error during music download process for '{title}': {e}")
\ No newline at end of file
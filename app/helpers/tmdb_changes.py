@@ -0,0 +1,202 @@
+import json
+import logging
+import re
+from datetime import date, timedelta
+from app.models import db, Request, Recommendation, RecommendationSource, MediaRecommendation
+from app.helpers.tmdb_helper import TMDbHelper, get_tmdb_cache
+from app.helpers.concurrent_fetcher import ConcurrentFetcher
+
+# TMDb only serves the changes feed for the last 14 days
+MAX_CHANGES_WINDOW_DAYS = 14
+TMDB_URL_ID_PATTERN = re.compile(r'/(movie|tv)/(\d+)')
+# Changed ids per IN (...) query; SQLite allows 999 bound parameters
+IN_CHUNK_SIZE = 500
+
+
+def tmdb_kind(media_type):
+    """Map a stored media type ('Movie', 'TV Show', 'tv', ...) to TMDb's 'movie' or 'tv' path."""
+    return 'movie' if (media_type or '').lower() == 'movie' else 'tv'
+
+
+def rows_with_ids(query, column, ids):
+    """Return the rows of query whose column is one of ids, selected in chunks of IN_CHUNK_SIZE ids."""
+    ids = sorted(ids)
+    rows = []
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        rows.extend(query.filter(column.in_(ids[start:start + IN_CHUNK_SIZE])).all())
+    return rows
+
+
+class TMDbChangesSync:
+    """
+    Applies TMDb's /movie/changes and /tv/changes feeds to locally cached data.
+
+    For every title TMDb reports as changed since the last run this evicts the
+    cached TMDb responses about it, marks library recommendation sources built
+    from it as stale, and refreshes the copies of its metadata stored in
+    recommendations, media_recommendations and request classification_data.
+    This lets the response cache keep long TTLs without serving stale details.
+    """
+
+    def __init__(self):
+        self.tmdb_helper = TMDbHelper()
+        self.cache = get_tmdb_cache()
+
+    def fetch_changed_ids(self, kind, start_date, end_date):
+        """Return the set of ids changed in the window, or None if any page could not be fetched."""
+        url = f"{self.tmdb_helper.base_url}/{kind}/changes"
+        params = {
+            "api_key": self.tmdb_helper.api_key,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "page": 1
+        }
+        first_page = self.tmdb_helper._make_request(url, params)
+        if first_page is None:
+            return None
+
+        pages = [first_page]
+        total_pages = first_page.get("total_pages", 1)
+        if total_pages > 1:
+            fetcher = ConcurrentFetcher(max_workers=self.tmdb_helper.max_workers)
+            remaining = fetcher.map(
+                lambda page: self.tmdb_helper._make_request(url, {**params, "page": page}),
+                range(2, total_pages + 1)
+            )
+            if any(response is None for response in remaining.values()):
+                return None
+            pages.extend(remaining.values())
+
+        return {item["id"] for page in pages for item in page.get("results", []) if item.get("id")}
+
+    def run(self):
+        """
+        Process all changes since the previous run.
+
+        Returns:
+            dict: Counts of changed ids, evicted cache entries and updated rows, or None on failure.
+        """
+        if not self.tmdb_helper.api_key:
+            logging.error("TMDb API key is not configured correctly.")
+            return None
+
+        today = date.today()
+        last_run = self.cache.get_meta('changes_last_run')
+        start_date = date.fromisoformat(last_run) if last_run else today - timedelta(days=1)
+        start_date = max(start_date, today - timedelta(days=MAX_CHANGES_WINDOW_DAYS - 1))
+
+        changed = {}
+        for kind in ('movie', 'tv'):
+            ids = self.fetch_changed_ids(kind, start_date, today)
+            if ids is None:
+                logging.error(f"Could not read TMDb {kind} changes since {start_date}; will retry next run.")
+                return None
+            changed[kind] = ids
+
+        evicted = sum(self.cache.invalidate_resources(kind, ids) for kind, ids in changed.items())
+        updated = self.apply_to_database(changed)
+        self.cache.set_meta('changes_last_run', today.isoformat())
+
+        summary = {
+            'movies_changed': len(changed['movie']),
+            'tv_changed': len(changed['tv']),
+            'cache_evicted': evicted,
+            'rows_updated': updated
+        }
+        logging.info(f"TMDb changes sync since {start_date}: {summary}")
+        return summary
+
+    def apply_to_database(self, changed):
+        """
+        Mark stale sources and refresh stored metadata for changed titles. Returns rows updated.
+
+        Rows keyed by a TMDb id column are selected by id in SQL. Recommendations
+        (keyed by their TMDb URL) and TV requests (whose TMDb id is inside
+        classification_data) have no such column and are still scanned.
+        """
+        if not any(changed.values()):
+            return 0
+
+        def is_changed(kind, tmdb_id):
+            try:
+                return int(tmdb_id) in changed[kind]
+            except (TypeError, ValueError):
+                return False
+
+        # Movie and TV ids overlap, so rows matched by id are checked against their own kind
+        changed_ids = changed['movie'] | changed['tv']
+        updated = 0
+        for source in rows_with_ids(RecommendationSource.query, RecommendationSource.tmdb_id, changed_ids):
+            if is_changed(tmdb_kind(source.media_type), source.tmdb_id):
+                source.refreshed_at = None  # Rebuilt by the next RecommendationBuilder run
+                updated += 1
+
+        media_recommendations = [
+            rec for rec in rows_with_ids(MediaRecommendation.query, MediaRecommendation.tmdb_id, changed_ids)
+            if is_changed(tmdb_kind(rec.media_type), rec.tmdb_id)
+        ]
+
+        recommendations = []
+        for rec in Recommendation.query.filter(Recommendation.url.isnot(None)):
+            match = TMDB_URL_ID_PATTERN.search(rec.url)
+            if match and is_changed(match.group(1), match.group(2)):
+                recommendations.append((rec, match.group(1), int(match.group(2))))
+
+        # Movie requests store the TMDb id as external_id; TV requests store the TVDB id there
+        movie_requests = rows_with_ids(
+            Request.query.filter(Request.classification_data.isnot(None), Request.arr_service == 'radarr'),
+            Request.external_id, {str(tmdb_id) for tmdb_id in changed['movie']}
+        )
+        tv_requests = Request.query.filter(
+            Request.classification_data.isnot(None), Request.arr_service == 'sonarr'
+        ).all() if changed['tv'] else []
+
+        requests_to_update = []
+        for req in movie_requests + tv_requests:
+            try:
+                data = json.loads(req.classification_data)
+            except (TypeError, ValueError):
+                continue
+            kind = 'movie' if req.arr_service == 'radarr' else 'tv'
+            tmdb_id = req.external_id if kind == 'movie' else (data.get('additional_data') or {}).get('tmdb_id')
+            if is_changed(kind, tmdb_id):
+                requests_to_update.append((req, data, kind, int(tmdb_id)))
+
+        wanted = {(tmdb_kind(rec.media_type), rec.tmdb_id) for rec in media_recommendations}
+        wanted.update((kind, tmdb_id) for _, kind, tmdb_id in recommendations)
+        wanted.update((kind, tmdb_id) for _, _, kind, tmdb_id in requests_to_update)
+        details = ConcurrentFetcher(max_workers=self.tmdb_helper.max_workers).map(
+            lambda item: self.tmdb_helper.get_details(item[1], item[0]), wanted
+        )
+
+        for rec in media_recommendations:
+            info = details.get((tmdb_kind(rec.media_type), rec.tmdb_id))
+            if info:
+                rec.title = info.get('title') or info.get('name') or rec.title
+                rec.description = info.get('overview') or rec.description
+                rec.thumbnail_url = self._poster_url(info) or rec.thumbnail_url
+                updated += 1
+
+        for rec, kind, tmdb_id in recommendations:
+            info = details.get((kind, tmdb_id))
+            if info:
+                rec.description = info.get('overview') or rec.description
+                rec.thumbnail_url = self._poster_url(info) or rec.thumbnail_url
+                updated += 1
+
+        for req, data, kind, tmdb_id in requests_to_update:
+            info = details.get((kind, tmdb_id))
+            if info:
+                release_date = info.get('release_date') or info.get('first_air_date') or ''
+                data['title'] = info.get('title') or info.get('name') or data.get('title')
+                data['description'] = info.get('overview') or data.get('description')
+                data['poster_url'] = self._poster_url(info) or data.get('poster_url')
+                data['year'] = int(release_date[:4]) if release_date[:4].isdigit() else data.get('year')
+                req.classification_data = json.dumps(data)
+                updated += 1
+
+        db.session.commit()
+        return updated
+
+    def _poster_url(self, info):
+        return f"{self.tmdb_helper.image_base_url}{info['poster_path']}" if info.get('poster_path') else None
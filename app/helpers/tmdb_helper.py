@@ -1,11 +1,51 @@
+import asyncio
 import requests
 import logging
+import os
 import re
+import threading
 from config import Config
 from app.models import db, Recommendation, PastRecommendation
+from app.helpers.concurrent_fetcher import ConcurrentFetcher
+from app.helpers.http_cache import HttpCache
+from app.helpers.logging_setup import log_sampled
+from app.helpers.upstream_limiter import UpstreamBusyError
 from datetime import datetime, timedelta
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Per-endpoint cache lifetimes in seconds, first match wins. Per-title entries can live
+# long because TMDbChangesSync evicts them as soon as TMDb reports the title changed.
+TMDB_CACHE_TTLS = (
+    (r'/changes$', 3600),
+    (r'/search/', 24 * 3600),
+    (r'/recommendations$', 7 * 24 * 3600),
+    (r'/external_ids$', 30 * 24 * 3600),
+    (r'/(movie/upcoming|tv/airing_today)$', 6 * 3600),
+    (r'/(movie|tv)/\d+$', 30 * 24 * 3600),
+)
+_cache = None
+_cache_lock = threading.Lock()
+
+# Sub-resources fetched alongside details via append_to_response
+DEFAULT_APPENDS = ('external_ids', 'recommendations', 'images', 'alternative_titles')
+
+# TMDb rejects page numbers above 500
+TMDB_MAX_PAGES = 500
+
+
+def get_tmdb_cache():
+    """Return the process-wide disk-backed TMDb response cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = Config()
+                _cache = HttpCache(
+                    os.path.join(config.CACHE_DIR, 'tmdb.sqlite'),
+                    ttl_rules=TMDB_CACHE_TTLS,
+                    max_entries=config.CACHE_MAX_ENTRIES
+                )
+    return _cache
+
 
 class TMDbHelper:
     def __init__(self):
@@ -13,6 +53,8 @@ class TMDbHelper:
         self.api_key = config.TMDB_API_KEY
         self.base_url = "https://api.themoviedb.org/3"
         self.image_base_url = "https://image.tmdb.org/t/p/w500"
+        self.max_workers = config.TMDB_MAX_WORKERS
+        self.cache = get_tmdb_cache()
         
         if not self.api_key:
             logging.warning("TMDb API key is not configured.")
@@ -39,9 +81,10 @@ class TMDbHelper:
     def _make_request(self, url, params):
         """Helper method to make HTTP requests and handle errors."""
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            # Served from the response cache when fresh; only cache misses count against TMDb's upstream budget
+            return self.cache.get_json(url, params, timeout=10)
+        except UpstreamBusyError:
+            raise
         except requests.exceptions.Timeout:
             logging.error(f"Request to {url} timed out.")
             return None
@@ -49,6 +92,18 @@ class TMDbHelper:
             logging.error(f"HTTP request error for {url}: {e}")
             return None
 
+    async def _make_request_async(self, url, params):
+        """Async variant of _make_request, fetching cache misses with the shared async HTTP client."""
+        import httpx
+        try:
+            return await self.cache.get_json_async(url, params, timeout=10)
+        except httpx.TimeoutException:
+            logging.error(f"Request to {url} timed out.")
+            return None
+        except httpx.HTTPError as e:
+            logging.error(f"HTTP request error for {url}: {e}")
+            return None
+
     def generate_tmdb_url(self, media_type, tmdb_id, title):
         """Generate a TMDb URL based on media type, ID, and title."""
         base_url = "https://www.themoviedb.org"
@@ -56,14 +111,19 @@ class TMDbHelper:
         slug_title = re.sub(r'[^a-zA-Z0-9-]', '', title.replace(' ', '-').lower())  # Slugify the title
         return f"{base_url}{prefix}{tmdb_id}-{slug_title}"
 
-    def get_recommendations(self, title, media_type):
-        """Fetch recommendations for a given title."""
+    def fetch_recommendations(self, title, media_type, limit=10):
+        """
+        Fetch scored TMDb recommendations for a title without consulting the database.
+
+        Returns a (tmdb_id, recommendations) tuple, or None if TMDb could not be reached
+        so callers can tell a failed lookup apart from a title with no recommendations.
+        """
         if not self.api_key:
             logging.error("TMDb API key is not configured correctly.")
-            return []
+            return None
 
-        logging.info(f"Fetching recommendations for '{title}' as {media_type}")
-        media_path = 'movie' if media_type.lower() == 'movie' else 'tv'
+        is_movie = media_type.lower() == 'movie'
+        media_path = 'movie' if is_movie else 'tv'
         search_url = f"{self.base_url}/search/{media_path}"
         params = {
             "api_key": self.api_key,
@@ -73,52 +133,134 @@ class TMDbHelper:
         }
         search_response = self._make_request(search_url, params)
 
-        if not search_response or not search_response.get("results"):
+        if search_response is None:
+            return None
+        if not search_response.get("results"):
             logging.info(f"No results found for '{title}'")
-            return []
+            return None, []
 
         media_id = search_response["results"][0].get('id')
         if not media_id:
             logging.warning(f"No ID found for '{title}'")
-            return []
+            return None, []
+
+        details = self.get_details(media_id, media_path)
+        if details is None:
+            return None
+
+        results = details.get("recommendations", {}).get("results", [])[:limit]
+        recommendations = []
+        for rank, rec in enumerate(results):
+            recommended_title = rec.get('title' if is_movie else 'name')
+            if not recommended_title or not rec.get('id'):
+                logging.warning(f"Skipping invalid recommendation data: {rec}")
+                continue
+
+            thumbnail_url = f"{self.image_base_url}{rec['poster_path']}" if rec.get('poster_path') else None
+            recommendations.append({
+                "tmdb_id": rec['id'],
+                "title": recommended_title,
+                "media_type": media_type,
+                "url": self.generate_tmdb_url(media_path, rec['id'], recommended_title),
+                "overview": rec.get('overview') or 'No description available.',
+                "thumbnail_url": thumbnail_url,
+                "score": self.score_recommendation(rec, rank, len(results))
+            })
+
+        return media_id, recommendations
+
+    def get_details(self, tmdb_id, media_type, append=DEFAULT_APPENDS):
+        """
+        Fetch a movie or TV show's details in a single request.
+
+        Sub-resources named in append (external_ids, recommendations, images, ...)
+        are embedded in the response via append_to_response, e.g.
+        details["external_ids"]["tvdb_id"] or details["recommendations"]["results"].
+        Callers should stick to the default append list so they share one cache entry.
+        """
+        if not self.api_key:
+            logging.error("TMDb API key is not configured correctly.")
+            return None
+        return self._make_request(*self._details_request(tmdb_id, media_type, append))
+
+    async def get_details_async(self, tmdb_id, media_type, append=DEFAULT_APPENDS):
+        """Async variant of get_details."""
+        if not self.api_key:
+            logging.error("TMDb API key is not configured correctly.")
+            return None
+        return await self._make_request_async(*self._details_request(tmdb_id, media_type, append))
 
-        recommendations_url = f"{self.base_url}/{media_path}/{media_id}/recommendations"
+    def _details_request(self, tmdb_id, media_type, append):
+        """Return the (url, params) of a details request."""
+        media_path = 'movie' if media_type.lower() == 'movie' else 'tv'
         params = {
             "api_key": self.api_key,
             "language": "en-US"
         }
-        recommendations_response = self._make_request(recommendations_url, params)
+        if append:
+            params["append_to_response"] = ",".join(append)
+            if "images" in append:
+                params["include_image_language"] = "en,null"  # Otherwise images are filtered to the response language
+        return f"{self.base_url}/{media_path}/{tmdb_id}", params
+
+    def get_details_batch(self, tmdb_ids, media_type, append=DEFAULT_APPENDS):
+        """
+        Fetch details for many ids of one media type concurrently.
+
+        Returns:
+            dict: Mapping of TMDb id to the get_details() result (None on failure).
+
+        Raises:
+            UpstreamBusyError: When TMDb's budget is used up for an interactive call.
+        """
+        fetcher = ConcurrentFetcher(max_workers=self.max_workers)
+        return fetcher.map(lambda tmdb_id: self.get_details(tmdb_id, media_type, append), tmdb_ids)
+
+    async def get_details_batch_async(self, tmdb_ids, media_type, append=DEFAULT_APPENDS):
+        """Async variant of get_details_batch: all requests are in flight at once on the event loop."""
+        tmdb_ids = list(dict.fromkeys(tmdb_ids))
+        results = await asyncio.gather(
+            *(self.get_details_async(tmdb_id, media_type, append) for tmdb_id in tmdb_ids), return_exceptions=True
+        )
+        busy = next((result for result in results if isinstance(result, UpstreamBusyError)), None)
+        if busy:
+            raise busy
+        return {tmdb_id: None if isinstance(result, Exception) else result for tmdb_id, result in zip(tmdb_ids, results)}
+
+    def fetch_recommendations_batch(self, items):
+        """
+        Fetch recommendations for many (title, media_type) pairs concurrently.
+
+        Requests are spread over a thread pool and throttled by the shared TMDb rate
+        limiter, so throughput is bounded by TMDb's budget rather than round trips.
+
+        Returns:
+            dict: Mapping of (title, media_type) to the fetch_recommendations() result.
+        """
+        fetcher = ConcurrentFetcher(max_workers=self.max_workers)
+        return fetcher.map(lambda item: self.fetch_recommendations(*item), items)
+
+    @staticmethod
+    def score_recommendation(rec, rank, total):
+        """Blend TMDb's recommendation order with the community rating into a 0-1 score."""
+        position = 1 - rank / max(total, 1)
+        rating = min(rec.get('vote_average') or 0, 10) / 10
+        return round(0.6 * position + 0.4 * rating, 4)
 
-        if not recommendations_response or not recommendations_response.get("results"):
-            logging.info(f"No recommendations found for '{title}'")
+    def get_recommendations(self, title, media_type):
+        """Fetch recommendations for a given title."""
+        logging.info(f"Fetching recommendations for '{title}' as {media_type}")
+        fetched = self.fetch_recommendations(title, media_type)
+        if not fetched:
             return []
 
         recommendations = []
-        for rec in recommendations_response.get("results", [])[:10]:  # Limit to top 10
-            recommended_title = rec.get('title' if media_type.lower() == 'movie' else 'name')
-            if not recommended_title:
-                logging.warning(f"Skipping invalid recommendation data: {rec}")
-                continue
-
+        for rec in fetched[1]:
             # Skip existing recommendations
-            if self.recommendation_exists(title, recommended_title):
-                logging.info(f"Skipping existing recommendation '{recommended_title}'")
+            if self.recommendation_exists(title, rec['title']):
+                log_sampled('tmdb.existing_recommendation', logging.INFO, f"Skipping existing recommendation '{rec['title']}'")
                 continue
-
-            # Log thumbnail downloading issues
-            thumbnail_url = None
-            if rec.get('poster_path'):
-                thumbnail_url = f"{self.image_base_url}{rec['poster_path']}"
-            else:
-                logging.warning(f"No poster available for recommendation '{recommended_title}'")
-
-            recommendations.append({
-                "title": recommended_title,
-                "media_type": media_type,
-                "url": self.generate_tmdb_url(media_type, rec['id'], recommended_title),
-                "overview": rec.get('overview', 'No description available.'),
-                "thumbnail_url": thumbnail_url
-            })
+            recommendations.append(rec)
 
         logging.info(f"Found {len(recommendations)} new recommendations for '{title}'")
         return recommendations
@@ -149,6 +291,33 @@ class TMDbHelper:
         # Assuming the first result is the most relevant match
         return search_response["results"][0]
 
+    def get_alternative_titles(self, title, media_type, countries=('US', 'GB'), limit=2):
+        """
+        Return other names a title is released under (original title, regional titles).
+
+        Only Latin-script names different from the given title are returned, as
+        those are the ones torrent releases tend to use.
+        """
+        media = self.get_media_details(title, media_type)
+        if not media:
+            return []
+
+        details = self.get_details(media["id"], media_type) or {}
+        alternatives = details.get("alternative_titles", {})
+        candidates = [media.get("original_title") or media.get("original_name")]
+        candidates.extend(
+            alt.get("title") for alt in alternatives.get("titles", alternatives.get("results", []))
+            if alt.get("iso_3166_1") in countries
+        )
+
+        seen = {title.lower()}
+        names = []
+        for name in candidates:
+            if name and name.isascii() and name.lower() not in seen:
+                seen.add(name.lower())
+                names.append(name)
+        return names[:limit]
+
     def get_upcoming_movies(self, region="US"):
         if not self.api_key:
             logging.error("TMDb API key is not configured correctly.")
@@ -157,12 +326,12 @@ class TMDbHelper:
         today = datetime.now().strftime("%Y-%m-%d")
         three_months_later = (datetime.now() + timedelta(days=90)).strftime("%Y-%m-%d")
         
-        # Add the region parameter to the request URL
-        url = f"{self.base_url}/movie/upcoming?api_key={self.api_key}&language=en-US&region={region}"
-        response = requests.get(url)
-        response.raise_for_status()
-
-        results = response.json().get('results', [])
+        params = {
+            "api_key": self.api_key,
+            "language": "en-US",
+            "region": region
+        }
+        results = self.get_all_pages("/movie/upcoming", params) or []
         # Filter results for release dates between today and three months from now
         filtered_results = [
             movie for movie in results
@@ -181,44 +350,42 @@ class TMDbHelper:
         endpoint = "/tv/airing_today"
         params = {
             "api_key": self.api_key,
-            "language": "en-GB",  # Default to en-GB
-            "page": 1  # Start with the first page
+            "language": "en-GB"  # Default to en-GB
         }
 
-        try:
-            # Fetch all pages of results
-            all_results = self.get_all_pages(endpoint, params)
+        # Fetch all pages of results
+        all_results = self.get_all_pages(endpoint, params) or []
 
-            # Log the total number of results
-            logging.info(f"Retrieved {len(all_results)} TV shows airing today.")
-            return all_results
+        # Log the total number of results
+        logging.info(f"Retrieved {len(all_results)} TV shows airing today.")
+        return all_results
 
-        except Exception as e:
-            logging.error(f"Error fetching TV shows airing today: {e}")
-            return []
-
-    def get_all_pages(self, endpoint, params):
+    def get_all_pages(self, endpoint, params, max_pages=TMDB_MAX_PAGES):
         """
         Fetch all pages of results from a paginated TMDb endpoint.
-        """
-        results = []
-        try:
-            while True:
-                response = self._make_request(f"{self.base_url}{endpoint}", params)
-                if not response or not response.get("results"):
-                    break
 
-                results.extend(response["results"])
+        Page 1 reports total_pages; the remaining pages are then fetched concurrently.
 
-                # Stop if we've reached the last page
-                if response["page"] >= response["total_pages"]:
-                    break
+        Returns:
+            list: Results from every page in page order, or None if page 1 could not be fetched.
+        """
+        url = f"{self.base_url}{endpoint}"
+        first_page = self._make_request(url, {**params, "page": 1})
+        if first_page is None:
+            logging.error(f"Error during pagination for {endpoint}: first page unavailable")
+            return None
 
-                # Move to the next page
-                params['page'] += 1
+        total_pages = min(first_page.get("total_pages") or 1, max_pages)
+        fetcher = ConcurrentFetcher(max_workers=self.max_workers)
+        pages = fetcher.map(lambda page: self._make_request(url, {**params, "page": page}), range(2, total_pages + 1))
+
+        results = list(first_page.get("results", []))
+        for page in range(2, total_pages + 1):
+            response = pages.get(page)
+            if response is None:
+                logging.warning(f"Skipping page {page} of {endpoint}: request failed")
+                continue
+            results.extend(response.get("results", []))
 
-            logging.info(f"Fetched a total of {len(results)} items from {endpoint}.")
-            return results
-        except Exception as e:
-            logging.error(f"Error during pagination for {endpoint}: {e}")
-            return []
\ No newline at end of file
+        logging.info(f"Fetched a total of {len(results)} items from {endpoint} ({total_pages} pages).")
+        return results
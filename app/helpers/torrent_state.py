@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+
+from qbittorrentapi import TorrentDictionary
+
+from config import Config, on_config_change
+from app.helpers.qbittorrent_helper import get_qbittorrent_client
+
+_torrent_state = None
+_torrent_state_lock = threading.Lock()
+
+
+def get_torrent_state():
+    """Return the process-wide torrent state mirror, creating it on first use."""
+    global _torrent_state
+    if _torrent_state is None:
+        with _torrent_state_lock:
+            if _torrent_state is None:
+                _torrent_state = TorrentState(get_qbittorrent_client(), Config().QB_SYNC_MAX_AGE)
+    return _torrent_state
+
+
+@on_config_change
+def _reset_torrent_state(old, new):
+    global _torrent_state
+    if old.get('qBittorrent') != new.get('qBittorrent'):
+        with _torrent_state_lock:
+            _torrent_state = None
+
+
+class TorrentState:
+    """
+    In-memory mirror of qBittorrent's torrent list, kept current with /sync/maindata.
+
+    qBittorrent answers sync/maindata with a response id (rid). Passing the last
+    rid back returns only what changed since then: changed fields of changed
+    torrents and the hashes of removed ones. The first request, or one whose
+    rid qBittorrent no longer knows, gets a full_update with every torrent.
+
+    Readers get the table as of at most max_age seconds ago; when it is older,
+    the first reader syncs while concurrent readers wait for that same sync
+    instead of sending their own.
+    """
+
+    def __init__(self, client, max_age=2):
+        self.client = client
+        self.max_age = max_age
+        self._torrents = {}
+        self._rid = 0
+        self._synced_at = 0
+        self._lock = threading.Lock()
+
+    def sync(self):
+        """Apply the changes since the last sync to the table."""
+        data = self.client.sync_maindata(rid=self._rid)
+        if data.get('full_update'):
+            self._torrents = {}
+        for torrent_hash, changes in (data.get('torrents') or {}).items():
+            torrent = self._torrents.setdefault(torrent_hash, {'hash': torrent_hash})
+            torrent.update(changes)
+        for torrent_hash in data.get('torrents_removed') or []:
+            self._torrents.pop(torrent_hash, None)
+        self._rid = data.get('rid', 0)
+        self._synced_at = time.monotonic()
+        logging.debug(
+            f"Synced qBittorrent state (rid {self._rid}, "
+            f"{'full' if data.get('full_update') else 'delta'}): {len(self._torrents)} torrents."
+        )
+
+    def torrents(self, states=None):
+        """
+        Return torrents from the table, syncing first if it is older than max_age.
+
+        Args:
+            states: Optional collection of qBittorrent states to keep.
+
+        Returns:
+            list: TorrentDictionary copies, as torrents_info() would return them.
+        """
+        with self._lock:
+            if time.monotonic() - self._synced_at >= self.max_age:
+                self.sync()
+            torrents = [dict(torrent) for torrent in self._torrents.values()
+                        if states is None or torrent.get('state') in states]
+        return [TorrentDictionary(torrent, client=self.client) for torrent in torrents]
+
+    def reset(self):
+        """Forget the table so the next read fetches a full update."""
+        with self._lock:
+            self._torrents = {}
+            self._rid = 0
+            self._synced_at = 0
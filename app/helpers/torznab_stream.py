@@ -0,0 +1,50 @@
+import xml.etree.ElementTree as ET
+
+TORZNAB_ATTR_TAG = '{http://torznab.com/schemas/2015/feed}attr'
+CHUNK_SIZE = 16 * 1024
+
+
+def iter_torznab_results(chunks):
+    """
+    Incrementally parse a Torznab RSS feed, yielding each <item> as a Jackett-style result dict.
+
+    Items are detached from the tree as soon as they are converted, so memory
+    use stays constant however many items the feed contains. Stopping the
+    iteration early stops reading the response.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    channel = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == 'start':
+                if element.tag == 'channel':
+                    channel = element
+                continue
+            if element.tag == 'item':
+                yield _item_to_result(element)
+                if channel is not None:
+                    channel.remove(element)
+    parser.close()
+
+
+def _item_to_result(item):
+    attrs = {attr.get('name'): attr.get('value') for attr in item.iter(TORZNAB_ATTR_TAG)}
+    indexer = item.find('jackettindexer')
+    link = item.findtext('link') or ''
+    return {
+        'Title': item.findtext('title'),
+        'Seeders': _to_int(attrs.get('seeders')),
+        'Peers': _to_int(attrs.get('peers')),
+        'Size': _to_int(item.findtext('size') or attrs.get('size')),
+        'MagnetUri': attrs.get('magneturl') or (link if link.startswith('magnet:') else None),
+        'InfoHash': attrs.get('infohash'),
+        'Tracker': indexer.text if indexer is not None else None,
+    }
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,275 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import requests
+from flask import before_render_template, g, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+
+# Spans kept per trace; a request issuing more (e.g. a query per row) only keeps the totals of the rest
+MAX_SPANS = 500
+
+_current_trace = contextvars.ContextVar('trace', default=None)
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+class Trace:
+    """
+    Spans recorded while handling one request.
+
+    Spans are appended from the request thread and from worker threads the
+    request fans out to (see run_in_trace), so they only carry offsets from
+    the start of the request and are never nested.
+    """
+
+    def __init__(self, name, request_id='-'):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.request_id = request_id
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.totals = {}
+        self.renders = []  # Start times of templates being rendered
+        self.duration = None
+        self.status = None
+
+    def add(self, name, category, start, end, **attributes):
+        total = self.totals.setdefault(category, [0.0, 0])
+        total[0] += end - start
+        total[1] += 1
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append({
+                'name': name,
+                'category': category,
+                'start_ms': round((start - self.start) * 1000, 2),
+                'duration_ms': round((end - start) * 1000, 2),
+                **attributes
+            })
+
+    def finish(self, status):
+        self.duration = time.perf_counter() - self.start
+        self.status = status
+
+    def server_timing(self):
+        """Return the Server-Timing header value: the time spent per category, then the total."""
+        entries = [
+            f'{category};dur={seconds * 1000:.1f};desc="{count} call{"s" if count != 1 else ""}"'
+            for category, (seconds, count) in sorted(self.totals.items(), key=lambda item: -item[1][0])
+        ]
+        entries.append(f'total;dur={self.duration * 1000:.1f}')
+        return ', '.join(entries)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'request_id': self.request_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 2),
+            'status': self.status,
+            'totals_ms': {category: round(seconds * 1000, 2) for category, (seconds, _) in self.totals.items()},
+            'spans': self.spans
+        }
+
+
+def record_span(name, category, start, end, **attributes):
+    """Add a span measured with time.perf_counter() to the current trace, if there is one."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, category, start, end, **attributes)
+
+
+@contextmanager
+def span(name, category, **attributes):
+    """Time the enclosed block as a span of the current trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, category, start, time.perf_counter(), **attributes)
+
+
+def run_in_trace(func):
+    """
+    Return func bound to a copy of the caller's context, so spans it records
+    on a worker thread belong to the caller's trace. Copy once per submission:
+    a context cannot run on two threads at once.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+
+class TraceExporter:
+    """
+    Writes finished traces from a background thread, as JSON lines to a
+    rotating file and, when otlp_endpoint is set, to an OpenTelemetry
+    collector over OTLP/HTTP. A full queue drops traces instead of blocking.
+    """
+
+    def __init__(self, path, otlp_endpoint='', max_queued=1000):
+        self.otlp_endpoint = otlp_endpoint.rstrip('/')
+        self._queue = queue.Queue(maxsize=max_queued)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = RotatingFileHandler(path, maxBytes=20 * 1024 * 1024, backupCount=3)
+        self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            pass
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                return
+            try:
+                self._file.emit(logging.makeLogRecord({'msg': json.dumps(trace, default=str)}))
+                if self.otlp_endpoint:
+                    requests.post(f"{self.otlp_endpoint}/v1/traces", json=otlp_payload(trace), timeout=5)
+            except Exception as e:
+                logging.warning(f"Could not export trace {trace['trace_id']}: {e}")
+
+
+def otlp_payload(trace):
+    """Convert a trace dict to an OTLP/HTTP JSON ExportTraceServiceRequest."""
+    start_ns = int(trace['started_at'] * 1e9)
+    root_id = uuid.uuid4().hex[:16]
+
+    def attributes(values):
+        return [{'key': key, 'value': {'stringValue': str(value)}} for key, value in values.items()]
+
+    spans = [{
+        'traceId': trace['trace_id'],
+        'spanId': root_id,
+        'name': trace['name'],
+        'kind': 2,  # SERVER
+        'startTimeUnixNano': str(start_ns),
+        'endTimeUnixNano': str(start_ns + int(trace['duration_ms'] * 1e6)),
+        'attributes': attributes({'http.status_code': trace['status'], 'request_id': trace['request_id']})
+    }]
+    for child in trace['spans']:
+        child_start = start_ns + int(child['start_ms'] * 1e6)
+        extra = {key: value for key, value in child.items() if key not in ('name', 'start_ms', 'duration_ms')}
+        spans.append({
+            'traceId': trace['trace_id'],
+            'spanId': uuid.uuid4().hex[:16],
+            'parentSpanId': root_id,
+            'name': child['name'],
+            'kind': 3,  # CLIENT
+            'startTimeUnixNano': str(child_start),
+            'endTimeUnixNano': str(child_start + int(child['duration_ms'] * 1e6)),
+            'attributes': attributes(extra)
+        })
+    return {'resourceSpans': [{
+        'resource': {'attributes': attributes({'service.name': 'media-management'})},
+        'scopeSpans': [{'scope': {'name': 'app.helpers.tracing'}, 'spans': spans}]
+    }]}
+
+
+def get_trace_exporter():
+    """Return the process-wide trace exporter, starting its thread on first use."""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                config = Config()
+                _exporter = TraceExporter(config.TRACING_FILE, config.TRACING_OTLP_ENDPOINT)
+    return _exporter
+
+
+def init_tracing(app):
+    """
+    Trace every request: time upstream calls, SQL statements and template
+    renders, return the breakdown in a Server-Timing header, and export
+    sampled traces (and every slow one).
+    """
+    config = Config()
+    if not config.TRACING_ENABLED:
+        return
+
+    @app.before_request
+    def start_trace():
+        trace = Trace(f"{request.method} {request.url_rule or request.path}", g.get('request_id', '-'))
+        g.trace_token = _current_trace.set(trace)
+
+    @app.after_request
+    def finish_trace(response):
+        trace = _current_trace.get()
+        if trace is None:
+            return response
+        trace.finish(response.status_code)
+        if config.TRACING_SERVER_TIMING:
+            response.headers['Server-Timing'] = trace.server_timing()
+        _export(trace)
+        return response
+
+    @app.teardown_request
+    def end_trace(exc):
+        trace = _current_trace.get()
+        if trace is not None and trace.duration is None:
+            # The view raised, so after_request did not run
+            trace.finish(500)
+            _export(trace)
+        token = g.pop('trace_token', None)
+        if token is not None:
+            _current_trace.reset(token)
+
+    def _export(trace):
+        if trace.duration * 1000 >= config.TRACING_SLOW_MS or random.random() < config.TRACING_SAMPLE_RATE:
+            get_trace_exporter().submit(trace.to_dict())
+
+    @before_render_template.connect_via(app)
+    def start_render(sender, template, context, **extra):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.renders.append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def finish_render(sender, template, context, **extra):
+        trace = _current_trace.get()
+        if trace is not None and trace.renders:
+            trace.add(template.name or 'template', 'render', trace.renders.pop(), time.perf_counter())
+
+    if not event.contains(Engine, 'before_cursor_execute', _start_query_span):
+        event.listen(Engine, 'before_cursor_execute', _start_query_span)
+        event.listen(Engine, 'after_cursor_execute', _finish_query_span)
+
+
+def _start_query_span(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own context: a statement that fails never reaches the after hook
+    if context is not None and _current_trace.get() is not None:
+        context._trace_query_start = time.perf_counter()
+
+
+def _finish_query_span(conn, cursor, statement, parameters, context, executemany):
+    trace = _current_trace.get()
+    start = getattr(context, '_trace_query_start', None)
+    if trace is None or start is None:
+        return
+    trace.add('query', 'db', start, time.perf_counter(), statement=statement[:200])
@@ -0,0 +1,273 @@
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import requests
+from flask import has_request_context, jsonify, request
+
+from config import Config, on_config_change
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+# Seconds between checks for a free slot when a service's concurrency limit is reached
+LEASE_POLL_INTERVAL = 0.05
+# Leases older than this belong to a process that died mid-call and no longer count
+LEASE_TTL = 120
+
+_priority = contextvars.ContextVar('upstream_priority', default=None)
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+class UpstreamBusyError(requests.exceptions.RequestException):
+    """Raised instead of calling a service whose budget is used up, when the caller can't wait."""
+
+    def __init__(self, service, retry_after):
+        super().__init__(f"{service} is busy; retry in {retry_after:.1f}s")
+        self.service = service
+        self.retry_after = retry_after
+
+
+def current_priority():
+    """Return the priority class of upstream calls made here: interactive inside a request, batch otherwise."""
+    priority = _priority.get()
+    if priority is None:
+        priority = INTERACTIVE if has_request_context() else BATCH
+    return priority
+
+
+@contextmanager
+def upstream_priority(priority):
+    """Make upstream calls in the enclosed block (and work it hands to run_in_trace) use a priority class."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class UpstreamLimiter:
+    """
+    Request rate and concurrency limits per upstream service, shared by every
+    process on the host through a SQLite database.
+
+    Each limited service has a token bucket (rate per second, up to burst
+    tokens saved up) and optionally a cap on calls in flight. A call takes a
+    token and a lease in one transaction and returns the lease when done.
+
+    Interactive calls (made while handling a request) may use the whole
+    budget but only wait max_wait seconds for it, then raise
+    UpstreamBusyError so the user gets a 429 instead of a hanging page.
+    Batch calls (scheduled jobs, scripts) wait as long as it takes, but only
+    use batch_share of the concurrency and leave the rest of the bucket to
+    interactive calls. A budget too small to split that way (MusicBrainz
+    allows one call a second, one at a time) goes to batch calls only once
+    no interactive call has asked for it in the last batch_idle seconds.
+    """
+
+    def __init__(self, path, limits, batch_share=0.5, max_wait=0.5, batch_idle=10):
+        self.path = path
+        self.limits = limits
+        self.batch_share = batch_share
+        self.max_wait = max_wait
+        self.batch_idle = batch_idle
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute('CREATE TABLE IF NOT EXISTS buckets (service TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS leases (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                service TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_leases_service ON leases(service)')
+        conn.execute('CREATE TABLE IF NOT EXISTS interactive_use (service TEXT PRIMARY KEY, used_at REAL NOT NULL)')
+
+    def _connection(self):
+        """Return this thread's SQLite connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, service, priority=None):
+        """
+        Wait for a token and a slot of service.
+
+        Returns:
+            The lease to pass to release(), or None if nothing needs releasing.
+
+        Raises:
+            UpstreamBusyError: For an interactive call that would wait longer than max_wait.
+        """
+        limits = self.limits.get(service)
+        if not limits:
+            return None
+        priority = priority or current_priority()
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            lease, wait = self._try_acquire(service, limits, priority)
+            if not wait:
+                return lease
+            self._check_deadline(service, priority, wait, deadline)
+            time.sleep(wait)
+
+    async def acquire_async(self, service, priority=None):
+        """Like acquire(), but waits without blocking the event loop; the SQLite transaction runs on a worker thread."""
+        limits = self.limits.get(service)
+        if not limits:
+            return None
+        priority = priority or current_priority()
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            lease, wait = await asyncio.to_thread(self._try_acquire, service, limits, priority)
+            if not wait:
+                return lease
+            self._check_deadline(service, priority, wait, deadline)
+            await asyncio.sleep(wait)
+
+    def release(self, lease):
+        if lease is None:
+            return
+        try:
+            self._connection().execute('DELETE FROM leases WHERE id = ?', (lease,))
+        except sqlite3.Error as e:
+            logging.warning(f"Could not release upstream lease {lease}: {e}")
+
+    async def release_async(self, lease):
+        if lease is not None:
+            await asyncio.to_thread(self.release, lease)
+
+    @contextmanager
+    def slot(self, service):
+        """Hold a token and a slot of service for the enclosed call."""
+        lease = self.acquire(service)
+        try:
+            yield
+        finally:
+            self.release(lease)
+
+    @asynccontextmanager
+    async def slot_async(self, service):
+        lease = await self.acquire_async(service)
+        try:
+            yield
+        finally:
+            await self.release_async(lease)
+
+    def _check_deadline(self, service, priority, wait, deadline):
+        if priority == INTERACTIVE and time.monotonic() + wait > deadline:
+            logging.warning(f"Upstream {service} is over budget; refusing an interactive call.")
+            raise UpstreamBusyError(service, wait)
+
+    def _try_acquire(self, service, limits, priority):
+        """Take a token and a lease in one transaction: return (lease, 0), or (None, seconds to wait)."""
+        rate = limits.get('rate')
+        capacity = limits.get('burst') or rate
+        concurrency = limits.get('concurrency')
+        batch = priority == BATCH
+        # Batch calls leave a reserve for interactive ones; a bucket too small for one waits until full
+        batch_tokens = min(capacity, 1 + capacity * (1 - self.batch_share)) if rate else None
+        batch_slots = max(1, int(concurrency * self.batch_share)) if concurrency else None
+        # With no token or slot left over for interactive calls, batch calls keep out of their way instead
+        unshared = (rate and batch_tokens < 2) or (concurrency and batch_slots >= concurrency)
+        now = time.time()  # Wall clock: buckets are shared between processes
+        conn = self._connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                tokens = None
+                wait = 0
+                if not batch:
+                    conn.execute('INSERT OR REPLACE INTO interactive_use (service, used_at) VALUES (?, ?)', (service, now))
+                elif unshared:
+                    row = conn.execute('SELECT used_at FROM interactive_use WHERE service = ?', (service,)).fetchone()
+                    if row is not None and now - row[0] < self.batch_idle:
+                        wait = self.batch_idle - (now - row[0])
+
+                if not wait and rate:
+                    row = conn.execute('SELECT tokens, updated FROM buckets WHERE service = ?', (service,)).fetchone()
+                    tokens = capacity if row is None else min(capacity, row[0] + max(now - row[1], 0) * rate)
+                    needed = batch_tokens if batch else 1
+                    if tokens < needed:
+                        wait = (needed - tokens) / rate
+
+                if not wait and concurrency:
+                    conn.execute('DELETE FROM leases WHERE service = ? AND expires_at < ?', (service, now))
+                    running, batch_running = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(priority = 'batch'), 0) FROM leases WHERE service = ?", (service,)
+                    ).fetchone()
+                    if running >= concurrency or (batch and batch_running >= batch_slots):
+                        wait = LEASE_POLL_INTERVAL
+
+                lease = None
+                if not wait:
+                    if tokens is not None:
+                        tokens -= 1
+                    if concurrency:
+                        lease = conn.execute(
+                            'INSERT INTO leases (service, priority, expires_at) VALUES (?, ?, ?)',
+                            (service, priority, now + LEASE_TTL)
+                        ).lastrowid
+                if tokens is not None:
+                    conn.execute('INSERT OR REPLACE INTO buckets (service, tokens, updated) VALUES (?, ?, ?)', (service, tokens, now))
+                conn.execute('COMMIT')
+                return lease, wait
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            # A broken limits database must not take the upstreams down with it
+            logging.warning(f"Upstream limiter unavailable, not limiting {service}: {e}")
+            return None, 0
+
+
+def get_upstream_limiter():
+    """Return the process-wide upstream limiter, creating it on first use."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                config = Config()
+                _limiter = UpstreamLimiter(
+                    config.UPSTREAM_LIMITS_FILE,
+                    config.UPSTREAM_LIMITS,
+                    batch_share=config.UPSTREAM_BATCH_SHARE,
+                    max_wait=config.UPSTREAM_MAX_WAIT,
+                    batch_idle=config.UPSTREAM_BATCH_IDLE
+                )
+    return _limiter
+
+
+@on_config_change
+def _reset_limiter(old, new):
+    # Budgets are read when the limiter is created; the buckets themselves live on in the database
+    global _limiter
+    _limiter = None
+
+
+def busy_response(error):
+    """Return the 429 answer to a request refused by the limiter."""
+    retry_after = str(max(1, math.ceil(error.retry_after)))
+    message = f"{error.service} is busy, please try again in a moment."
+    if request.accept_mimetypes.best == 'application/json' or request.is_json:
+        return jsonify({'success': False, 'error': message}), 429, {'Retry-After': retry_after}
+    return message, 429, {'Retry-After': retry_after}
+
+
+def init_upstream_limits(app):
+    """Answer requests whose upstream calls were refused with 429 and a Retry-After header."""
+    app.register_error_handler(UpstreamBusyError, busy_response)
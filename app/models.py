@@ -58,6 +58,10 @@ class Request(db.Model):
             return 'lidarr'
         return None
 
+    def may_be_music(self):
+        """Whether classifying this request needs the music sources: not once it is known to be a movie or TV show."""
+        return self.get_target_service() not in ('radarr', 'sonarr')
+
     def is_classified(self):
         """Check if request has been classified by the intelligence engine."""
         return self.arr_service is not None and self.confidence_score is not None
@@ -121,3 +125,54 @@ class IgnoredRecommendation(db.Model):
     recommendation_id = db.Column(db.Integer, db.ForeignKey('recommendations.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     ignored_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Materialized recommendations, written by RecommendationBuilder and read by /recommendations
+class RecommendationSource(db.Model):
+    __tablename__ = 'recommendation_sources'
+    id = db.Column(db.Integer, primary_key=True)
+    media_type = db.Column(db.String(20), nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    tmdb_id = db.Column(db.Integer)  # Resolved on first refresh
+    refreshed_at = db.Column(db.DateTime, index=True)  # None until the builder has processed this item
+    last_error = db.Column(db.String(255))
+
+    __table_args__ = (
+        db.UniqueConstraint('media_type', 'title', name='uq_recommendation_sources_type_title'),
+    )
+
+    # Relationships
+    recommendations = db.relationship('MediaRecommendation', back_populates='source', cascade='all, delete-orphan')
+
+
+class MediaRecommendation(db.Model):
+    __tablename__ = 'media_recommendations'
+    id = db.Column(db.Integer, primary_key=True)
+    source_id = db.Column(db.Integer, db.ForeignKey('recommendation_sources.id'), nullable=False, index=True)
+    tmdb_id = db.Column(db.Integer)
+    title = db.Column(db.String(255), nullable=False)
+    media_type = db.Column(db.String(20), nullable=False)
+    url = db.Column(db.String(512), nullable=True)  # TMDb URL
+    description = db.Column(db.Text, nullable=True)
+    thumbnail_url = db.Column(db.String(512), nullable=True)
+    score = db.Column(db.Float, default=0.0, index=True)  # 0.0-1.0, higher is better
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    source = db.relationship('RecommendationSource', back_populates='recommendations')
+
+
+class JobRun(db.Model):
+    __tablename__ = 'job_runs'
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    duration = db.Column(db.Float)  # Seconds
+    status = db.Column(db.String(20), default='Running')  # 'Running', 'Success' or 'Failed'
+    error = db.Column(db.String(500))
+    host = db.Column(db.String(255))  # hostname:pid of the process that ran the job
+
+    __table_args__ = (
+        db.Index('ix_job_runs_job_started', 'job_name', 'started_at'),
+    )
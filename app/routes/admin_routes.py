@@ -1,8 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_from_directory
 from flask_login import login_required, current_user
 from app.models import User, Download  # Import the Download model
 from werkzeug.security import generate_password_hash
 from app.extensions import db
+from app.helpers.circuit_breaker import circuit_breakers
+from app.helpers.services import service_report
+from app.helpers.scheduler import recent_job_runs
+from app.helpers import profiler
+import tracemalloc
 from functools import wraps
 
 admin_bp = Blueprint('admin_routes', __name__)
@@ -23,6 +28,62 @@ def admin():
     users = User.query.all()
     return render_template('admin.html', users=users)
 
+@admin_bp.route('/admin/services', methods=['GET'])
+@admin_required
+def services():
+    # Circuit breaker state of each external service this worker has talked to
+    return render_template(
+        'services.html',
+        services=circuit_breakers(),
+        startup=current_app.extensions.get('startup_report'),
+        helpers=service_report(),
+        leadership=current_app.extensions.get('scheduler_leadership'),
+        job_runs=recent_job_runs()
+    )
+
+@admin_bp.route('/admin/profiling', methods=['GET', 'POST'])
+@admin_required
+def profiling():
+    # Profiles cover only the worker process that handles these requests
+    if request.method == 'POST':
+        action = request.form.get('action')
+        try:
+            if action == 'profile_requests':
+                profiler.start_request_profile(request.form['endpoint'], max(int(request.form.get('count', 10)), 1))
+                flash('Profiling started.', 'success')
+            elif action == 'profile_window':
+                profiler.start_window_profile(max(int(request.form.get('seconds', 30)), 1))
+                flash('Profiling started.', 'success')
+            elif action == 'stop_profile':
+                name = profiler.finish_profile()
+                flash(f'Saved profile {name}.' if name else 'No profile was running.', 'info')
+            elif action == 'start_memory':
+                profiler.start_memory_tracing()
+                flash('Memory tracing started; take a snapshot before and after the suspected growth.', 'success')
+            elif action == 'memory_snapshot':
+                profiler.take_memory_snapshot()
+            elif action == 'stop_memory':
+                profiler.stop_memory_tracing()
+                flash('Memory tracing stopped.', 'info')
+        except (RuntimeError, ValueError, KeyError) as e:
+            flash(str(e), 'danger')
+        return redirect(url_for('admin_routes.profiling'))
+
+    endpoints = sorted({rule.endpoint for rule in current_app.url_map.iter_rules() if rule.endpoint != 'static'})
+    return render_template(
+        'profiling.html',
+        session=profiler.active_profile(),
+        endpoints=endpoints,
+        profiles=profiler.list_profiles(),
+        memory_tracing=tracemalloc.is_tracing(),
+        memory=profiler.memory_report()
+    )
+
+@admin_bp.route('/admin/profiling/<path:name>', methods=['GET'])
+@admin_required
+def download_profile(name):
+    return send_from_directory(profiler.PROFILE_DIR, name, as_attachment=True)
+
 @admin_bp.route('/admin/add', methods=['GET', 'POST'])
 @admin_required
 def add_user():
@@ -1,16 +1,43 @@
+from collections.abc import Mapping
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 import yaml
-import os
+from app.routes.admin_routes import admin_required
+# The same file Config() reads, so saved changes are picked up by reload_config()
+from config import CONFIG_PATH, get_config_data, reload_config
 
 config_bp = Blueprint('config', __name__)
 
-# Update the CONFIG_PATH to point to the root folder
-CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'config.yaml')
+DEFAULT_JACKETT_CATEGORIES = {
+    'Movies': '2000',
+    'Music': '3000',
+    'TV': '5000'
+}
+
+
+def _editable(value):
+    """Return a plain dict/list copy of the frozen config data, for yaml.dump."""
+    if isinstance(value, Mapping):
+        return {key: _editable(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_editable(item) for item in value]
+    return value
+
+
+def _merge(config_data, updates):
+    """Merge updates into config_data section by section, keeping every key the form doesn't show."""
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(config_data.get(key), dict):
+            _merge(config_data[key], value)
+        else:
+            config_data[key] = value
+    return config_data
+
 
 @config_bp.route('/config', methods=['GET', 'POST'])
+@admin_required
 def config():
     if request.method == 'POST':
-        config_data = {
+        form_data = {
             'Database': {
                 'username': request.form['db_username'],
                 'password': request.form['db_password'],
@@ -29,12 +56,7 @@ def config():
             },
             'Jackett': {
                 'server_url': request.form['jackett_server_url'],
-                'api_key': request.form['jackett_api_key'],
-                'categories': {
-                    'Movies': '2000',
-                    'Music': '3000',
-                    'TV': '5000'
-                }
+                'api_key': request.form['jackett_api_key']
             },
             'Jellyfin': {
                 'server_url': request.form['jellyfin_server_url'],
@@ -45,20 +67,19 @@ def config():
                 'client_secret': request.form['spotify_client_secret']
             }
         }
+        # Sections the form doesn't cover (Cache, Scheduler, Metrics, ...) are written back unchanged
+        config_data = _merge(_editable(get_config_data()), form_data)
+        config_data['Jackett'].setdefault('categories', DEFAULT_JACKETT_CATEGORIES)
 
         try:
             with open(CONFIG_PATH, 'w') as file:
                 yaml.dump(config_data, file, default_flow_style=False)
+            # Takes effect right away; helpers holding connections are rebuilt on next use
+            reload_config(force=True)
             flash('Configuration saved successfully!', 'success')
         except Exception as e:
             flash(f'Error saving configuration: {e}', 'danger')
 
         return redirect(url_for('config.config'))
 
-    if os.path.exists(CONFIG_PATH):
-        with open(CONFIG_PATH, 'r') as file:
-            config = yaml.safe_load(file)
-    else:
-        config = {}
-
-    return render_template('config.html', config=config)
\ No newline at end of file
+    return render_template('config.html', config=get_config_data())
\ No newline at end of file
@@ -1,27 +1,15 @@
 from flask import Blueprint, request, jsonify
-from app.helpers.qbittorrent_helper import QBittorrentHelper
-from app.helpers.jackett_helper import JackettHelper
-from app.helpers.jellyfin_helper import JellyfinHelper
-from app.helpers.tmdb_helper import TMDbHelper
-from app.helpers.spotify_helper import SpotifyHelper
+from app.helpers.services import get_service
 from config import Config
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-
 # Create a Blueprint for media routes
 bp = Blueprint('media_routes', __name__)
 
 # Initialize configuration
 config = Config()
 
-# Initialize helper instances with appropriate configurations
-qb_helper = QBittorrentHelper(max_retries=3, retry_delay=5)
-jackett_helper = JackettHelper()
-jellyfin_helper = JellyfinHelper()
-tmdb_helper = TMDbHelper()
-spotify_helper = SpotifyHelper()
+# Helpers are created on first use by get_service and shared across requests
 
 @bp.route('/download', methods=['POST'])
 def download_media():
@@ -37,14 +25,14 @@ def download_media():
         return jsonify({'error': 'Title is required'}), 400
 
     # Search for torrent using Jackett
-    magnet_link = jackett_helper.search_jackett(query=title, category=category)
+    magnet_link = get_service('jackett').search_jackett(query=title, category=category)
     if not magnet_link:
         logging.info(f"No torrent found for {title}")
         return jsonify({'message': f"No torrent found for {title}"}), 404
 
     # Add torrent to qBittorrent
     try:
-        qb_helper.add_torrent(magnet_link, save_path="/downloads")
+        get_service('qbittorrent').add_torrent(magnet_link, save_path="/downloads")
         logging.info(f"Download started for {title}")
         return jsonify({'message': f"Download started for {title}"}), 200
     except Exception as e:
@@ -61,7 +49,7 @@ def check_jellyfin_library():
     if not title:
         return jsonify({'error': 'Title is required'}), 400
 
-    if jellyfin_helper.item_exists(title):
+    if get_service('jellyfin').item_exists(title):
         logging.info(f"{title} exists in the Jellyfin library")
         return jsonify({'message': f"{title} exists in the Jellyfin library"}), 200
     logging.info(f"{title} not found in the Jellyfin library")
@@ -77,7 +65,7 @@ def classify_title():
     if not title:
         return jsonify({'error': 'Title is required'}), 400
 
-    media_type = tmdb_helper.classify_title(title)
+    media_type = get_service('tmdb').classify_title(title)
     if media_type:
         logging.info(f"Classified {title} as {media_type}")
         return jsonify({'title': title, 'media_type': media_type}), 200
@@ -94,7 +82,7 @@ def search_music():
     if not title:
         return jsonify({'error': 'Title is required'}), 400
 
-    is_music = spotify_helper.is_music(title)
+    is_music = get_service('spotify').is_music(title)
     if is_music:
         logging.info(f"{title} is found as a music item on Spotify")
         return jsonify({'message': f"{title} is found as a music item on Spotify"}), 200
@@ -115,11 +103,11 @@ def search_and_confirm():
         return jsonify({'error': 'Title and media type are required'}), 400
 
     # Check if title already exists in Jellyfin
-    if jellyfin_helper.item_exists(title):
+    if get_service('jellyfin').item_exists(title):
         return jsonify({'message': f"{title} already exists in Jellyfin library"}), 200
 
     # Search TMDB
-    result = tmdb_helper.get_media_details(title, media_type, exclude_ids)
+    result = get_service('tmdb').get_media_details(title, media_type, exclude_ids)
     if not result:
         return jsonify({'message': 'No suitable TMDB results found.'}), 404
 
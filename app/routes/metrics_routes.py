@@ -0,0 +1,21 @@
+import hmac
+
+from flask import Blueprint, Response, abort, request
+
+from config import Config
+from app.helpers.metrics import render_metrics
+
+metrics_bp = Blueprint('metrics_routes', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    # Counters and histograms are summed over every worker on the host, so any worker may answer
+    config = Config()
+    if not config.METRICS_ENABLED:
+        abort(404)
+    if config.METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied, config.METRICS_TOKEN):
+            abort(401)
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -1,24 +1,13 @@
 from flask import Blueprint, jsonify, request
-from app.helpers.qbittorrent_helper import QBittorrentHelper
-from app.helpers.jackett_helper import JackettHelper
-from app.helpers.jellyfin_helper import JellyfinHelper
-from app.helpers.tmdb_helper import TMDbHelper
-from app.helpers.spotify_helper import SpotifyHelper
+from app.helpers.services import get_service
 from config import Config
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-
 # Create a Blueprint for the notification routes
 bp = Blueprint('notification_routes', __name__)
 
-# Instantiate helpers with configuration
+# Helpers are created on first use by get_service and shared across requests
 config = Config()
-qb_helper = QBittorrentHelper()
-jackett_helper = JackettHelper()
-jellyfin_helper = JellyfinHelper()
-spotify_helper = SpotifyHelper()
 
 # Route to get notifications (placeholder for actual logic)
 @bp.route('/notifications', methods=['GET'])
@@ -31,7 +20,7 @@ def get_notifications():
 def get_qbittorrent_downloads():
     """Fetch active downloads from qBittorrent."""
     try:
-        active_downloads = qb_helper.get_active_downloads()
+        active_downloads = get_service('qbittorrent').get_active_downloads()
         logging.info("Fetched active downloads from qBittorrent")
         return jsonify({"active_downloads": active_downloads})
     except Exception as e:
@@ -46,7 +35,7 @@ def check_jellyfin_library():
     if not title:
         return jsonify({"error": "Title is required"}), 400
 
-    if jellyfin_helper.item_exists(title):
+    if get_service('jellyfin').item_exists(title):
         logging.info(f"{title} exists in the Jellyfin library")
         return jsonify({"message": f"{title} exists in the Jellyfin library"}), 200
     logging.info(f"{title} not found in the Jellyfin library")
@@ -62,12 +51,12 @@ def start_download():
     if not title:
         return jsonify({"error": "Title is required"}), 400
 
-    magnet_link = jackett_helper.search_jackett(title, category=category)
+    magnet_link = get_service('jackett').search_jackett(title, category=category)
     if not magnet_link:
         logging.info(f"No torrent found for {title}")
         return jsonify({"message": f"No torrent found for {title}"}), 404
 
-    qb_helper.add_torrent(magnet_link, save_path="/downloads")
+    get_service('qbittorrent').add_torrent(magnet_link, save_path="/downloads")
     logging.info(f"Download started for {title}")
     return jsonify({"message": f"Download started for {title}"}), 200
 
@@ -79,7 +68,7 @@ def search_music():
     if not title:
         return jsonify({"error": "Title is required"}), 400
 
-    is_music = spotify_helper.is_music(title)
+    is_music = get_service('spotify').is_music(title)
     if is_music:
         logging.info(f"{title} found on Spotify")
         return jsonify({"message": f"{title} found on Spotify"}), 200
@@ -126,7 +115,7 @@ def get_franchise_info():
 def download_status():
     """Check the status of active downloads in qBittorrent."""
     try:
-        active_downloads = qb_helper.get_active_downloads()
+        active_downloads = get_service('qbittorrent').get_active_downloads()
         logging.info("Fetched active download status")
         return jsonify({"active_downloads": active_downloads}), 200
     except Exception as e:
@@ -141,7 +130,7 @@ def media_details():
         return jsonify({"error": "Title is required"}), 400
 
     try:
-        items = jellyfin_helper.get_existing_items()
+        items = get_service('jellyfin').get_existing_items()
         matched_items = [item for item in items if item.get('Name').lower() == title.lower()]
         if matched_items:
             logging.info(f"Details found for {title} in Jellyfin")
@@ -206,7 +195,7 @@ def check_title_existence():
     if not title:
         return jsonify({"error": "Title is required"}), 400
 
-    exists = jellyfin_helper.item_exists(title)
+    exists = get_service('jellyfin').item_exists(title)
     if exists:
         logging.info(f"{title} already exists in the Jellyfin library")
         return jsonify({"message": f"{title} already exists in the Jellyfin library"}), 200
@@ -221,7 +210,7 @@ def get_spotify_metadata():
     if not title:
         return jsonify({"error": "Title is required"}), 400
 
-    metadata = spotify_helper.get_metadata(title)
+    metadata = get_service('spotify').get_metadata(title)
     if metadata:
         logging.info(f"Metadata found for {title} on Spotify")
         return jsonify({"metadata": metadata}), 200
@@ -242,9 +231,9 @@ def bulk_download():
     download_results = []
     for title in titles:
         try:
-            magnet_link = jackett_helper.search_jackett(title, category=category)
+            magnet_link = get_service('jackett').search_jackett(title, category=category)
             if magnet_link:
-                qb_helper.add_torrent(magnet_link, save_path="/downloads")
+                get_service('qbittorrent').add_torrent(magnet_link, save_path="/downloads")
                 download_results.append({"title": title, "status": "Download started"})
                 logging.info(f"Download started for {title}")
             else:
@@ -261,7 +250,7 @@ def bulk_download():
 def pause_all_downloads():
     """Pause all active downloads in qBittorrent."""
     try:
-        qb_helper.pause_all_downloads()
+        get_service('qbittorrent').pause_all_downloads()
         logging.info("All downloads paused")
         return jsonify({"message": "All downloads paused"}), 200
     except Exception as e:
@@ -273,7 +262,7 @@ def pause_all_downloads():
 def resume_all_downloads():
     """Resume all paused downloads in qBittorrent."""
     try:
-        qb_helper.resume_all_downloads()
+        get_service('qbittorrent').resume_all_downloads()
         logging.info("All downloads resumed")
         return jsonify({"message": "All downloads resumed"}), 200
     except Exception as e:
@@ -5,8 +5,6 @@ from app.helpers.qbittorrent_helper import QBittorrentHelper
 from app.helpers.tmdb_helper import TMDbHelper
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 
 # Create a Blueprint for request processing
 request_processing_bp = Blueprint('request_processing', __name__)
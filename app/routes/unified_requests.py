@@ -1,13 +1,13 @@
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app.models import Request as MediaRequest, db
+from app.helpers.async_http import AsyncTimeoutError, run_async, timeout_response
 from app.helpers.media_classifier import MediaClassifier, MediaService, MediaType
 from app.helpers.request_processor import RequestProcessor
+from app.helpers.upstream_limiter import UpstreamBusyError, busy_response
 import logging
 import json
 
-logging.basicConfig(level=logging.INFO)
-
 unified_requests_bp = Blueprint('unified_requests', __name__)
 
 
@@ -36,7 +36,7 @@ def classify_media():
             }), 400
         
         classifier = MediaClassifier()
-        matches = classifier.classify(query, limit=10)
+        matches = run_async(classifier.classify_async(query, limit=10))
         
         # Convert matches to JSON-serializable format
         results = []
@@ -55,7 +55,7 @@ def classify_media():
             })
         
         # Check if disambiguation is needed
-        has_ambiguity = classifier.has_ambiguity(query)
+        has_ambiguity = MediaClassifier.is_ambiguous(matches)
         
         return jsonify({
             'success': True,
@@ -65,6 +65,10 @@ def classify_media():
             'result_count': len(results)
         })
         
+    except UpstreamBusyError as e:
+        return busy_response(e)
+    except AsyncTimeoutError as e:
+        return timeout_response(e)
     except Exception as e:
         logging.error(f"Classification API error: {e}", exc_info=True)
         return jsonify({
@@ -102,9 +106,9 @@ def create_unified_request():
             confidence = selected_match.get('confidence', 1.0)
             classification_data = json.dumps(selected_match)
         else:
-            # Auto-classify
-            classifier = MediaClassifier()
-            best_match = classifier.get_best_match(title)
+            # Auto-classify; one search answers both which match is best and whether it is ambiguous
+            matches = run_async(MediaClassifier().classify_async(title, limit=5))
+            best_match = matches[0] if matches and matches[0].confidence >= 0.5 else None
             
             if not best_match:
                 return jsonify({
@@ -114,7 +118,7 @@ def create_unified_request():
                 }), 400
             
             # Check if disambiguation is needed
-            if classifier.has_ambiguity(title) and not data.get('skip_disambiguation'):
+            if MediaClassifier.is_ambiguous(matches) and not data.get('skip_disambiguation'):
                 return jsonify({
                     'success': False,
                     'requires_disambiguation': True,
@@ -159,6 +163,10 @@ def create_unified_request():
             'confidence': round(confidence, 2)
         })
         
+    except UpstreamBusyError as e:
+        return busy_response(e)
+    except AsyncTimeoutError as e:
+        return timeout_response(e)
     except Exception as e:
         db.session.rollback()
         logging.error(f"Request creation error: {e}", exc_info=True)
@@ -234,6 +242,8 @@ def reclassify_request(request_id):
                 'confidence': round(best_match.confidence, 2)
             })
         
+    except UpstreamBusyError as e:
+        return busy_response(e)
     except Exception as e:
         db.session.rollback()
         logging.error(f"Reclassification error: {e}", exc_info=True)
@@ -1,39 +1,30 @@
 from flask_wtf.csrf import validate_csrf, generate_csrf
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
-from app.models import Request, User, Download, Media, Recommendation, db, PastRecommendation, IgnoredRecommendation
-from app.helpers.jackett_helper import JackettHelper
-from app.helpers.qbittorrent_helper import QBittorrentHelper
-from app.helpers.tmdb_helper import TMDbHelper
-from app.helpers.radarr_helper import RadarrHelper
-from app.helpers.sonarr_helper import SonarrHelper
-from app.helpers.lidarr_helper import LidarrHelper
+from app.models import Request, User, Download, Media, Recommendation, db, PastRecommendation, IgnoredRecommendation, RecommendationSource, MediaRecommendation
+from app.helpers.services import get_service
+from app.helpers.recommendation_builder import RecommendationBuilder
+from app.helpers.release_calendar import ReleaseCalendar
+from app.helpers.image_cache import get_image_cache
+from config import Config
+from app.helpers.async_http import AsyncTimeoutError, run_async
 import re
 from datetime import datetime
+from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import contains_eager
 import hashlib
 import requests
 import os
 import logging
-from logging.handlers import RotatingFileHandler
-from flask import send_from_directory
-
-# Configure logging
-LOG_DIR = "./logs"
-os.makedirs(LOG_DIR, exist_ok=True)  # Ensure the logs directory exists
-LOG_FILE = os.path.join(LOG_DIR, "app.log")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        RotatingFileHandler(LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=5)  # Rotate logs
-    ]
-)
+from flask import send_from_directory, send_file
 
 bp = Blueprint('web_routes', __name__)
 
+# Cached images never change under their URL, so browsers may keep them for a year
+IMAGE_MAX_AGE = 365 * 24 * 3600
+CONTENT_ADDRESSED_FILENAME = re.compile(r'^[0-9a-f]{64}\.[a-z]+$')
+
 def get_download_path(title, media_type):
     """Determine the correct directory path for the torrent download."""
     title_for_path = re.sub(r'^(The|A|An)\s+', '', title, flags=re.IGNORECASE).strip()
@@ -63,7 +54,7 @@ def dashboard():
 @login_required
 def downloads():
     try:
-        qb_helper = QBittorrentHelper()
+        qb_helper = get_service('qbittorrent')
         active_downloads = qb_helper.get_active_downloads()
         return render_template('downloads.html', downloads=active_downloads)
     except Exception as e:
@@ -111,9 +102,9 @@ def profile():
 @login_required
 def process_requests():
     try:
-        tmdb_helper = TMDbHelper()
-        jackett_helper = JackettHelper()
-        qb_helper = QBittorrentHelper()
+        tmdb_helper = get_service('tmdb')
+        jackett_helper = get_service('jackett')
+        qb_helper = get_service('qbittorrent')
         pending_requests = Request.query.filter_by(status='Pending').all()
 
         if not pending_requests:
@@ -167,7 +158,7 @@ def process_requests():
 @login_required
 def pause_download(hash):
     try:
-        qb_helper = QBittorrentHelper()
+        qb_helper = get_service('qbittorrent')
         qb_helper.qb.torrents_pause(torrent_hashes=hash)
         return jsonify({"message": "Download paused successfully."}), 200
     except Exception as e:
@@ -178,7 +169,7 @@ def pause_download(hash):
 @login_required
 def resume_download(hash):
     try:
-        qb_helper = QBittorrentHelper()
+        qb_helper = get_service('qbittorrent')
         qb_helper.qb.torrents_resume(torrent_hashes=hash)
         return jsonify({"message": "Download resumed successfully."}), 200
     except Exception as e:
@@ -189,7 +180,7 @@ def resume_download(hash):
 @login_required
 def remove_download(hash):
     try:
-        qb_helper = QBittorrentHelper()
+        qb_helper = get_service('qbittorrent')
         qb_helper.qb.torrents_delete(torrent_hashes=hash)
         return jsonify({"message": "Download removed successfully."}), 200
     except Exception as e:
@@ -200,22 +191,26 @@ def remove_download(hash):
 @login_required
 def recommendations():
     try:
-        tmdb_helper = TMDbHelper()
-        recommendations = []
-        
-        # Get all titles already in library (case-insensitive)
-        library_titles = {media.title.lower() for media in Media.query.all()}
-        
-        for media in Media.query.all():
-            media_recommendations = tmdb_helper.get_recommendations(media.title, media.media_type.lower())
-            
-            # Filter out recommendations that are already in the library
-            for rec in media_recommendations:
-                rec_title = rec.get('title', rec.get('name', '')).lower()
-                if rec_title and rec_title not in library_titles:
-                    recommendations.append(rec)
-        
-        return render_template('recommendations.html', recommendations=recommendations)
+        # Recommendations are materialized by RecommendationBuilder; this page only reads them
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', Config().RECOMMENDATIONS_PER_PAGE, type=int), 100)
+
+        library_titles = db.session.query(func.lower(Media.title))
+        already_sent = db.session.query(PastRecommendation.id).filter(
+            PastRecommendation.media_title == RecommendationSource.title,
+            PastRecommendation.related_media_title == MediaRecommendation.title
+        ).exists()
+
+        pagination = MediaRecommendation.query.join(MediaRecommendation.source).options(
+            contains_eager(MediaRecommendation.source)
+        ).filter(
+            ~func.lower(MediaRecommendation.title).in_(library_titles),
+            ~already_sent
+        ).order_by(
+            MediaRecommendation.score.desc(), MediaRecommendation.id
+        ).paginate(page=page, per_page=per_page, error_out=False)
+
+        return render_template('recommendations.html', recommendations=pagination.items, pagination=pagination)
     except Exception as e:
         logging.error(f"Error fetching recommendations: {e}", exc_info=True)
         flash('Error loading recommendations.', 'danger')
@@ -247,38 +242,9 @@ def mark_as_past_recommendation():
 @bp.route('/generate-recommendations', methods=['GET'])
 @login_required
 def generate_recommendations():
-    tmdb_helper = TMDbHelper()
-    jackett_helper = JackettHelper()
-    media_items = Media.query.all()
-    generated_recommendations = []
-
-    for item in media_items:
-        recommendations = tmdb_helper.get_recommendations(title=item.title, media_type=item.media_type)
-        for rec in recommendations:
-            exists = Recommendation.query.filter_by(
-                user_id=current_user.id,
-                title=rec['title']
-            ).first()
-
-            if not exists:
-                new_recommendation = Recommendation(
-                    user_id=current_user.id,
-                    title=rec['title'],
-                    media_type=item.media_type,
-                    description=rec.get('overview', 'No description available.'),
-                    thumbnail_url=rec.get('thumbnail_url', ''),
-                    original_title=item.title  # Store the original title
-                )
-                db.session.add(new_recommendation)
-                generated_recommendations.append({
-                    'original_title': item.title,
-                    'recommended_title': rec['title'],
-                    'media_type': item.media_type
-                })
-
     try:
-        db.session.commit()
-        flash('Recommendations generated successfully!', 'success')
+        created = RecommendationBuilder().generate_user_recommendations(current_user.id)
+        flash(f'{created} recommendations generated successfully!', 'success')
     except Exception as e:
         logging.error(f"Error generating recommendations: {e}", exc_info=True)
         db.session.rollback()
@@ -412,7 +378,7 @@ def add_request():
             logging.info(f"[WEB ADD-REQUEST] Request saved to database with ID: {new_request.id}")
             
             # Send to appropriate *arr service
-            tmdb_helper = TMDbHelper()
+            tmdb_helper = get_service('tmdb')
             logging.info(f"[WEB ADD-REQUEST] Getting TMDb details for {title}")
             media_details = tmdb_helper.get_media_details(title, media_type.lower())
             logging.info(f"[WEB ADD-REQUEST] Media Details: {media_details}")
@@ -421,7 +387,7 @@ def add_request():
                 if media_type.lower() in ['movie'] and media_details:
                     tmdb_id = media_details.get('id')
                     logging.info(f"[WEB ADD-REQUEST] Checking if movie already exists in Radarr...")
-                    radarr = RadarrHelper()
+                    radarr = get_service('radarr')
                     if radarr.api_url and radarr.api_key:
                         # Check if movie already exists
                         if radarr.check_movie_exists(tmdb_id):
@@ -438,15 +404,13 @@ def add_request():
                     # For Sonarr, we need TVDB ID, not TMDb ID
                     tvdb_id = media_details.get('external_ids', {}).get('tvdb_id') if 'external_ids' in media_details else None
                     if not tvdb_id:
-                        # Try to fetch external IDs if not in initial response
-                        tv_id = media_details.get('id')
-                        ext_url = f"https://api.themoviedb.org/3/tv/{tv_id}/external_ids?api_key={tmdb_helper.api_key}"
-                        ext_response = tmdb_helper._make_request(ext_url, {})
-                        tvdb_id = ext_response.get('tvdb_id') if ext_response else None
+                        # Search results don't include external IDs; the details call appends them
+                        details = tmdb_helper.get_details(media_details.get('id'), 'tv')
+                        tvdb_id = details.get('external_ids', {}).get('tvdb_id') if details else None
                     
                     if tvdb_id:
                         logging.info(f"[WEB ADD-REQUEST] Checking if series already exists in Sonarr...")
-                        sonarr = SonarrHelper()
+                        sonarr = get_service('sonarr')
                         if sonarr.api_url and sonarr.api_key:
                             # Check if series already exists
                             if sonarr.check_series_exists(tvdb_id):
@@ -465,7 +429,7 @@ def add_request():
                     # For Lidarr, use the person ID as string for artist lookup
                     person_id = str(media_details.get('id', ''))
                     logging.info(f"[WEB ADD-REQUEST] Checking if artist already exists in Lidarr...")
-                    lidarr = LidarrHelper()
+                    lidarr = get_service('lidarr')
                     if lidarr.api_url and lidarr.api_key:
                         # Check if artist already exists
                         if lidarr.check_artist_exists(title):
@@ -571,41 +535,16 @@ def add_to_requests():
 @login_required
 def future_releases():
     try:
-        tmdb_helper = TMDbHelper()
-        us_movies = tmdb_helper.get_upcoming_movies(region="US")
-        gb_movies = tmdb_helper.get_upcoming_movies(region="GB")
-        us_tv_shows = tmdb_helper.get_upcoming_tv_shows()
-        gb_tv_shows = tmdb_helper.get_upcoming_tv_shows()
-
-        def filter_english_shows(tv_shows):
-            return [show for show in tv_shows if show.get('original_language') in ['en', 'en-US']]
-
-        us_tv_shows = filter_english_shows(us_tv_shows)
-        gb_tv_shows = filter_english_shows(gb_tv_shows)
-
-        def format_results(results, is_movie=True):
-            return [
-                {
-                    'title': item['title'] if is_movie else item['name'],
-                    'release_date': item.get('release_date') if is_movie else item.get('first_air_date'),
-                    'thumbnail_url': item.get('poster_path'),
-                    'overview': item.get('overview', 'No description available.'),
-                    'url': f"https://www.themoviedb.org/movie/{item['id']}" if is_movie else f"https://www.themoviedb.org/tv/{item['id']}"
-                }
-                for item in results
-            ]
-
-        us_movies = format_results(us_movies, is_movie=True)
-        gb_movies = format_results(gb_movies, is_movie=True)
-        us_tv_shows = format_results(us_tv_shows, is_movie=False)
-        gb_tv_shows = format_results(gb_tv_shows, is_movie=False)
+        # Rendered from the daily release calendar snapshot; TMDb is only called when it is out of date
+        calendar = ReleaseCalendar().get()
+        tv_shows = ReleaseCalendar.tv_shows(calendar)
 
         return render_template(
             'future_releases.html',
-            us_movies=us_movies,
-            gb_movies=gb_movies,
-            us_tv_shows=us_tv_shows,
-            gb_tv_shows=gb_tv_shows
+            us_movies=ReleaseCalendar.movies_for(calendar, 'US'),
+            gb_movies=ReleaseCalendar.movies_for(calendar, 'GB'),
+            us_tv_shows=tv_shows,
+            gb_tv_shows=tv_shows
         )
     except Exception as e:
         logging.error(f"Error in /future_releases route: {e}", exc_info=True)
@@ -617,7 +556,7 @@ def future_releases():
 @login_required
 def search_torrents():
     try:
-        jackett_helper = JackettHelper()
+        jackett_helper = get_service('jackett')
         results = None
 
         if request.method == 'POST':
@@ -635,13 +574,17 @@ def search_torrents():
                 return redirect(url_for('web_routes.search_torrents'))
 
             logging.info(f"Searching for torrents with query: {query}")
-            results = jackett_helper.search_jackett(query=query)
+            # Only the query variants and indexer searches run on the shared loop; this thread waits for them
+            results = run_async(jackett_helper.search_jackett_async(query=query))
 
             if not results:
                 flash(f"No torrents found for query: {query}", 'info')
 
         csrf_token = generate_csrf()
         return render_template('search.html', csrf_token=csrf_token, results=results)
+    except AsyncTimeoutError:
+        flash('The search took too long. Please try again.', 'warning')
+        return redirect(url_for('web_routes.search_torrents'))
     except Exception as e:
         logging.error(f"Error in search_torrents: {e}", exc_info=True)
         flash('An error occurred while performing the search.', 'danger')
@@ -676,7 +619,7 @@ def add_to_downloads():
             flash(str(e), "danger")
             return redirect(url_for('web_routes.search_torrents'))
 
-        qb_helper = QBittorrentHelper()
+        qb_helper = get_service('qbittorrent')
         qb_helper.add_torrent(magnet_uri, save_path=download_path)
         logging.info(f"Successfully added torrent '{title}' to path '{download_path}'.")
         flash(f"Torrent '{title}' added to downloads successfully.", "success")
@@ -687,11 +630,38 @@ def add_to_downloads():
     return redirect(url_for('web_routes.search_torrents'))
 
 
+@bp.app_template_filter('cached_image')
+def cached_image_url(url, size='thumb'):
+    """Point a TMDb or Spotify image URL at the local image proxy; other URLs are left alone."""
+    return url_for('web_routes.image_proxy', url=url, size=size) if get_image_cache().is_allowed(url) else url
+
+
+@bp.route('/image_proxy')
+@login_required
+def image_proxy():
+    url = request.args.get('url', '')
+    image_cache = get_image_cache()
+    cached = image_cache.get(url, request.args.get('size', 'thumb'))
+    if not cached:
+        if image_cache.is_allowed(url):
+            return redirect(url)  # Let the browser load it directly rather than show a broken image
+        return "Image not available", 404
+
+    path, digest, content_type = cached
+    response = send_file(path, mimetype=content_type, etag=digest, conditional=True, max_age=IMAGE_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+
 @bp.route('/cached_image/<filename>')
 def cached_image(filename):
-    file_path = os.path.join('/cached_image', filename)
-    logging.info(f"Attempting to serve cached image at: {file_path}")
-    if not os.path.exists(file_path):
-        logging.error(f"File not found: {file_path}")
+    # Content-addressed files from the image cache: <sha256>.<ext>
+    if not CONTENT_ADDRESSED_FILENAME.match(filename):
+        return "File not found", 404
+    directory = os.path.join(get_image_cache().blob_directory, filename[:2])
+    if not os.path.exists(os.path.join(directory, filename)):
+        logging.error(f"File not found: {filename}")
         return "File not found", 404
-    return send_from_directory('/cached_image', filename)
+    response = send_from_directory(directory, filename, etag=filename.split('.')[0], max_age=IMAGE_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
@@ -1,24 +1,152 @@
+import logging
 import os
+import threading
+from types import MappingProxyType
+
 import yaml
 
 # Load configuration from the YAML file
 CONFIG_PATH = 'config.yaml'
+# Seconds between checks of config.yaml for changes
+CONFIG_WATCH_INTERVAL = 2
+
+_snapshot = None  # (file signature, frozen config data)
+_snapshot_lock = threading.Lock()
+_listeners = []
+_watcher = None
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _file_signature():
+    try:
+        stat = os.stat(CONFIG_PATH)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+def get_config_data():
+    """
+    Return the parsed config.yaml as a read-only mapping.
+
+    The file is parsed once per process and the same snapshot is shared by every
+    Config(); it is only rebuilt by reload_config(), which the config watcher
+    calls when the file changes.
+    """
+    snapshot = _snapshot
+    if snapshot is None:
+        reload_config()
+        snapshot = _snapshot
+    return snapshot[1]
+
+
+def reload_config(force=False):
+    """
+    Re-read config.yaml if it changed (or always, with force) and notify listeners.
+
+    The new snapshot is built completely before it replaces the old one, so
+    readers see either the old or the new configuration, never a mix.
+
+    Returns:
+        bool: True if a new snapshot was installed.
+    """
+    global _snapshot
+    with _snapshot_lock:
+        signature = _file_signature()
+        if _snapshot is not None and not force and signature == _snapshot[0]:
+            return False
+
+        try:
+            if signature is not None:
+                with open(CONFIG_PATH, 'r') as file:
+                    data = yaml.safe_load(file) or {}
+            else:
+                data = {}
+        except (OSError, yaml.YAMLError) as e:
+            if _snapshot is not None:
+                logging.error(f"Could not reload {CONFIG_PATH}, keeping the current configuration: {e}")
+                return False
+            raise
+
+        previous = _snapshot[1] if _snapshot else None
+        _snapshot = (signature, _freeze(data))
+        current = _snapshot[1]
+
+    if previous is not None:
+        logging.info(f"Reloaded configuration from {CONFIG_PATH}.")
+        for listener in list(_listeners):
+            try:
+                listener(previous, current)
+            except Exception as e:
+                logging.error(f"Config change listener {getattr(listener, '__name__', listener)} failed: {e}")
+    return True
+
+
+def on_config_change(listener):
+    """
+    Register listener(old_data, new_data), called after config.yaml was reloaded.
+
+    Helpers that keep connections or credentials use it to rebuild them. Can be used as a decorator.
+    """
+    _listeners.append(listener)
+    return listener
+
+
+def start_config_watcher(interval=CONFIG_WATCH_INTERVAL):
+    """Start a daemon thread that reloads the configuration whenever config.yaml changes."""
+    global _watcher
+    with _snapshot_lock:
+        if _watcher is not None:
+            return _watcher
+        stop = threading.Event()
+
+        def watch():
+            while not stop.wait(interval):
+                try:
+                    reload_config()
+                except Exception as e:
+                    logging.error(f"Config watcher failed: {e}")
+
+        _watcher = threading.Thread(target=watch, name='config-watcher', daemon=True)
+        _watcher.start()
+    return _watcher
+
 
 class Config:
     def __init__(self):
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, 'r') as file:
-                config = yaml.safe_load(file)
-        else:
-            config = {}
+        # Parsed once and shared; see get_config_data()
+        config = get_config_data()
 
         self.QB_API_URL = config.get('qBittorrent', {}).get('host', 'http://10.252.0.2:8080')
         self.QB_USERNAME = config.get('qBittorrent', {}).get('username', 'admin')
         self.QB_PASSWORD = config.get('qBittorrent', {}).get('password', 'changeme')
+        self.QB_TIMEOUT = config.get('qBittorrent', {}).get('timeout', 15)  # Seconds to wait for a response
+        self.QB_POOL_SIZE = config.get('qBittorrent', {}).get('pool_size', 10)  # Connections shared by all threads
+        self.QB_SYNC_MAX_AGE = config.get('qBittorrent', {}).get('sync_max_age', 2)  # Seconds a torrent list is reused
 
         self.JACKETT_API_URL = config.get('Jackett', {}).get('server_url', 'http://10.252.0.2:9117/')
         self.JACKETT_API_KEY = config.get('Jackett', {}).get('api_key', 'changeme')
         self.JACKETT_CATEGORIES = config.get('Jackett', {}).get('categories', {})
+        self.JACKETT_INDEXER_TIMEOUT = config.get('Jackett', {}).get('indexer_timeout', 10)  # Seconds per indexer
+        self.JACKETT_MIN_RESULTS = config.get('Jackett', {}).get('min_results', 25)  # Stop once this many usable results arrived
+        self.JACKETT_HEDGE_DELAY = config.get('Jackett', {}).get('hedge_delay', 2)  # Seconds before slow indexers are also queried
+        self.JACKETT_SLOW_INDEXER_SECONDS = config.get('Jackett', {}).get('slow_indexer_seconds', 5)
+        self.JACKETT_MAX_RESULTS = config.get('Jackett', {}).get('max_results', 50)  # Best releases kept per search
+        self.JACKETT_GOOD_SCORE = config.get('Jackett', {}).get('good_score', 75)  # Stop trying query variants at this release score
+        self.JACKETT_SEARCH_MODE = config.get('Jackett', {}).get('search_mode', 'json')  # 'json' or 'torznab' (streamed)
+        self.JACKETT_TORZNAB_SETTLE_AFTER = config.get('Jackett', {}).get('torznab_settle_after', 200)
+        self.JACKETT_CACHE_HIT_TTL = config.get('Jackett', {}).get('cache_hit_ttl', 6 * 3600)
+        self.JACKETT_CACHE_MISS_TTL = config.get('Jackett', {}).get('cache_miss_ttl', 1800)
+        self.JACKETT_CACHE_STALE_TTL = config.get('Jackett', {}).get('cache_stale_ttl', 3600)
+        self.JACKETT_CACHE_MAX_ENTRIES = config.get('Jackett', {}).get('cache_max_entries', 1000)
+        self.JACKETT_CACHE_REDIS_URL = config.get('Jackett', {}).get('cache_redis_url', '')  # e.g. redis://localhost:6379/0
 
         self.JELLYFIN_API_KEY = config.get('Jellyfin', {}).get('api_key', 'changeme')
         self.JELLYFIN_SERVER_URL = config.get('Jellyfin', {}).get('server_url', 'http://10.252.0.2:8096')
@@ -27,6 +155,29 @@ class Config:
         self.SPOTIFY_CLIENT_SECRET = config.get('Spotify', {}).get('client_secret', '')
 
         self.TMDB_API_KEY = config.get('TMDb', {}).get('api_key', '')
+        self.TMDB_RATE_LIMIT = config.get('TMDb', {}).get('rate_limit', 40)  # Requests per second
+        self.TMDB_MAX_WORKERS = config.get('TMDb', {}).get('max_workers', 8)
+
+        # External service timeouts and circuit breakers
+        self.SERVICE_TIMEOUT = config.get('Services', {}).get('timeout', 10)  # Seconds per request to Jellyfin and the *arr apps
+        self.CIRCUIT_FAILURE_THRESHOLD = config.get('Services', {}).get('failure_threshold', 3)  # Failures in a row before failing fast
+        self.CIRCUIT_RESET_TIMEOUT = config.get('Services', {}).get('reset_timeout', 15)  # First retry after this many seconds
+        self.CIRCUIT_MAX_RESET_TIMEOUT = config.get('Services', {}).get('max_reset_timeout', 300)
+        # Connection pool of the async views' HTTP client, shared by all their upstream calls in a process
+        self.ASYNC_MAX_CONNECTIONS = config.get('Services', {}).get('async_max_connections', 100)
+        self.ASYNC_MAX_KEEPALIVE = config.get('Services', {}).get('async_max_keepalive', 20)
+
+        # Prometheus metrics at /metrics; with a token, scrapers must send it as a bearer token
+        self.METRICS_ENABLED = config.get('Metrics', {}).get('enabled', True)
+        self.METRICS_TOKEN = config.get('Metrics', {}).get('token', '')
+
+        # Request tracing: a Server-Timing header on every response, sampled and slow traces written to file
+        self.TRACING_ENABLED = config.get('Tracing', {}).get('enabled', True)
+        self.TRACING_SERVER_TIMING = config.get('Tracing', {}).get('server_timing', True)
+        self.TRACING_SAMPLE_RATE = config.get('Tracing', {}).get('sample_rate', 0.01)  # Fraction of requests exported
+        self.TRACING_SLOW_MS = config.get('Tracing', {}).get('slow_ms', 1000)  # Requests slower than this are always exported
+        self.TRACING_FILE = config.get('Tracing', {}).get('file', os.path.join('./logs', 'traces.jsonl'))
+        self.TRACING_OTLP_ENDPOINT = config.get('Tracing', {}).get('otlp_endpoint', '')  # e.g. http://localhost:4318
 
         # Database Configuration - PostgreSQL
         db_config = config.get('Database', {})
@@ -60,3 +211,44 @@ class Config:
         # Lidarr Configuration
         self.LIDARR_API_URL = config.get('Lidarr', {}).get('api_url', 'http://10.252.0.2:8686')
         self.LIDARR_API_KEY = config.get('Lidarr', {}).get('api_key', 'c8987dca3e874c548419f45d5bcbf52d')
+
+        # Logging configuration
+        self.LOG_LEVEL = config.get('Logging', {}).get('level', 'INFO')
+        self.LOG_FORMAT = config.get('Logging', {}).get('format', 'json')  # 'json' (one object per line) or 'text'
+        self.LOG_QUEUE_SIZE = config.get('Logging', {}).get('queue_size', 10000)  # Records waiting to be written before new ones are dropped
+
+        # Response cache configuration
+        self.CACHE_DIR = config.get('Cache', {}).get('directory', './cache')
+        self.CACHE_MAX_ENTRIES = config.get('Cache', {}).get('max_entries', 50000)
+        self.IMAGE_CACHE_MAX_BYTES = config.get('Cache', {}).get('image_max_mb', 500) * 1024 * 1024
+
+        # Scheduler configuration: 'auto' (one web worker is elected to run jobs),
+        # 'dedicated' (only scripts/run_scheduler.py runs them) or 'off'
+        self.SCHEDULER_MODE = config.get('Scheduler', {}).get('mode', 'auto')
+        self.SCHEDULER_ELECTION_INTERVAL = config.get('Scheduler', {}).get('election_interval', 30)  # Seconds
+        self.SCHEDULER_LOCK_FILE = config.get('Scheduler', {}).get('lock_file', os.path.join(self.CACHE_DIR, 'scheduler.lock'))
+
+        # Upstream request budgets shared by every worker on the host: requests per second (rate),
+        # saved-up requests (burst) and calls in flight (concurrency). Batch jobs get batch_share of
+        # each; interactive calls wait at most max_wait seconds before the user gets a 429.
+        upstreams_config = config.get('Upstreams', {})
+        self.UPSTREAM_LIMITS = {
+            'tmdb': {'rate': self.TMDB_RATE_LIMIT, 'concurrency': 20},
+            'spotify': {'rate': 10, 'concurrency': 5},
+            'musicbrainz': {'rate': 1, 'concurrency': 1},  # MusicBrainz allows one request per second per IP
+        }
+        for service, limits in upstreams_config.get('services', {}).items():
+            self.UPSTREAM_LIMITS[service] = {**self.UPSTREAM_LIMITS.get(service, {}), **(limits or {})}
+        self.UPSTREAM_LIMITS_FILE = upstreams_config.get('file', os.path.join(self.CACHE_DIR, 'upstream_limits.sqlite'))
+        self.UPSTREAM_BATCH_SHARE = upstreams_config.get('batch_share', 0.5)
+        self.UPSTREAM_MAX_WAIT = upstreams_config.get('max_wait', 0.5)
+        self.UPSTREAM_BATCH_IDLE = upstreams_config.get('batch_idle', 10)  # Seconds without users before jobs may use a budget too small to share
+
+        # Every worker process leaves its counters here for /metrics to add up
+        self.METRICS_DIR = config.get('Metrics', {}).get('directory', os.path.join(self.CACHE_DIR, 'metrics'))
+
+        # Recommendation builder configuration
+        recommendations_config = config.get('Recommendations', {})
+        self.RECOMMENDATIONS_MAX_AGE_HOURS = recommendations_config.get('max_age_hours', 168)  # Refresh weekly
+        self.RECOMMENDATIONS_BATCH_SIZE = recommendations_config.get('batch_size', 50)  # Library items per run
+        self.RECOMMENDATIONS_PER_PAGE = recommendations_config.get('per_page', 25)
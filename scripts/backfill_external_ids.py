@@ -9,15 +9,15 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import create_app
-from app.models import Request, db
+from app.models import Request
+from app.helpers.batch_runner import BatchRunner, add_batch_arguments
 from app.helpers.media_classifier import MediaClassifier
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
-def backfill_ids(limit=None):
-    """Backfill external IDs for requests missing them."""
-    app = create_app()
+def backfill_ids(args):
+    """Backfill external IDs for requests missing them, resuming an interrupted run."""
+    app = create_app(run_scheduler=False)
     
     with app.app_context():
         classifier = MediaClassifier()
@@ -28,52 +28,33 @@ def backfill_ids(limit=None):
             Request.status != 'Failed (Classification)'
         )
         
-        if limit:
-            query = query.limit(limit)
-        
-        requests = query.all()
-        
-        if not requests:
-            logging.info("No requests need external ID backfill")
-            return 0
-        
-        logging.info(f"Backfilling external IDs for {len(requests)} requests...")
-        
-        success = 0
-        failed = 0
-        
-        for req in requests:
-            try:
-                logging.info(f"Processing: {req.title}")
-                match = classifier.get_best_match(req.title)
+        def apply(req, match):
+            if match and match.external_id:
+                req.arr_service = match.service.value
+                req.external_id = match.external_id
+                req.confidence_score = match.confidence
+                req.media_type = match.media_type.value
                 
-                if match and match.external_id:
-                    req.arr_service = match.service.value
-                    req.external_id = match.external_id
-                    req.confidence_score = match.confidence
-                    req.media_type = match.media_type.value
-                    
-                    logging.info(f"  ✓ {match.title} → {match.service.value} (ID: {match.external_id})")
-                    success += 1
-                else:
-                    logging.warning(f"  ✗ No confident match found")
-                    failed += 1
-                    
-            except Exception as e:
-                logging.error(f"  ✗ Error: {e}")
-                failed += 1
-        
-        db.session.commit()
-        
-        logging.info(f"\nBackfill complete: {success} success, {failed} failed")
-        return success
+                logging.info(f"  ✓ {req.title}: {match.title} → {match.service.value} (ID: {match.external_id})")
+                return True
+            logging.warning(f"  ✗ {req.title}: no confident match found")
+            return False
+        
+        # Classification runs concurrently; each chunk of results is committed before the next is read
+        runner = BatchRunner.from_args(
+            'backfill_external_ids', query,
+            lambda req: classifier.get_best_match(req.title, include_music=req.may_be_music()), apply, args,
+            paced_by='musicbrainz'
+        )
+        stats = runner.run(restart=args.restart)
+        return stats['succeeded']
 
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description='Backfill external IDs for requests')
-    parser.add_argument('--limit', type=int, help='Maximum number of requests to process')
+    add_batch_arguments(parser)
     args = parser.parse_args()
     
-    count = backfill_ids(limit=args.limit)
+    count = backfill_ids(args)
     sys.exit(0 if count >= 0 else 1)
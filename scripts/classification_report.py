@@ -13,11 +13,10 @@ from app.models import Request
 from sqlalchemy import func
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(message)s')
 
 def generate_report(days=7):
     """Generate classification performance report."""
-    app = create_app()
+    app = create_app(run_scheduler=False)
     
     with app.app_context():
         from datetime import datetime, timedelta
@@ -9,19 +9,46 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import create_app
+from app.models import Request
+from app.helpers.batch_runner import BatchRunner, add_batch_arguments
 from app.helpers.request_processor import RequestProcessor
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def force_process():
+def force_process(args):
     """Force immediate processing of pending requests."""
-    app = create_app()
+    app = create_app(run_scheduler=False)
     
     with app.app_context():
         logging.info("Forcing request processing...")
-        RequestProcessor.process_pending_requests()
+        processor = RequestProcessor()
+        
+        def classify(req):
+            # Requests classified earlier keep their stored classification
+            if req.is_classified() and req.arr_service:
+                return None
+            return processor.classifier.get_best_match(req.title, include_music=req.may_be_music())
+        
+        def process(req, match):
+            if args.dry_run:
+                # Don't send anything to the *Arr services
+                service = req.arr_service if req.is_classified() else (match.service.value if match else None)
+                logging.info(f"Would process request {req.id}: {req.title} → {service or 'Failed (Classification)'}")
+                return service is not None
+            return processor.process(req, match, prefetched=True)
+        
+        # Titles are classified concurrently; requests are then sent to their services one by one
+        runner = BatchRunner.from_args(
+            'force_process', Request.query.filter_by(status='Pending'), classify, process, args, paced_by='musicbrainz'
+        )
+        runner.run(restart=args.restart)
         logging.info("Processing complete")
 
 if __name__ == "__main__":
-    force_process()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Process pending requests now')
+    add_batch_arguments(parser)
+    args = parser.parse_args()
+    
+    force_process(args)
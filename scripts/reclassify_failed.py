@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Reclassify Failed Requests
-Resets failed classification requests to Pending for retry
+Classifies failed classification requests again and queues the ones that now
+match for processing; the rest stay failed
 """
 
 import sys
@@ -9,39 +10,63 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import create_app
-from app.models import Request, db
+from app.models import Request
+from app.helpers.batch_runner import BatchRunner, add_batch_arguments
+from app.helpers.media_classifier import MediaClassifier
+import json
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
-def reclassify_failed():
-    """Reset failed classification requests for retry."""
-    app = create_app()
+def reclassify_failed(args):
+    """Reclassify failed classification requests concurrently, resuming an interrupted run."""
+    app = create_app(run_scheduler=False)
     
     with app.app_context():
+        classifier = MediaClassifier()
+        
         # Find requests with classification failures
         failed = Request.query.filter(
             Request.status == 'Failed (Classification)'
-        ).all()
-        
-        if not failed:
-            logging.info("No failed classification requests found")
-            return 0
-        
-        logging.info(f"Found {len(failed)} failed classification requests")
+        )
         
-        for req in failed:
-            logging.info(f"  Resetting request {req.id}: {req.title}")
+        def apply(req, match):
+            if not match:
+                logging.warning(f"  ✗ Request {req.id}: still no match for {req.title}")
+                return False
+            
+            # Stored as classified, so the request processor sends it on without classifying again
             req.status = 'Pending'
-            req.arr_service = None
-            req.confidence_score = None
+            req.arr_service = match.service.value
+            req.external_id = match.external_id
+            req.confidence_score = match.confidence
+            req.media_type = match.media_type.value
+            req.classification_data = json.dumps({
+                'title': match.title,
+                'year': match.year,
+                'description': match.description,
+                'poster_url': match.poster_url,
+                'additional_data': match.additional_data
+            })
+            logging.info(f"  ✓ Request {req.id}: {req.title} → {match.service.value} (confidence: {match.confidence:.2f})")
+            return True
         
-        db.session.commit()
-        logging.info(f"✓ Reset {len(failed)} requests for reclassification")
-        logging.info("Run the request processor to reclassify them")
+        runner = BatchRunner.from_args(
+            'reclassify_failed', failed,
+            lambda req: classifier.get_best_match(req.title, include_music=req.may_be_music()), apply, args,
+            paced_by='musicbrainz'
+        )
+        stats = runner.run(restart=args.restart)
+        if stats['succeeded'] and not args.dry_run:
+            logging.info("Run the request processor to send the reclassified requests to their services")
         
-        return len(failed)
+        return stats['succeeded']
 
 if __name__ == "__main__":
-    count = reclassify_failed()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Reclassify requests whose classification failed')
+    add_batch_arguments(parser)
+    args = parser.parse_args()
+    
+    count = reclassify_failed(args)
     sys.exit(0 if count >= 0 else 1)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Dedicated Scheduler
+Runs the scheduled background jobs in their own process. Set Scheduler.mode
+to 'dedicated' in config.yaml so web workers leave the jobs to this process.
+Several copies can run for failover; only the elected leader runs jobs.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import signal
+import threading
+from app import create_app
+
+
+def run_scheduler():
+    """Run the scheduler until interrupted."""
+    app = create_app(run_scheduler=True)
+    stopped = threading.Event()
+
+    def stop(signum, frame):
+        stopped.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    stopped.wait()
+    app.extensions['scheduler_leadership'].stop()
+
+
+if __name__ == "__main__":
+    run_scheduler()